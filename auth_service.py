@@ -0,0 +1,360 @@
+import argparse
+import asyncio
+import json
+import os
+import struct
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from enrollment import StreamingTemplate
+from gesture_features import NUM_LANDMARKS, feature_size
+from multi_template import user_templates
+from sequential import ACCEPT, REJECT, SequentialTest
+
+# Wire format, both directions: header length, payload length (big-endian uint32), JSON header, payload.
+# Payloads are JPEG bytes or float32 landmarks shaped (hands, 21, 3).
+PREFIX = struct.Struct(">II")
+MAX_HEADER = 1 << 16
+MAX_PAYLOAD = 8 << 20
+
+_worker_hands = {}
+
+
+async def read_message(reader):
+    header_len, payload_len = PREFIX.unpack(await reader.readexactly(PREFIX.size))
+    if header_len > MAX_HEADER or payload_len > MAX_PAYLOAD:
+        raise ValueError("message too large")
+    header = json.loads(await reader.readexactly(header_len))
+    payload = await reader.readexactly(payload_len) if payload_len else b""
+    return header, payload
+
+
+def send_message(writer, header, payload=b""):
+    header = json.dumps(header).encode("utf-8")
+    writer.write(PREFIX.pack(len(header), len(payload)) + header + payload)
+
+
+def _init_worker():
+    import cv2
+    cv2.setNumThreads(1)
+
+
+def detect_landmarks(jpeg, max_hands, mirror):
+    # Runs in a worker process. Frames from many sessions interleave on one worker, so Hands runs in
+    # static-image mode instead of carrying tracking state from one client's frame into another's.
+    import cv2
+    hands = _worker_hands.get(max_hands)
+    if hands is None:
+        import mediapipe as mp
+        hands = _worker_hands[max_hands] = mp.solutions.hands.Hands(
+            static_image_mode=True,
+            max_num_hands=max_hands,
+            min_detection_confidence=0.7
+        )
+    frame = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        return None
+    if mirror:
+        frame = cv2.flip(frame, 1)
+    result = hands.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    if not result.multi_hand_landmarks:
+        return np.empty((0, NUM_LANDMARKS, 3), dtype=np.float32)
+    return np.array([[(lm.x, lm.y, lm.z) for lm in hand.landmark] for hand in result.multi_hand_landmarks],
+                    dtype=np.float32)
+
+
+class ClientSession:
+    # One register/verify/identify attempt; mirrors the decision rules of GestureAuthenticator._match.
+    def __init__(self, auth, op, request, locks=None):
+        self.auth = auth
+        self.op = op
+        # Per-username locks shared by every session of the service.
+        self.locks = locks if locks is not None else {}
+        self.user = request.get("user")
+        self.threshold = request.get("threshold", 75)
+        self.max_frames = request.get("max_frames", 300)
+        self.min_frames = request.get("min_frames", 60)
+        if op == "verify":
+            self.two_hands = auth.users[self.user].get("two_hands", True)
+        else:
+            self.two_hands = request.get("two_hands", True if op == "register" else None)
+        self.max_hands = 1 if self.two_hands is False else 2
+        self.template = StreamingTemplate(feature_size(self.max_hands), tolerance=request.get("tolerance", 0.02)) if op == "register" else None
+        self.sequential = SequentialTest().calibrate(self.threshold) if request.get("sequential") else None
+        self.frames = 0
+        self.matched = None
+        self.stable_frames = 0
+        self.required_stable_frames = 15
+        self.accepted = deque(maxlen=30)
+
+    def features(self, hands):
+        hands = [h for h in hands if not np.isnan(h).any()]
+        two_hands = len(hands) >= 2 if self.two_hands is None else self.two_hands
+        if two_hands:
+            return (self.auth.extract_two_hands_features(hands) if len(hands) >= 2 else None), True
+        return (self.auth.extract_hand_features(hands[0]) if hands else None), False
+
+    def score(self, features, two_hands):
+        if self.op == "verify":
+            return self.user, self.auth.calculate_user_similarity(features, self.user)
+        matches = self.auth.identify(features, two_hands, top_k=1)
+        return matches[0] if matches else (None, 0.0)
+
+    async def update(self, hands):
+        self.frames += 1
+        features, two_hands = self.features(hands)
+        if self.op == "register":
+            return await self.update_register(features)
+        reply = {"status": "pending", "frames": self.frames, "score": None}
+        if features is None:
+            if self.sequential is None:
+                self.stable_frames = 0
+        else:
+            label, score = self.score(features, two_hands)
+            reply["score"] = float(score)
+            if label != self.matched or score < self.threshold:
+                self.accepted.clear()
+            if score >= self.threshold:
+                self.accepted.append(features)
+            if self.sequential is not None:
+                if label != self.matched:
+                    self.sequential.reset()
+                    self.matched = label
+                decision = self.sequential.update(score)
+                if decision == ACCEPT:
+                    return await self.accept(reply, label, score)
+                if decision == REJECT:
+                    return dict(reply, status="rejected")
+            else:
+                if score >= self.threshold:
+                    self.stable_frames = self.stable_frames + 1 if label == self.matched else 1
+                    self.matched = label
+                else:
+                    self.stable_frames = 0
+                if self.stable_frames >= self.required_stable_frames:
+                    return await self.accept(reply, label, score)
+        if self.frames >= self.max_frames:
+            return dict(reply, status="rejected")
+        return reply
+
+    def lock(self, username):
+        return self.locks.setdefault(username, asyncio.Lock())
+
+    async def accept(self, reply, label, score):
+        features = np.mean(self.accepted, axis=0) if self.accepted else None
+        # The adapted record is computed from the stored one and written back after an await, so two
+        # accepted logins for one user must not interleave or the later write drops the earlier update.
+        async with self.lock(label):
+            user, action = self.auth.adaptation(label, features, score)
+            if user is not None:
+                await self.save(label, user)
+        return dict(reply, status="accepted", user=label, adapted=action)
+
+    async def save(self, username, user):
+        # The journal append fsyncs, so it runs on a thread; the gallery is only touched on the loop.
+        await asyncio.to_thread(self.auth.store.put, username, user)
+        self.auth.gallery.add(username, user_templates(self.auth.users[username]), user.get("two_hands", True))
+
+    async def update_register(self, features):
+        if features is not None:
+            self.template.add(features)
+        if self.template.converged(self.min_frames) or self.frames >= self.max_frames:
+            if self.template.count < self.min_frames:
+                return {"status": "rejected", "frames": self.frames, "error": "Gesture recording failed!"}
+            user = self.auth.enrol(self.user, self.template, self.two_hands)
+            async with self.lock(self.user):
+                await self.save(self.user, user)
+            return {"status": "registered", "frames": self.frames, "user": self.user}
+        return {"status": "pending", "frames": self.frames, "collected": self.template.count}
+
+
+class AuthService:
+    # Sessions are multiplexed on one event loop against one gallery; only JPEG decoding and hand
+    # detection go to the worker processes. Landmark frames are scored directly on the loop.
+    def __init__(self, auth, workers=None, max_inflight=None, max_sessions=64):
+        self.auth = auth
+        self.workers = workers or os.cpu_count()
+        self.max_inflight = max_inflight or 2 * self.workers
+        self.max_sessions = max_sessions
+        self.executor = None
+        self.inflight = 0
+        self.sessions = 0
+        # Usernames with a register session open, so two clients cannot enrol the same name.
+        self.registering = set()
+        # asyncio.Lock per username, held across adapting, storing and re-indexing a user's templates.
+        self.user_locks = {}
+        self.stats = {"sessions": 0, "refused_sessions": 0, "frames": 0, "busy_frames": 0,
+                      "accepted": 0, "rejected": 0, "registered": 0}
+        self.started = time.perf_counter()
+
+    def start_workers(self):
+        self.executor = ProcessPoolExecutor(self.workers, initializer=_init_worker)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+        self.auth.close()
+
+    async def landmarks_for(self, header, payload, max_hands):
+        if header.get("kind") == "landmarks":
+            return np.frombuffer(payload, dtype=np.float32).reshape(-1, NUM_LANDMARKS, 3)
+        # Backpressure: with every worker slot taken the frame is dropped and reported as busy,
+        # so a slow server never builds a backlog of stale frames.
+        if self.inflight >= self.max_inflight:
+            return None
+        self.inflight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, detect_landmarks, payload, max_hands,
+                                              header.get("mirror", True))
+        finally:
+            self.inflight -= 1
+
+    def open_session(self, request):
+        op = request.get("op")
+        if op not in ("register", "verify", "identify"):
+            return None, {"status": "error", "error": f"unknown operation {op!r}"}
+        user = request.get("user")
+        if op == "verify" and user not in self.auth.users:
+            return None, {"status": "error", "error": "User not found!"}
+        if op == "register" and (not user or user in self.auth.users or user in self.registering):
+            return None, {"status": "error", "error": "Username already exists!" if user else "Username required"}
+        if op == "identify" and len(self.auth.gallery) == 0:
+            return None, {"status": "error", "error": "No users registered!"}
+        if op == "register":
+            self.registering.add(user)
+        return ClientSession(self.auth, op, request, self.user_locks), {"status": "ready"}
+
+    def end_session(self, session):
+        if session is not None and session.op == "register":
+            self.registering.discard(session.user)
+
+    async def handle(self, reader, writer):
+        if self.sessions >= self.max_sessions:
+            self.stats["refused_sessions"] += 1
+            send_message(writer, {"status": "busy", "error": "too many sessions"})
+            await writer.drain()
+            writer.close()
+            return
+        self.sessions += 1
+        session = None
+        try:
+            while True:
+                try:
+                    header, payload = await read_message(reader)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                op = header.get("op")
+                if op == "frame":
+                    if session is None:
+                        send_message(writer, {"status": "error", "error": "no open session"})
+                    else:
+                        reply = await self.process_frame(session, header, payload)
+                        send_message(writer, reply)
+                        if reply["status"] not in ("pending", "busy"):
+                            self.end_session(session)
+                            session = None
+                elif op == "stats":
+                    send_message(writer, self.snapshot())
+                elif op == "close":
+                    break
+                else:
+                    self.stats["sessions"] += 1
+                    self.end_session(session)
+                    session, reply = self.open_session(header)
+                    send_message(writer, reply)
+                await writer.drain()
+        except (ValueError, KeyError) as e:
+            send_message(writer, {"status": "error", "error": str(e)})
+        finally:
+            self.end_session(session)
+            self.sessions -= 1
+            writer.close()
+
+    async def process_frame(self, session, header, payload):
+        hands = await self.landmarks_for(header, payload, session.max_hands)
+        if hands is None:
+            self.stats["busy_frames"] += 1
+            return {"status": "busy", "frames": session.frames}
+        self.stats["frames"] += 1
+        reply = await session.update(list(hands))
+        if reply["status"] in self.stats:
+            self.stats[reply["status"]] += 1
+        return reply
+
+    def snapshot(self):
+        elapsed = time.perf_counter() - self.started
+        return dict(self.stats, status="stats", active_sessions=self.sessions, inflight=self.inflight,
+                    workers=self.workers, frames_per_second=self.stats["frames"] / elapsed if elapsed else 0.0)
+
+
+class ServiceClient:
+    def __init__(self, host="127.0.0.1", port=8765):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        return self
+
+    async def request(self, header, payload=b""):
+        send_message(self.writer, header, payload)
+        await self.writer.drain()
+        reply, _ = await read_message(self.reader)
+        return reply
+
+    async def open(self, op, **options):
+        return await self.request(dict(options, op=op))
+
+    async def send_landmarks(self, hands):
+        return await self.request({"op": "frame", "kind": "landmarks"}, np.asarray(hands, dtype=np.float32).tobytes())
+
+    async def send_jpeg(self, jpeg, mirror=True):
+        return await self.request({"op": "frame", "kind": "jpeg", "mirror": mirror}, bytes(jpeg))
+
+    async def stats(self):
+        return await self.request({"op": "stats"})
+
+    async def close(self):
+        if self.writer is not None:
+            send_message(self.writer, {"op": "close"})
+            await self.writer.drain()
+            self.writer.close()
+            self.writer = None
+
+
+async def serve(service, host, port):
+    service.start_workers()
+    server = await asyncio.start_server(service.handle, host, port)
+    print(f"Gesture auth service on {host}:{port} with {service.workers} inference workers "
+          f"({len(service.auth.users)} users)")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    from gesture_auth import GestureAuthenticator
+    parser = argparse.ArgumentParser(description="Local gesture authentication service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--store", default="users_db")
+    parser.add_argument("--workers", type=int, default=None, help="inference worker processes (default: all cores)")
+    parser.add_argument("--max-inflight", type=int, default=None, help="frames in the workers before new ones are refused")
+    parser.add_argument("--max-sessions", type=int, default=64)
+    args = parser.parse_args()
+    auth = GestureAuthenticator(store_path=args.store, warm_hands=False)
+    service = AuthService(auth, args.workers, args.max_inflight, args.max_sessions)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import SyntheticUsers
+from frame_sources import LandmarkReplaySource
+from gesture_auth import GestureAuthenticator
+from overlay import VerifyOverlay
+
+
+def run(frames, observer_factory, repeats, seed=0):
+    # Same workload as the e2e stage of bench_suite.py: user 0 enrols from session 0 and verifies with session 1.
+    users = SyntheticUsers(seed, 2)
+    landmarks = users.stream(0, frames, session=1)
+    with tempfile.TemporaryDirectory() as store:
+        auth = GestureAuthenticator(store_path=store, frame_source=LandmarkReplaySource(landmarks), warm_hands=False)
+        enrol = users.stream(0, 120, session=0)
+        auth.store.put("bench", {"gesture": auth.extract_features_batch(enrol).mean(axis=0), "two_hands": True, "created_at": ""})
+        auth.gallery.rebuild(auth.users)
+        rates = []
+        for _ in range(repeats):
+            auth.release_camera()
+            start = time.perf_counter()
+            # threshold above 100 never accepts, so every frame goes through the loop.
+            result = auth.verify_gesture_headless("bench", threshold=101, timeout=None, observer=observer_factory(auth))
+            rates.append(result["frames"] / (time.perf_counter() - start))
+        auth.store.close()
+    return float(np.median(rates))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless vs overlay verification loop throughput")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--display", action="store_true", help="also show the overlay with cv2.imshow, as verify_gesture_live does")
+    args = parser.parse_args()
+    headless = run(args.frames, lambda auth: None, args.repeats, args.seed)
+    overlay = run(args.frames, lambda auth: VerifyOverlay(auth, show=args.display, hold_ms=1), args.repeats, args.seed)
+    print(f"headless: {headless:10.1f} frames/s")
+    print(f"overlay:  {overlay:10.1f} frames/s ({'with' if args.display else 'without'} imshow)")
+    print(f"speedup:  {headless / overlay:10.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from auth_service import ServiceClient
+
+
+def user_landmarks(user, frames, rng):
+    base = np.random.default_rng(user).uniform(0.2, 0.8, size=(1, 2, 21, 3)).astype(np.float32)
+    base[..., 2] *= 0.1
+    return base + rng.normal(0, 0.005, size=(frames, 2, 21, 3)).astype(np.float32)
+
+
+def wait_for_port(host, port, timeout=30):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"service did not start on {host}:{port}")
+
+
+async def register_users(host, port, users):
+    client = await ServiceClient(host, port).connect()
+    rng = np.random.default_rng(0)
+    for user in range(users):
+        await client.open("register", user=f"user{user}", two_hands=True)
+        for hands in user_landmarks(user, 200, rng):
+            reply = await client.send_landmarks(hands)
+            if reply["status"] != "pending":
+                break
+    await client.close()
+
+
+async def run_session(host, port, user, op, jpeg, max_frames, fps, latencies, rng):
+    # Each client behaves like a camera: a new frame every 1/fps seconds; a busy frame is simply lost.
+    client = await ServiceClient(host, port).connect()
+    options = {"user": f"user{user}"} if op == "verify" else {"two_hands": True}
+    reply = await client.open(op, max_frames=max_frames, **options)
+    if reply["status"] != "ready":
+        await client.close()
+        return reply["status"], 0
+    frames = user_landmarks(user, max_frames, rng)
+    sent = 0
+    processed = 0
+    next_frame = time.perf_counter()
+    while True:
+        if fps:
+            next_frame += 1.0 / fps
+            await asyncio.sleep(max(0.0, next_frame - time.perf_counter()))
+        start = time.perf_counter()
+        if jpeg is not None:
+            reply = await client.send_jpeg(jpeg)
+        else:
+            reply = await client.send_landmarks(frames[sent % len(frames)])
+        sent += 1
+        if reply["status"] != "busy":
+            latencies.append(time.perf_counter() - start)
+            processed += 1
+        if reply["status"] not in ("pending", "busy"):
+            break
+    await client.close()
+    return reply["status"], processed
+
+
+async def load(host, port, users, clients, sessions, op, jpeg, max_frames, fps):
+    latencies = []
+    outcomes = {}
+    frames = 0
+    queue = asyncio.Queue()
+    for i in range(sessions):
+        queue.put_nowait(i % users)
+
+    async def client_loop(seed):
+        nonlocal frames
+        rng = np.random.default_rng(seed)
+        while not queue.empty():
+            user = queue.get_nowait()
+            status, sent = await run_session(host, port, user, op, jpeg, max_frames, fps, latencies, rng)
+            outcomes[status] = outcomes.get(status, 0) + 1
+            frames += sent
+
+    client = await ServiceClient(host, port).connect()
+    busy_before = (await client.stats())["busy_frames"]
+    await client.close()
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop(seed) for seed in range(clients)))
+    elapsed = time.perf_counter() - start
+    client = await ServiceClient(host, port).connect()
+    stats = await client.stats()
+    await client.close()
+    busy = stats["busy_frames"] - busy_before
+    latencies = np.array(latencies) * 1000
+    return {
+        "sessions_per_second": sessions / elapsed,
+        "frames_per_second": frames / elapsed,
+        "latency_p50_ms": float(np.percentile(latencies, 50)),
+        "latency_p95_ms": float(np.percentile(latencies, 95)),
+        "outcomes": outcomes,
+        "busy_frames": busy,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent session throughput of auth_service.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--external", action="store_true", help="use an already running service instead of starting one")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--sessions", type=int, default=64)
+    parser.add_argument("--op", choices=["verify", "identify"], default="verify")
+    parser.add_argument("--image", help="send this image as JPEG frames (exercises the inference workers)")
+    parser.add_argument("--max-frames", type=int, default=60)
+    parser.add_argument("--fps", type=float, default=30, help="frames per second per client; 0 sends as fast as replies arrive")
+    args = parser.parse_args()
+    jpeg = None
+    if args.image:
+        ok, encoded = cv2.imencode(".jpg", cv2.imread(args.image))
+        jpeg = encoded.tobytes()
+    with tempfile.TemporaryDirectory() as store:
+        server = None
+        if not args.external:
+            command = [sys.executable, os.path.join(ROOT, "auth_service.py"), "--host", args.host,
+                       "--port", str(args.port), "--store", store, "--max-sessions", str(max(args.clients) * 2)]
+            if args.workers:
+                command += ["--workers", str(args.workers)]
+            server = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+        try:
+            wait_for_port(args.host, args.port)
+            if not args.external:
+                asyncio.run(register_users(args.host, args.port, args.users))
+            for clients in args.clients:
+                result = asyncio.run(load(args.host, args.port, args.users, clients, args.sessions, args.op,
+                                          jpeg, args.max_frames, args.fps))
+                print(f"{clients:3d} clients: {result['sessions_per_second']:8.1f} sessions/s "
+                      f"{result['frames_per_second']:9.1f} frames/s  "
+                      f"p50 {result['latency_p50_ms']:6.2f} ms  p95 {result['latency_p95_ms']:6.2f} ms  "
+                      f"busy {result['busy_frames']}  {result['outcomes']}")
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic import SyntheticUsers, as_mediapipe
+from compact import CompactGallery, CompactModel
+from frame_sources import LandmarkReplaySource
+from gesture_auth import GestureAuthenticator
+from gesture_features import batch_features
+from gesture_gallery import GestureGallery
+from multi_template import ENROL_TEMPLATES
+from overlay import VerifyOverlay
+
+RESULTS_VERSION = 1
+USER_COUNTS = [1, 10, 100, 1000, 10000, 100000]
+
+
+def timed(fn, repeats=7, min_time=0.2):
+    # Median seconds per call over `repeats` rounds; each round loops until it has run for min_time / repeats.
+    fn()
+    rounds = []
+    budget = min_time / repeats
+    for _ in range(repeats):
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            fn()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= budget:
+                break
+        rounds.append(elapsed / calls)
+    return float(np.median(rounds))
+
+
+def result(value, unit, better="lower", **extra):
+    return dict(value=float(value), unit=unit, better=better, **extra)
+
+
+def quiet_auth(store, source):
+    return GestureAuthenticator(store_path=store, frame_source=source, warm_hands=False, adapt=False)
+
+
+def micro(seed, repeats):
+    results = {}
+    with tempfile.TemporaryDirectory() as store:
+        auth = quiet_auth(store, LandmarkReplaySource(np.zeros((1, 2, 21, 3), np.float32)))
+        users = SyntheticUsers(seed, 2)
+        stream = users.stream(0, 64)
+        hands = as_mediapipe(stream[0])
+        arrays = list(stream[0])
+        template = batch_features(users.gesture(0)[None])[0]
+        features = auth.extract_two_hands_features(hands)
+        auth.users["bench"] = {"gesture": template, "templates": np.stack([template] * 3).astype(np.float32),
+                               "two_hands": True}
+        cases = {
+            "extract_hand_features": lambda: auth.extract_hand_features(hands[0]),
+            "extract_hand_features_array": lambda: auth.extract_hand_features(arrays[0]),
+            "extract_two_hands_features": lambda: auth.extract_two_hands_features(hands),
+            "extract_two_hands_features_array": lambda: auth.extract_two_hands_features(arrays),
+            "calculate_gesture_similarity": lambda: auth.calculate_gesture_similarity(features, template),
+            "calculate_user_similarity_3_templates": lambda: auth.calculate_user_similarity(features, "bench"),
+            "batch_features_64_frames": lambda: batch_features(stream),
+        }
+        for name, fn in cases.items():
+            results[f"micro.{name}"] = result(timed(fn, repeats) * 1e6, "us/call")
+        auth.store.close()
+    return results
+
+
+def e2e(seed, frames, repeats):
+    # Camera-free runs of the verification loop on synthetic landmark streams. Throughput uses a threshold
+    # above 100 so every frame is processed; time-to-decision uses the default threshold.
+    results = {}
+    users = SyntheticUsers(seed, 2)
+    with tempfile.TemporaryDirectory() as store:
+        auth = quiet_auth(store, LandmarkReplaySource(users.stream(0, frames)))
+        enrol = users.stream(0, 120, session=0)
+        auth.store.put("bench", {"gesture": batch_features(enrol).mean(axis=0), "two_hands": True, "created_at": ""})
+        auth.gallery.rebuild(auth.users)
+
+        def run(stream, observer=None, **options):
+            auth.frame_source = LandmarkReplaySource(stream)
+            auth.release_camera()
+            start = time.perf_counter()
+            match = auth.verify_gesture_headless("bench", timeout=None, observer=observer, **options)
+            return match, time.perf_counter() - start
+
+        genuine = users.stream(0, frames, session=1)
+        impostor = users.stream(0, frames, session=1, impostor=True)
+        for name, factory in (("headless", lambda: None), ("overlay", lambda: VerifyOverlay(auth, show=False, hold_ms=1))):
+            rates = [match["frames"] / seconds for match, seconds in
+                     (run(genuine, factory(), threshold=101) for _ in range(repeats))]
+            results[f"e2e.verify_{name}_fps"] = result(np.median(rates), "frames/s", "higher")
+        for name, stream, sequential in (("genuine", genuine, None), ("genuine_sequential", genuine, True),
+                                         ("impostor_sequential", impostor, True)):
+            runs = [run(stream, sequential=sequential) for _ in range(repeats)]
+            match = runs[0][0]
+            results[f"e2e.decision_{name}_frames"] = result(match["decision_frames"], "frames",
+                                                            decision=match["decision"])
+            results[f"e2e.decision_{name}_ms"] = result(np.median([m["decision_time"] or s for m, s in runs]) * 1000, "ms")
+        auth.store.close()
+    return results
+
+
+def scaling(seed, counts, queries=50, templates_per_user=ENROL_TEMPLATES):
+    # Gallery build time, 1:N identification latency and top-1 accuracy from 1 to max(counts) users, for
+    # one template per user and for the multi-template galleries enrolment builds ("multi").
+    results = {}
+    users = SyntheticUsers(seed, 2)
+    templates = users.templates(max(counts), batch_features)
+    stacks = users.template_stacks(max(counts), batch_features, templates_per_user)
+    model = CompactModel.fit(templates[:min(len(templates), 20000)], "int8")
+    probes = {n: batch_features(np.concatenate([users.stream(u, 1, session=1) for u in range(min(n, queries))]))
+              for n in counts}
+    for n in counts:
+        single = {f"user{i}": {"gesture": templates[i], "two_hands": True} for i in range(n)}
+        multi = {f"user{i}": {"gesture": stacks[i].mean(axis=0), "templates": stacks[i], "two_hands": True}
+                 for i in range(n)}
+        for name, factory, records in (("gallery", GestureGallery, single),
+                                       ("multi", GestureGallery, multi),
+                                       ("compact", lambda: CompactGallery({True: model}), single)):
+            gallery = factory()
+            start = time.perf_counter()
+            gallery.rebuild(records)
+            build = time.perf_counter() - start
+            gallery.identify(probes[n][0], True, top_k=1)
+            latencies, hits = [], 0
+            for i, probe in enumerate(probes[n]):
+                start = time.perf_counter()
+                matches = gallery.identify(probe, True, top_k=1)
+                latencies.append(time.perf_counter() - start)
+                hits += matches[0][0] == f"user{i}"
+            key = f"scaling.{name}.{n}"
+            results[f"{key}.build_ms"] = result(build * 1000, "ms")
+            results[f"{key}.identify_ms"] = result(np.median(latencies) * 1000, "ms")
+            results[f"{key}.top1"] = result(hits / len(probes[n]), "fraction", "higher")
+    return results
+
+
+def environment(seed):
+    import cv2
+    try:
+        import mediapipe
+        mediapipe_version = mediapipe.__version__
+    except ImportError:
+        mediapipe_version = None
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "version": RESULTS_VERSION,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "seed": seed,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "mediapipe": mediapipe_version,
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(current, baseline, tolerance):
+    # Relative change per shared metric; a regression is a change in the wrong direction beyond tolerance.
+    rows, regressions = [], []
+    for name, entry in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None or not old["value"]:
+            continue
+        change = entry["value"] / old["value"] - 1
+        worse = change > tolerance if entry["better"] == "lower" else change < -tolerance
+        rows.append((name, old["value"], entry["value"], entry["unit"], change, worse))
+        if worse:
+            regressions.append(name)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seeded, camera-free benchmark suite with JSON results")
+    parser.add_argument("--only", nargs="+", choices=["micro", "e2e", "scaling"], default=["micro", "e2e", "scaling"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--frames", type=int, default=300, help="frames per end-to-end run")
+    parser.add_argument("--users", type=int, nargs="+", default=USER_COUNTS, help="gallery sizes for the scaling curve")
+    parser.add_argument("--quick", action="store_true", help="fewer repeats and gallery sizes up to 10k")
+    parser.add_argument("--output", help="write results (JSON) here")
+    parser.add_argument("--compare", help="baseline results (JSON) to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="relative change counted as a regression")
+    args = parser.parse_args()
+    if args.quick:
+        args.repeats = min(args.repeats, 3)
+        args.users = [n for n in args.users if n <= 10000]
+    report = {"environment": environment(args.seed), "results": {}}
+    stages = {"micro": lambda: micro(args.seed, args.repeats),
+              "e2e": lambda: e2e(args.seed, args.frames, args.repeats),
+              "scaling": lambda: scaling(args.seed, sorted(args.users))}
+    for stage in args.only:
+        start = time.perf_counter()
+        results = stages[stage]()
+        report["results"].update(results)
+        print(f"[{stage}] {time.perf_counter() - start:.1f} s")
+        for name, entry in results.items():
+            print(f"  {name:55s} {entry['value']:12.3f} {entry['unit']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows, regressions = compare(report, baseline, args.tolerance)
+        print(f"\nvs {args.compare} (commit {baseline['environment'].get('commit')}):")
+        for name, old, new, unit, change, worse in rows:
+            print(f"  {name:55s} {old:12.3f} -> {new:12.3f} {unit:10s} {100 * change:+7.1f}%{'  REGRESSION' if worse else ''}")
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {100 * args.tolerance:.0f}%")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+import numpy as np
+
+# Finger chains as (MCP, PIP, DIP, TIP) landmark ids; 0 is the wrist and 1-4 the thumb (CMC..TIP).
+FINGERS = [(1, 2, 3, 4), (5, 6, 7, 8), (9, 10, 11, 12), (13, 14, 15, 16), (17, 18, 19, 20)]
+BONE_LENGTHS = np.array([0.045, 0.035, 0.03, 0.025])
+FINGER_SPREAD = np.array([-0.9, -0.35, 0.0, 0.3, 0.6])
+
+
+def hand_pose(rng, center=(0.5, 0.5), scale=1.0):
+    # One plausible hand in MediaPipe's normalized image coordinates: per-finger curl and spread, wrist
+    # rotation and a small depth profile. Returns (21, 3) float32. Finger directions stay inside
+    # (-pi, pi), so jitter never wraps the tip angles of gesture_features.
+    points = np.zeros((21, 3))
+    rotation = rng.uniform(-0.3, 0.3)
+    curls = rng.uniform(0.0, 2.0, size=5)
+    scale = scale * rng.uniform(0.75, 1.25)
+    for finger, chain in enumerate(FINGERS):
+        angle = -np.pi / 2 + rotation + FINGER_SPREAD[finger] + rng.normal(0, 0.12)
+        position = np.zeros(3)
+        if finger:
+            # Knuckles sit on an arc across the palm.
+            position[:2] = 0.08 * np.array([np.cos(angle), np.sin(angle)])
+        for joint, length in zip(chain, BONE_LENGTHS):
+            position = position + length * np.array([np.cos(angle), np.sin(angle), -0.2 * curls[finger]])
+            points[joint] = position
+            angle += curls[finger] * 0.3
+    points[:, :2] = points[:, :2] * scale + center
+    points[:, 2] *= scale
+    return points.astype(np.float32)
+
+
+class SyntheticUsers:
+    # Seeded population of users, each with a fixed secret gesture (one or two hand poses). The same
+    # seed and user id always give the same gesture, so runs on different machines see identical data.
+    def __init__(self, seed=0, num_hands=2):
+        self.seed = seed
+        self.num_hands = num_hands
+
+    def _rng(self, *key):
+        return np.random.default_rng([self.seed, *key])
+
+    def gesture(self, user):
+        rng = self._rng(0, user)
+        centers = [(0.3, 0.65), (0.7, 0.65)] if self.num_hands == 2 else [(0.5, 0.65)]
+        return np.stack([hand_pose(rng, np.add(center, rng.normal(0, 0.03, 2)), scale=0.8) for center in centers])
+
+    def stream(self, user, frames, session=0, impostor=False, jitter=0.003, shift=0.004, missing=0.0):
+        # (frames, hands, 21, 3) landmarks of one recording. Genuine streams are the user's gesture with a
+        # per-session placement offset and per-frame tracking jitter; impostor streams come from another,
+        # seeded user. `missing` is the fraction of frames where tracking lost the hands (NaN rows).
+        rng = self._rng(1, user, session, int(impostor))
+        source = self.gesture(user if not impostor else 1_000_000 + user)
+        offset = rng.normal(0, shift, size=(1, 1, 1, 3)).astype(np.float32)
+        offset[..., 2] = 0
+        scale = 1 + rng.normal(0, shift)
+        landmarks = (source[None] - 0.5) * scale + 0.5 + offset
+        landmarks = landmarks + rng.normal(0, jitter, size=(frames,) + source.shape).astype(np.float32)
+        if missing:
+            landmarks[rng.random(frames) < missing] = np.nan
+        return landmarks.astype(np.float32)
+
+    def templates(self, users, features, chunk=4096):
+        # Enrolment templates for users [0, users): features(landmarks) of each gesture, built in chunks.
+        out = []
+        for start in range(0, users, chunk):
+            poses = np.stack([self.gesture(user) for user in range(start, min(start + chunk, users))])
+            out.append(features(poses))
+        return np.concatenate(out).astype(np.float32)
+
+    def template_stacks(self, users, features, k=3, jitter=0.003, chunk=4096):
+        # (users, k, dim) templates as multi-template enrolment stores them: each user's gesture under k
+        # seeded draws of tracking jitter, so the templates spread around the gesture like cluster centres.
+        out = []
+        for start in range(0, users, chunk):
+            poses = np.stack([self.gesture(user) for user in range(start, min(start + chunk, users))])
+            noise = self._rng(2, start).normal(0, jitter, size=(len(poses), k) + poses.shape[1:])
+            stacks = (poses[:, None] + noise.astype(np.float32)).reshape((-1,) + poses.shape[1:])
+            out.append(features(stacks).reshape(len(poses), k, -1))
+        return np.concatenate(out).astype(np.float32)
+
+
+class Landmark:
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, x, y, z):
+        self.x, self.y, self.z = x, y, z
+
+
+class HandLandmarks:
+    # Stand-in with the attribute layout of MediaPipe's NormalizedLandmarkList (hand.landmark[i].x).
+    __slots__ = ("landmark",)
+
+    def __init__(self, points):
+        self.landmark = [Landmark(float(x), float(y), float(z)) for x, y, z in points]
+
+
+def as_mediapipe(hands):
+    # MediaPipe protobufs when mediapipe is importable, else the plain stand-in above.
+    try:
+        from mediapipe.framework.formats import landmark_pb2
+    except ImportError:
+        return [HandLandmarks(points) for points in hands]
+    out = []
+    for points in hands:
+        proto = landmark_pb2.NormalizedLandmarkList()
+        for x, y, z in points:
+            proto.landmark.add(x=float(x), y=float(y), z=float(z))
+        out.append(proto)
+    return out
@@ -0,0 +1,310 @@
+import threading
+import time
+from collections import OrderedDict
+from pipeline import LatestSlot
+
+PENDING = object()
+
+
+class CameraBusy(RuntimeError):
+    pass
+
+
+class CameraLease:
+    # One session's handle on the shared camera. It has the read/isOpened interface of a FrameSource, so
+    # the capture loops run on it unchanged. read() returns False once the lease is cancelled, runs past
+    # its timeout, sees no frame for frame_timeout seconds, or the device goes away.
+    def __init__(self, arbiter, source, exclusive, timeout=None, frame_timeout=5.0):
+        self.arbiter = arbiter
+        self.source = source
+        self.exclusive = exclusive
+        self.realtime = getattr(source, "realtime", True)
+        self.provides_landmarks = getattr(source, "provides_landmarks", False)
+        self.preprocessed = getattr(source, "preprocessed", False)
+        self.deadline = None if timeout is None else time.perf_counter() + timeout
+        self.frame_timeout = frame_timeout
+        self.slot = LatestSlot()
+        self.waiting = False
+        self.cancelled = False
+        self.reason = None
+        self.frames = 0
+        self.seq = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+    @property
+    def dropped(self):
+        return self.slot.dropped
+
+    def tracker(self, max_num_hands=2):
+        return self.source.tracker(max_num_hands)
+
+    def set(self, prop, value):
+        return self.source.set(prop, value)
+
+    def _end(self, reason):
+        if self.reason is None:
+            self.reason = reason
+        return False, None
+
+    def isOpened(self):
+        return self.reason is None and not self.cancelled
+
+    def read(self):
+        if self.cancelled:
+            return self._end("cancelled")
+        wait = self.frame_timeout
+        if self.deadline is not None:
+            remaining = self.deadline - time.perf_counter()
+            if remaining <= 0:
+                return self._end("timeout")
+            wait = remaining if wait is None else min(wait, remaining)
+        self.arbiter._request(self)
+        item = self.slot.get(wait)
+        self.waiting = False
+        if self.cancelled:
+            return self._end("cancelled")
+        if item is None:
+            if self.slot.closed:
+                return self._end("closed")
+            if self.deadline is not None and time.perf_counter() >= self.deadline:
+                return self._end("timeout")
+            return self._end("stalled")
+        self.seq, frame = item
+        self.frames += 1
+        return True, frame
+
+    def cancel(self, reason="cancelled"):
+        self.cancelled = True
+        self.reason = self.reason or reason
+        self.slot.close()
+
+    def release(self):
+        self.arbiter.release(self)
+
+
+class SharedResults:
+    # Hand-tracking results of the last few frames. Shared sessions see the same frames, so the first
+    # session to reach a frame runs inference and the others wait for and reuse its result.
+    def __init__(self, size=8):
+        self.size = size
+        self._cond = threading.Condition()
+        self._results = OrderedDict()
+        self.computed = 0
+        self.reused = 0
+
+    def get(self, key, compute):
+        with self._cond:
+            self._cond.wait_for(lambda: self._results.get(key) is not PENDING)
+            if key in self._results:
+                self.reused += 1
+                return self._results[key]
+            self._results[key] = PENDING
+        try:
+            value = compute()
+        except BaseException:
+            with self._cond:
+                del self._results[key]
+                self._cond.notify_all()
+            raise
+        with self._cond:
+            self._results[key] = value
+            self.computed += 1
+            while len(self._results) > self.size:
+                oldest = next(iter(self._results))
+                if self._results[oldest] is PENDING:
+                    break
+                del self._results[oldest]
+            self._cond.notify_all()
+        return value
+
+
+class SharedHands:
+    # Wraps a session's Hands so frames another shared session already processed are not run again.
+    def __init__(self, hands, lease, results, key):
+        self.hands = hands
+        self.lease = lease
+        self.results = results
+        self.key = key
+
+    def __enter__(self):
+        self.hands.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self.hands.__exit__(*exc)
+
+    def __getattr__(self, name):
+        return getattr(self.hands, name)
+
+    def process(self, image):
+        return self.results.get((self.key, self.lease.seq), lambda: self.hands.process(image))
+
+
+class CameraArbiter:
+    # Owns the frame source and the single capture loop. Sessions take leases: an exclusive lease waits
+    # until the camera is free, shared leases run side by side and get the same frames. A live camera is
+    # read by one thread whenever a session asks for a frame, and each session only sees the newest one;
+    # replays and files advance in lockstep once every session has taken the previous frame, so none is
+    # skipped. With no leases left the device stays open for idle_release seconds, then it is released.
+    def __init__(self, open_source, idle_release=30.0):
+        self.open_source = open_source
+        self.idle_release = idle_release
+        self.source = None
+        self.leases = []
+        self._cond = threading.Condition()
+        self._read_lock = threading.Lock()
+        self._thread = None
+        self._stop = False
+        self._idle_since = None
+        self.results = SharedResults()
+        self.opens = 0
+        self.frames = 0
+
+    def _ensure_open(self):
+        if self.source is None or not self.source.isOpened():
+            self.source = self.open_source()
+            self.opens += 1
+        if self._thread is None or not self._thread.is_alive():
+            self._stop = False
+            self._thread = threading.Thread(target=self._loop, name="camera-arbiter", daemon=True)
+            self._thread.start()
+        if not self.leases:
+            self._idle_since = time.perf_counter()
+
+    def open(self):
+        # Opens the device ahead of the first session (warm-up); the idle-release clock starts now.
+        with self._cond:
+            self._ensure_open()
+            return self.source
+
+    def _available(self, exclusive):
+        if exclusive:
+            return not self.leases
+        return not any(lease.exclusive for lease in self.leases)
+
+    def acquire(self, exclusive=True, wait=0.0, timeout=None, frame_timeout=5.0):
+        # wait: seconds to wait for a conflicting session to finish (None waits forever), else CameraBusy.
+        # timeout: the lease ends by itself after this many seconds.
+        deadline = None if wait is None else time.perf_counter() + wait
+        with self._cond:
+            while not self._available(exclusive):
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    raise CameraBusy("The camera is in use by another session")
+                self._cond.wait(remaining)
+            self._ensure_open()
+            lease = CameraLease(self, self.source, exclusive, timeout, frame_timeout)
+            self.leases.append(lease)
+            self._idle_since = None
+            self._cond.notify_all()
+            return lease
+
+    def release(self, lease):
+        with self._cond:
+            if lease in self.leases:
+                self.leases.remove(lease)
+                if not self.leases:
+                    self._idle_since = time.perf_counter()
+            lease.slot.close()
+            self._cond.notify_all()
+
+    def cancel_all(self, reason="cancelled"):
+        with self._cond:
+            leases = list(self.leases)
+        for lease in leases:
+            lease.cancel(reason)
+
+    def _request(self, lease):
+        if lease.realtime:
+            with self._cond:
+                if lease.slot.depth() == 0:
+                    lease.waiting = True
+                    self._cond.notify_all()
+            return
+        # Replays and files: the session asking reads the next frame itself once every session has
+        # taken the previous one, which saves a thread hand-off per frame.
+        with self._read_lock:
+            with self._cond:
+                source = self.source
+                leases = list(self.leases)
+                if source is not lease.source or any(other.slot.depth() for other in leases):
+                    return
+            self._deliver(source, leases)
+
+    def _deliver(self, source, leases):
+        ok, frame = source.read()
+        if not ok:
+            with self._cond:
+                for lease in self.leases:
+                    lease.slot.close()
+                if self.source is source:
+                    self._close_source()
+                    self._cond.notify_all()
+            return False
+        self.frames += 1
+        for lease in leases:
+            lease.slot.put((self.frames, frame))
+        return True
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._stop and self.source is not None:
+                    if any(lease.waiting for lease in self.leases):
+                        break
+                    timeout = None
+                    if not self.leases and self._idle_since is not None:
+                        timeout = self._idle_since + self.idle_release - time.perf_counter()
+                        if timeout <= 0:
+                            self._close_source()
+                            break
+                    self._cond.wait(timeout)
+                if self._stop or self.source is None:
+                    self._thread = None
+                    return
+                source = self.source
+                leases = list(self.leases)
+                for lease in leases:
+                    lease.waiting = False
+            if not self._deliver(source, leases):
+                with self._cond:
+                    if self._thread is threading.current_thread():
+                        self._thread = None
+                return
+
+    def _close_source(self):
+        if self.source is not None:
+            self.source.release()
+            self.source = None
+
+    def close(self):
+        # Ends every session and releases the device now.
+        self.cancel_all("closed")
+        with self._cond:
+            self._stop = True
+            thread = self._thread
+            self._cond.notify_all()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=2)
+        with self._cond:
+            self._close_source()
+            self._thread = None
+
+    def stats(self):
+        with self._cond:
+            return {
+                "open": self.source is not None,
+                "opens": self.opens,
+                "frames": self.frames,
+                "leases": len(self.leases),
+                "exclusive": any(lease.exclusive for lease in self.leases),
+                "inference_computed": self.results.computed,
+                "inference_reused": self.results.reused,
+                "dropped": {id(lease): lease.dropped for lease in self.leases},
+            }
@@ -0,0 +1,304 @@
+import argparse
+import sys
+import numpy as np
+from gesture_gallery import MAX_DISTANCE, GestureGallery, distance_to_similarity
+from multi_template import user_templates
+
+MODES = {False: "one_hand", True: "two_hands"}
+INT8_MAX = 127
+
+
+class CompactModel:
+    # PCA projection + per-component quantization + a calibration that maps reduced-space distances
+    # back onto the full-dimensional distance, so scores stay on the calculate_gesture_similarity scale.
+    def __init__(self, mean, components, kind="int8", scales=None, gain=1.0, offset=0.0):
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.components = np.asarray(components, dtype=np.float32)
+        self.kind = kind
+        self.scales = None if scales is None else np.asarray(scales, dtype=np.float32)
+        self.gain = float(gain)
+        self.offset = float(offset)
+
+    @property
+    def dim(self):
+        return len(self.components)
+
+    @property
+    def dtype(self):
+        return np.int8 if self.kind == "int8" else np.float16
+
+    @classmethod
+    def fit(cls, features, kind="int8", variance=0.99, max_components=None):
+        features = np.asarray(features, dtype=np.float64)
+        mean = features.mean(axis=0)
+        _, singular, vt = np.linalg.svd(features - mean, full_matrices=False)
+        explained = np.cumsum(singular ** 2) / max(np.sum(singular ** 2), 1e-12)
+        k = int(np.searchsorted(explained, variance) + 1)
+        if max_components is not None:
+            k = min(k, max_components)
+        k = max(1, min(k, len(vt)))
+        model = cls(mean, vt[:k], kind)
+        if kind == "int8":
+            # Symmetric per-component scale, with headroom beyond the training range.
+            spread = np.abs(model.project(features)).max(axis=0)
+            model.scales = (1.25 * np.maximum(spread, 1e-6) / INT8_MAX).astype(np.float32)
+        model.calibrate(features)
+        return model
+
+    def project(self, features):
+        return (np.asarray(features, dtype=np.float32) - self.mean) @ self.components.T
+
+    def encode(self, features):
+        projected = self.project(features)
+        if self.kind == "int8":
+            return np.clip(np.rint(projected / self.scales), -INT8_MAX, INT8_MAX).astype(np.int8)
+        return projected.astype(np.float16)
+
+    def decode(self, codes):
+        values = np.asarray(codes).astype(np.float32)
+        return values * self.scales if self.kind == "int8" else values
+
+    def calibrate(self, features, pairs=20000, seed=0):
+        # Least squares fit of d_full^2 ~ gain * d_reduced^2 + offset; the offset absorbs the variance left
+        # in the discarded components. Half the pairs are neighbouring rows (frames of one recording, so
+        # genuine-like distances near the threshold), half are random; only pairs that land on the scored
+        # part of the scale (d < MAX_DISTANCE) are fitted, when there are enough of them.
+        features = np.asarray(features, dtype=np.float64)
+        if len(features) < 2:
+            return self
+        rng = np.random.default_rng(seed)
+        i = rng.integers(0, len(features) - 1, pairs)
+        j = np.where(np.arange(pairs) % 2 == 0, i + 1, rng.integers(0, len(features), pairs))
+        full = np.sum((features[i] - features[j]) ** 2, axis=1)
+        codes = self.decode(self.encode(features))
+        reduced = np.sum((codes[i].astype(np.float64) - self.project(features[j])) ** 2, axis=1)
+        scored = full < MAX_DISTANCE ** 2
+        if scored.sum() >= 100:
+            full, reduced = full[scored], reduced[scored]
+        design = np.stack([reduced, np.ones_like(reduced)], axis=1)
+        (gain, offset), *_ = np.linalg.lstsq(design, full, rcond=None)
+        self.gain, self.offset = float(max(gain, 1e-6)), float(max(offset, 0.0))
+        return self
+
+    def distances(self, reduced_sq):
+        return np.sqrt(np.maximum(self.gain * reduced_sq + self.offset, 0))
+
+    def to_arrays(self, prefix):
+        arrays = {f"{prefix}mean": self.mean, f"{prefix}components": self.components,
+                  f"{prefix}calibration": np.array([self.gain, self.offset]), f"{prefix}kind": np.array(self.kind)}
+        if self.scales is not None:
+            arrays[f"{prefix}scales"] = self.scales
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix):
+        gain, offset = arrays[f"{prefix}calibration"]
+        scales = arrays[f"{prefix}scales"] if f"{prefix}scales" in arrays else None
+        return cls(arrays[f"{prefix}mean"], arrays[f"{prefix}components"], str(arrays[f"{prefix}kind"]),
+                   scales, gain, offset)
+
+
+def save_models(path, models):
+    arrays = {}
+    for two_hands, model in models.items():
+        arrays.update(model.to_arrays(MODES[two_hands] + "_"))
+    with open(path, "wb") as f:
+        np.savez(f, **arrays)
+
+
+def load_models(path):
+    with np.load(path) as arrays:
+        arrays = dict(arrays)
+    return {two_hands: CompactModel.from_arrays(arrays, name + "_")
+            for two_hands, name in MODES.items() if f"{name}_mean" in arrays}
+
+
+class CompactMatrix:
+    # TemplateMatrix counterpart holding quantized codes: int8 templates are k bytes instead of 4 * dim.
+    def __init__(self, model, capacity=64):
+        self.model = model
+        self.names = []
+        self.rows = {}
+        self.codes = np.empty((capacity, model.dim), dtype=model.dtype)
+        self.sq_norms = np.empty(capacity, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.rows
+
+    def _grow(self, capacity):
+        codes = np.empty((capacity, self.model.dim), dtype=self.model.dtype)
+        sq_norms = np.empty(capacity, dtype=np.float32)
+        size = len(self.names)
+        codes[:size] = self.codes[:size]
+        sq_norms[:size] = self.sq_norms[:size]
+        self.codes, self.sq_norms = codes, sq_norms
+
+    def add(self, name, template):
+        row = self.rows.get(name)
+        if row is None:
+            self.extend([name], np.asarray(template)[None])
+            return
+        self.codes[row] = self.model.encode(np.asarray(template)[None])[0]
+        decoded = self.model.decode(self.codes[row:row + 1])[0]
+        self.sq_norms[row] = decoded @ decoded
+
+    def extend(self, names, templates):
+        size = len(self.names)
+        needed = size + len(names)
+        if needed > len(self.codes):
+            self._grow(max(needed, 2 * len(self.codes)))
+        self.codes[size:needed] = self.model.encode(templates)
+        decoded = self.model.decode(self.codes[size:needed])
+        self.sq_norms[size:needed] = np.einsum("ij,ij->i", decoded, decoded)
+        for row, name in enumerate(names, size):
+            self.rows[name] = row
+        self.names.extend(names)
+
+    def remove(self, name):
+        row = self.rows.pop(name, None)
+        if row is None:
+            return
+        last = len(self.names) - 1
+        if row != last:
+            moved = self.names[last]
+            self.codes[row] = self.codes[last]
+            self.sq_norms[row] = self.sq_norms[last]
+            self.names[row] = moved
+            self.rows[moved] = row
+        self.names.pop()
+
+    def search(self, probe, top_k=5, chunk=4096):
+        size = len(self.names)
+        if size == 0:
+            return []
+        projected = self.model.project(np.asarray(probe)[None])[0]
+        # int8: ||s*q - p||^2 = ||s*q||^2 - 2 q.(s*p) + ||p||^2, so the probe absorbs the scales.
+        weighted = projected * self.model.scales if self.model.kind == "int8" else projected
+        d2 = np.empty(size, dtype=np.float32)
+        # Codes are widened a cache-sized block at a time into one reused buffer.
+        buffer = np.empty((min(chunk, size), self.model.dim), dtype=np.float32)
+        for start in range(0, size, chunk):
+            stop = min(start + chunk, size)
+            block = buffer[:stop - start]
+            np.copyto(block, self.codes[start:stop], casting="unsafe")
+            np.dot(block, weighted, out=d2[start:stop])
+        d2 = self.sq_norms[:size] - 2 * d2 + projected @ projected
+        top_k = min(top_k, size)
+        candidates = np.argpartition(d2, top_k - 1)[:top_k] if top_k < size else np.arange(size)
+        order = candidates[np.argsort(d2[candidates])]
+        scores = distance_to_similarity(self.model.distances(np.maximum(d2[order], 0)))
+        return [(self.names[i], float(s)) for i, s in zip(order, scores)]
+
+
+class CompactGallery(GestureGallery):
+    # Drop-in for GestureGallery; modes without a fitted model keep full float32 templates.
+    def __init__(self, models):
+        self.models = models
+        super().__init__()
+
+    def _matrix(self, two_hands):
+        model = self.models.get(two_hands)
+        return CompactMatrix(model) if model is not None else super()._matrix(two_hands)
+
+
+def training_features(users, sessions=None):
+    # Recorded session frames when available (they cover within-user variation), otherwise the templates.
+    data = {False: [], True: []}
+    if sessions:
+        from evaluate import load_corpus
+        for num_hands, group in load_corpus(sessions).items():
+            data[num_hands == 2].extend(group["features"])
+    for user in users.values():
+        data[user.get("two_hands", True)].append(user_templates(user).astype(np.float64))
+    return {mode: np.concatenate(chunks) for mode, chunks in data.items() if chunks}
+
+
+def compare(models, root, probes_per_session=20):
+    # Scores recorded frames against every session template in both spaces and reports how far the
+    # compact scores drift from the full-dimensional ones.
+    from evaluate import load_corpus, pairwise_distances
+    report = {}
+    for num_hands, group in sorted(load_corpus(root).items()):
+        two_hands = num_hands == 2
+        model = models.get(two_hands)
+        if model is None:
+            continue
+        templates = np.stack([f.mean(axis=0) for f in group["features"]]).astype(np.float32)
+        _, labels = np.unique(group["labels"], return_inverse=True)
+        probes = np.concatenate([f[::max(1, len(f) // probes_per_session)] for f in group["features"]])
+        probe_labels = np.concatenate([np.full(len(f[::max(1, len(f) // probes_per_session)]), label)
+                                       for f, label in zip(group["features"], labels)])
+        matrix = CompactMatrix(model)
+        matrix.extend(list(range(len(templates))), templates)
+        decoded = model.decode(matrix.codes[:len(templates)])
+        errors, agree, top1, correct_full, correct_compact = [], 0, 0, 0, 0
+        pairs = len(probes) * len(templates)
+        for start in range(0, len(probes), 1024):
+            chunk = probes[start:start + 1024].astype(np.float32)
+            full = distance_to_similarity(pairwise_distances(chunk, templates))
+            reduced = pairwise_distances(model.project(chunk), decoded) ** 2
+            compact = distance_to_similarity(model.distances(reduced))
+            # Pairs both spaces score 0 would only dilute the error.
+            scored = (full > 0) | (compact > 0)
+            errors.append(np.abs(full - compact)[scored])
+            agree += int(np.sum((full >= 75) == (compact >= 75)))
+            best_full, best_compact = full.argmax(axis=1), compact.argmax(axis=1)
+            top1 += int(np.sum(best_full == best_compact))
+            truth = probe_labels[start:start + 1024]
+            correct_full += int(np.sum(labels[best_full] == truth))
+            correct_compact += int(np.sum(labels[best_compact] == truth))
+        errors = np.concatenate(errors)
+        report[MODES[two_hands]] = {
+            "components": model.dim,
+            "kind": model.kind,
+            "bytes_per_template": model.dim * np.dtype(model.dtype).itemsize,
+            "full_bytes_per_template": templates.shape[1] * 4,
+            "mean_abs_score_error": float(errors.mean()),
+            "p99_abs_score_error": float(np.percentile(errors, 99)),
+            "decision_agreement_at_75": agree / pairs,
+            "top1_agreement": top1 / len(probes),
+            "identification_accuracy_full": correct_full / len(probes),
+            "identification_accuracy_compact": correct_compact / len(probes),
+        }
+    return report
+
+
+def main():
+    from template_store import TemplateStore
+    parser = argparse.ArgumentParser(description="Fit a PCA + quantized template model for compact matching")
+    parser.add_argument("store_path", nargs="?", default="users_db")
+    parser.add_argument("--sessions", help="directory of recorded .gls sessions used to fit and check the model")
+    parser.add_argument("--kind", choices=["int8", "float16"], default="int8")
+    parser.add_argument("--variance", type=float, default=0.99, help="fraction of variance the projection keeps")
+    parser.add_argument("--max-components", type=int, default=None)
+    parser.add_argument("--output", default=None, help="model file (default: <store_path>/compact.npz)")
+    args = parser.parse_args()
+    store = TemplateStore(args.store_path)
+    users = store.load()
+    store.close()
+    data = training_features(users, args.sessions)
+    if not data:
+        print("No templates or sessions to fit on.")
+        return 1
+    models = {mode: CompactModel.fit(features, args.kind, args.variance, args.max_components)
+              for mode, features in data.items() if len(features) >= 2}
+    output = args.output or f"{args.store_path}/compact.npz"
+    save_models(output, models)
+    for mode, model in models.items():
+        print(f"{MODES[mode]}: {model.dim} components ({model.kind}), fitted on {len(data[mode])} vectors")
+    if args.sessions:
+        for mode, stats in compare(models, args.sessions).items():
+            print(f"{mode}: {stats['bytes_per_template']} vs {stats['full_bytes_per_template']} bytes per template, "
+                  f"score error mean {stats['mean_abs_score_error']:.2f} / p99 {stats['p99_abs_score_error']:.2f}, "
+                  f"decisions agree {100 * stats['decision_agreement_at_75']:.2f}%, "
+                  f"top-1 agrees {100 * stats['top1_agreement']:.2f}%, identification accuracy "
+                  f"{100 * stats['identification_accuracy_compact']:.2f}% vs {100 * stats['identification_accuracy_full']:.2f}%")
+    print(f"Saved {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
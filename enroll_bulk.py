@@ -0,0 +1,209 @@
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+from multiprocessing import Pool
+import cv2
+import numpy as np
+from frame_sources import IMAGE_EXTENSIONS, VideoFileSource
+from gesture_features import batch_features, feature_size, multi_landmarks_to_array
+from landmark_session import SESSION_EXTENSION, load_session
+from multi_template import ADAPTED, enrol_templates
+from template_store import TemplateStore
+from temporal import resample_sequence
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".webm")
+
+_worker = {}
+
+
+def is_recording(path):
+    if os.path.isdir(path):
+        return any(name.lower().endswith(IMAGE_EXTENSIONS) for name in os.listdir(path))
+    return path.lower().endswith(VIDEO_EXTENSIONS + (SESSION_EXTENSION,))
+
+
+def find_jobs(root):
+    # root/<user>/<recording> or root/<user>.<ext>; a recording is a video, an image directory or a .gls session.
+    jobs = []
+    for name in sorted(os.listdir(root)):
+        path = os.path.join(root, name)
+        if os.path.isdir(path) and not is_recording(path):
+            jobs.extend((name, os.path.join(path, r)) for r in sorted(os.listdir(path))
+                        if is_recording(os.path.join(path, r)))
+        elif is_recording(path):
+            jobs.append((os.path.splitext(name)[0], path))
+    return jobs
+
+
+def _init_worker(two_hands, flip):
+    # One Hands graph per worker process, built once and reset between recordings.
+    # OpenCV's own thread pool would compete with the other workers for cores.
+    cv2.setNumThreads(1)
+    _worker["two_hands"] = two_hands
+    _worker["flip"] = flip
+    _worker["hands"] = None
+
+
+def _hands():
+    if _worker["hands"] is None:
+        import mediapipe as mp
+        _worker["hands"] = mp.solutions.hands.Hands(
+            max_num_hands=2 if _worker["two_hands"] else 1,
+            min_detection_confidence=0.7,
+            min_tracking_confidence=0.7
+        )
+    return _worker["hands"]
+
+
+def video_landmarks(path, num_hands, flip):
+    hands = _hands()
+    hands.reset()
+    source = VideoFileSource(path).open()
+    landmarks = []
+    frames = 0
+    try:
+        while source.isOpened():
+            ok, frame = source.read()
+            if not ok:
+                break
+            frames += 1
+            if flip:
+                frame = cv2.flip(frame, 1)
+            result = hands.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            hand_array = multi_landmarks_to_array(result.multi_hand_landmarks, num_hands)
+            if hand_array is not None:
+                landmarks.append(hand_array)
+    finally:
+        source.release()
+    if not landmarks:
+        return np.empty((0, num_hands, 21, 3), dtype=np.float32), frames
+    return np.stack(landmarks), frames
+
+
+def session_landmarks(path, num_hands):
+    session = load_session(path)
+    if session["num_hands"] < num_hands:
+        return np.empty((0, num_hands, 21, 3), dtype=np.float32), len(session["landmarks"])
+    landmarks = session["landmarks"][:, :num_hands]
+    valid = ~np.isnan(landmarks).any(axis=(1, 2, 3))
+    return landmarks[valid], len(session["landmarks"])
+
+
+def process_job(job):
+    user, path = job
+    start = time.perf_counter()
+    num_hands = 2 if _worker["two_hands"] else 1
+    if path.endswith(SESSION_EXTENSION):
+        landmarks, frames = session_landmarks(path, num_hands)
+    else:
+        landmarks, frames = video_landmarks(path, num_hands, _worker["flip"])
+    features = batch_features(landmarks).astype(np.float32) if len(landmarks) else np.empty((0, feature_size(num_hands)), np.float32)
+    return user, path, features, frames, time.perf_counter() - start
+
+
+def build_templates(features_by_user, two_hands, min_frames):
+    # features_by_user: {user: [features of each recording]}.
+    users, skipped = {}, {}
+    for user, chunks in features_by_user.items():
+        features = np.concatenate(chunks).astype(np.float64)
+        if len(features) < min_frames:
+            skipped[user] = len(features)
+            continue
+        users[user] = {
+            "gesture": features.mean(axis=0).tolist(),
+            "variance": features.var(axis=0, ddof=1).tolist(),
+            "two_hands": two_hands,
+        }
+        users[user].update(enrol_templates(features))
+    return users, skipped
+
+
+def merge_record(existing, record, recordings, keep_adapted=True):
+    # Rebuilt fields replace the old ones; everything else in the stored record carries over.
+    if not existing:
+        return record
+    user = dict(existing)
+    user.update(record)
+    if existing.get("sequence") is not None and recordings:
+        # Dynamic users: the motion is rebuilt from their first recording, in the current feature space.
+        motion = np.asarray(recordings[0], dtype=np.float64)
+        user["sequence"] = resample_sequence(motion)
+        user["sequence_frames"] = len(motion)
+    templates = existing.get("templates")
+    origin = existing.get("template_origin")
+    if keep_adapted and templates is not None and origin is not None:
+        templates = np.asarray(templates, dtype=np.float32)
+        adapted = np.asarray(origin) == ADAPTED
+        if adapted.any() and templates.shape[1] == len(record["gesture"]):
+            # Templates learned from logins stay, with their usage history.
+            user["templates"] = np.vstack([record["templates"], templates[adapted]])
+            user["template_origin"] = np.concatenate([record["template_origin"], np.asarray(origin)[adapted]])
+            user["template_last_used"] = np.concatenate([record["template_last_used"],
+                                                         np.asarray(existing["template_last_used"])[adapted]])
+            user["logins"] = existing.get("logins", 0)
+    return user
+
+
+def enroll(root, store_path="users_db", workers=None, two_hands=True, flip=True, min_frames=60, progress=print,
+           keep_adapted=True):
+    # keep_adapted=False drops templates learned from logins, e.g. after the feature definitions changed.
+    jobs = find_jobs(root)
+    recordings = {user: {} for user, _ in jobs}
+    frames = 0
+    start = time.perf_counter()
+    with Pool(workers or os.cpu_count(), initializer=_init_worker, initargs=(two_hands, flip)) as pool:
+        for done, (user, path, features, job_frames, seconds) in enumerate(pool.imap_unordered(process_job, jobs), 1):
+            recordings[user][path] = features
+            frames += job_frames
+            if progress is not None:
+                elapsed = time.perf_counter() - start
+                progress(f"[{done}/{len(jobs)}] {user}: {os.path.basename(path)} {len(features)}/{job_frames} frames "
+                         f"in {seconds:.1f}s | {frames / elapsed:.1f} frames/s overall")
+    # Recordings in path order, whatever order the workers finished in.
+    features_by_user = {user: [by_path[path] for path in sorted(by_path)] for user, by_path in recordings.items()}
+    users, skipped = build_templates(features_by_user, two_hands, min_frames)
+    store = TemplateStore(store_path)
+    existing = store.load()
+    now = datetime.now().isoformat()
+    for user, record in users.items():
+        record["created_at"] = existing.get(user, {}).get("created_at", now)
+        record["rebuilt_at"] = now
+        usable = [chunk for chunk in features_by_user[user] if len(chunk)]
+        users[user] = merge_record(existing.get(user), record, usable, keep_adapted)
+    store.put_many(users)
+    store.close()
+    elapsed = time.perf_counter() - start
+    return {
+        "recordings": len(jobs),
+        "users": len(users),
+        "skipped": skipped,
+        "frames": frames,
+        "seconds": elapsed,
+        "frames_per_second": frames / elapsed if elapsed else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild user templates from enrolment videos or landmark sessions")
+    parser.add_argument("recordings", help="directory with one sub-directory (or file) per user")
+    parser.add_argument("store_path", nargs="?", default="users_db")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--one-hand", action="store_true", help="build one-hand templates")
+    parser.add_argument("--no-flip", action="store_true", help="videos are already mirrored like the live preview")
+    parser.add_argument("--min-frames", type=int, default=60)
+    parser.add_argument("--drop-adapted", action="store_true",
+                        help="discard templates learned from logins (use after changing the feature definitions)")
+    args = parser.parse_args()
+    summary = enroll(args.recordings, args.store_path, args.workers, not args.one_hand, not args.no_flip, args.min_frames,
+                     keep_adapted=not args.drop_adapted)
+    for user, count in sorted(summary["skipped"].items()):
+        print(f"Skipped {user}: only {count} usable frames")
+    print(f"Enrolled {summary['users']} users from {summary['recordings']} recordings: {summary['frames']} frames "
+          f"in {summary['seconds']:.1f}s ({summary['frames_per_second']:.1f} frames/s)")
+    return 0 if summary["users"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
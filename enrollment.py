@@ -0,0 +1,52 @@
+import numpy as np
+
+
+class StreamingTemplate:
+    # Running mean/variance (Welford) over enrolment frames, kept in a preallocated float32 buffer.
+    def __init__(self, dim, capacity=256, tolerance=None, check_every=10, patience=2):
+        self.dim = dim
+        self.frames = np.empty((capacity, dim), dtype=np.float32)
+        self.count = 0
+        self.mean = np.zeros(dim, dtype=np.float64)
+        self._m2 = np.zeros(dim, dtype=np.float64)
+        self.tolerance = tolerance
+        self.check_every = check_every
+        self.patience = patience
+        self._checkpoint = None
+        self._stable_checks = 0
+        self.drift = None
+
+    def add(self, features):
+        if self.count == len(self.frames):
+            frames = np.empty((2 * len(self.frames), self.dim), dtype=np.float32)
+            frames[:self.count] = self.frames
+            self.frames = frames
+        self.frames[self.count] = features
+        self.count += 1
+        delta = features - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (features - self.mean)
+        if self.count % self.check_every == 0:
+            self._check()
+
+    def _check(self):
+        # Converged once the mean has moved less than `tolerance` (L2) across `patience` checks in a row.
+        if self._checkpoint is not None:
+            self.drift = float(np.linalg.norm(self.mean - self._checkpoint))
+            if self.tolerance is not None and self.drift < self.tolerance:
+                self._stable_checks += 1
+            else:
+                self._stable_checks = 0
+        self._checkpoint = self.mean.copy()
+
+    def converged(self, min_frames):
+        return self.tolerance is not None and self.count >= min_frames and self._stable_checks >= self.patience
+
+    @property
+    def variance(self):
+        if self.count < 2:
+            return np.zeros(self.dim, dtype=np.float64)
+        return self._m2 / (self.count - 1)
+
+    def recorded(self):
+        return self.frames[:self.count]
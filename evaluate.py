@@ -0,0 +1,151 @@
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+from gesture_features import batch_features
+from gesture_gallery import MAX_DISTANCE
+from landmark_session import find_sessions, load_session
+
+THRESHOLDS = np.arange(0, 100.5, 0.5)
+BIN_WIDTH = MAX_DISTANCE / 2000
+
+
+def session_features(session):
+    landmarks = session["landmarks"]
+    valid = ~np.isnan(landmarks).any(axis=(1, 2, 3))
+    if not valid.any():
+        return np.empty((0, batch_features(np.zeros((1,) + landmarks.shape[1:], np.float32)).shape[1]))
+    return batch_features(landmarks[valid])
+
+
+def load_corpus(root):
+    # Groups sessions by hand count; the user label is the header label, or the parent directory name.
+    corpus = {}
+    for path in find_sessions(root):
+        session = load_session(path)
+        features = session_features(session)
+        if len(features) == 0:
+            continue
+        label = session["label"] or os.path.basename(os.path.dirname(path))
+        group = corpus.setdefault(session["num_hands"], {"labels": [], "features": []})
+        group["labels"].append(label)
+        group["features"].append(features)
+    return corpus
+
+
+def pairwise_distances(probes, templates):
+    t_sq = np.einsum("ij,ij->i", templates, templates)
+    d2 = np.einsum("ij,ij->i", probes, probes)[:, None] + t_sq[None, :] - 2 * (probes @ templates.T)
+    return np.sqrt(np.maximum(d2, 0))
+
+
+def distance_bins(distances):
+    # Bin 0 holds exact matches, bin b the distances in ((b - 1) * BIN_WIDTH, b * BIN_WIDTH], and the last
+    # bin everything beyond MAX_DISTANCE. With upper edges inclusive, "distance <= cutoff" is a bin prefix.
+    bins = int(round(MAX_DISTANCE / BIN_WIDTH)) + 2
+    return np.minimum(np.ceil(distances / BIN_WIDTH).astype(np.int64), bins - 1), bins
+
+
+def score_pairs(group, chunk=4096):
+    # Every session's mean is a template; every frame of every *other* session is a probe against it.
+    # Distances are binned chunk by chunk, so memory stays flat however many pairs there are.
+    labels = np.array(group["labels"])
+    _, user_ids = np.unique(labels, return_inverse=True)
+    templates = np.stack([f.mean(axis=0) for f in group["features"]])
+    probes = np.concatenate(group["features"])
+    probe_session = np.repeat(np.arange(len(labels)), [len(f) for f in group["features"]])
+    bins = distance_bins(np.empty(0))[1]
+    genuine = np.zeros(bins, dtype=np.int64)
+    impostor = np.zeros(bins, dtype=np.int64)
+    sessions = np.arange(len(labels))
+    for start in range(0, len(probes), chunk):
+        session = probe_session[start:start + chunk]
+        distances = pairwise_distances(probes[start:start + chunk], templates)
+        index, _ = distance_bins(distances)
+        other = session[:, None] != sessions[None, :]
+        same_user = user_ids[session][:, None] == user_ids[None, :]
+        genuine += np.bincount(index[other & same_user], minlength=bins)
+        impostor += np.bincount(index[other & ~same_user], minlength=bins)
+    return genuine, impostor
+
+
+def error_curves(genuine, impostor, thresholds=THRESHOLDS):
+    # score >= threshold  <=>  distance <= (1 - threshold / 100) * MAX_DISTANCE, i.e. bins up to and including
+    # the cutoff bin. Scores are clamped at 0, so a threshold of 0 also accepts the last bin (beyond MAX_DISTANCE).
+    cutoff_bins = np.round((1 - thresholds / 100) * MAX_DISTANCE / BIN_WIDTH).astype(np.int64)
+    cutoff_bins = np.where(thresholds <= 0, len(genuine) - 1, cutoff_bins)
+    genuine_accepted = np.cumsum(genuine)[cutoff_bins]
+    impostor_accepted = np.cumsum(impostor)[cutoff_bins]
+    frr = 1 - genuine_accepted / max(genuine.sum(), 1)
+    far = impostor_accepted / max(impostor.sum(), 1)
+    return far, frr
+
+
+def summarize(genuine, impostor, target_far):
+    far, frr = error_curves(genuine, impostor)
+    eer_index = int(np.argmin(np.abs(far - frr)))
+    allowed = np.nonzero(far <= target_far)[0]
+    # Lowest threshold that still meets the FAR target gives the lowest FRR.
+    at_target = int(allowed[0]) if len(allowed) else len(THRESHOLDS) - 1
+    genuine_cum = np.cumsum(genuine)
+    p99 = int(np.searchsorted(genuine_cum, 0.99 * genuine_cum[-1])) if genuine_cum[-1] else None
+    return {
+        "genuine_pairs": int(genuine.sum()),
+        "impostor_pairs": int(impostor.sum()),
+        "eer": float((far[eer_index] + frr[eer_index]) / 2),
+        "eer_threshold": float(THRESHOLDS[eer_index]),
+        "target_far": target_far,
+        "recommended_threshold": float(THRESHOLDS[at_target]),
+        "far_at_recommended": float(far[at_target]),
+        "frr_at_recommended": float(frr[at_target]),
+        # 99th percentile of genuine distances; a max_distance there spreads genuine scores over the 0-100 scale.
+        "genuine_distance_p99": None if p99 is None else p99 * BIN_WIDTH,
+        "curve": {
+            "threshold": THRESHOLDS.tolist(),
+            "far": far.tolist(),
+            "frr": frr.tolist(),
+        },
+    }
+
+
+def evaluate(root, target_far=0.001):
+    start = time.perf_counter()
+    corpus = load_corpus(root)
+    report = {"max_distance": MAX_DISTANCE, "modes": {}}
+    for num_hands, group in sorted(corpus.items()):
+        genuine, impostor = score_pairs(group)
+        summary = summarize(genuine, impostor, target_far)
+        summary["sessions"] = len(group["labels"])
+        summary["users"] = len(set(group["labels"]))
+        report["modes"]["two_hands" if num_hands == 2 else "one_hand"] = summary
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline FAR/FRR evaluation over recorded landmark sessions")
+    parser.add_argument("sessions", help="directory of .gls session files, one sub-directory per user")
+    parser.add_argument("--target-far", type=float, default=0.001)
+    parser.add_argument("--output", help="write the full report (with curves) as JSON")
+    args = parser.parse_args()
+    report = evaluate(args.sessions, args.target_far)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+    if not report["modes"]:
+        print("No usable sessions found.")
+        return 1
+    for mode, summary in report["modes"].items():
+        print(f"{mode}: {summary['users']} users, {summary['sessions']} sessions, "
+              f"{summary['genuine_pairs']} genuine / {summary['impostor_pairs']} impostor frame pairs")
+        print(f"  EER {100 * summary['eer']:.2f}% at threshold {summary['eer_threshold']:.1f}")
+        print(f"  threshold {summary['recommended_threshold']:.1f} for FAR <= {summary['target_far']:g}: "
+              f"FAR {100 * summary['far_at_recommended']:.3f}%, FRR {100 * summary['frr_at_recommended']:.2f}%")
+    print(f"Evaluated in {report['seconds']:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
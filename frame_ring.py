@@ -0,0 +1,242 @@
+import multiprocessing
+import time
+import cv2
+import numpy as np
+from multiprocessing import shared_memory
+from frame_sources import FrameSource
+
+# Shared block layout: int64 meta[8] | int64 slot_seq[slots] | float64 slot_time[slots] | frames[slots].
+# meta: write_seq, closed, slots, height, width, channels. Sequence numbers start at 1; a slot's
+# sequence is set to -1 while it is being written and to the frame's sequence once it is complete.
+META_FIELDS = 8
+WRITE_SEQ, CLOSED, SLOTS, HEIGHT, WIDTH, CHANNELS = range(6)
+ALIGN = 64
+
+
+def _header_size(slots):
+    size = 8 * (META_FIELDS + 2 * slots)
+    return (size + ALIGN - 1) // ALIGN * ALIGN
+
+
+def _attach(name):
+    # Before Python 3.13 (track=False) every attaching process registers the block with a resource
+    # tracker, which unlinks it when that process exits; only the creator should own the block.
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        from multiprocessing import resource_tracker
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+class RingFrame(np.ndarray):
+    # View of a ring slot that remembers which frame it shows, so whoever ends up holding it (a pipeline
+    # stage, another session) can check afterwards that the writer has not started overwriting it.
+    ring = None
+    seq = None
+
+    def __array_finalize__(self, obj):
+        self.ring = getattr(obj, "ring", None)
+        self.seq = getattr(obj, "seq", None)
+
+    def frame_valid(self):
+        return self.ring is None or self.ring.valid(self.seq)
+
+
+class FrameRing:
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner
+        self.name = shm.name
+        self.meta = np.ndarray(META_FIELDS, dtype=np.int64, buffer=shm.buf)
+        self.slots = int(self.meta[SLOTS])
+        shape = (self.slots, int(self.meta[HEIGHT]), int(self.meta[WIDTH]), int(self.meta[CHANNELS]))
+        self.slot_seq = np.ndarray(self.slots, dtype=np.int64, buffer=shm.buf, offset=8 * META_FIELDS)
+        self.slot_time = np.ndarray(self.slots, dtype=np.float64, buffer=shm.buf, offset=8 * (META_FIELDS + self.slots))
+        self.frames = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=_header_size(self.slots))
+        self.frame_shape = shape[1:]
+
+    @classmethod
+    def create(cls, shape=(480, 640, 3), slots=8, name=None):
+        height, width, channels = shape
+        size = _header_size(slots) + slots * height * width * channels
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        meta = np.ndarray(META_FIELDS, dtype=np.int64, buffer=shm.buf)
+        meta[:] = 0
+        meta[SLOTS], meta[HEIGHT], meta[WIDTH], meta[CHANNELS] = slots, height, width, channels
+        ring = cls(shm, owner=True)
+        ring.slot_seq[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name):
+        return cls(_attach(name), owner=False)
+
+    @property
+    def write_seq(self):
+        return int(self.meta[WRITE_SEQ])
+
+    @property
+    def closed(self):
+        return bool(self.meta[CLOSED])
+
+    def write(self, frame, mirror=True, to_rgb=True, timestamp=None):
+        # Same result as slot[...] = frame[:, ::-1, ::-1], done once per frame straight into the slot:
+        # the color conversion writes into shared memory and the mirror flip runs in place there,
+        # instead of cv2.flip and cvtColor allocating two new frames in every consumer.
+        seq = self.write_seq + 1
+        index = seq % self.slots
+        slot = self.frames[index]
+        if frame.shape != slot.shape:
+            frame = cv2.resize(frame, (slot.shape[1], slot.shape[0]))
+        self.slot_seq[index] = -1
+        if to_rgb:
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=slot)
+        else:
+            slot[...] = frame
+        if mirror:
+            cv2.flip(slot, 1, dst=slot)
+        self.slot_time[index] = time.perf_counter() if timestamp is None else timestamp
+        self.slot_seq[index] = seq
+        self.meta[WRITE_SEQ] = seq
+        return seq
+
+    def view(self, seq):
+        # Zero-copy, read-only view of frame `seq`, or None once the slot has moved on to a newer frame.
+        index = seq % self.slots
+        if self.slot_seq[index] != seq:
+            return None
+        frame = self.frames[index].view(RingFrame)
+        frame.flags.writeable = False
+        frame.ring = self
+        frame.seq = seq
+        return frame
+
+    def valid(self, seq):
+        # Call after using a view: False means the writer lapped the reader and the data may be torn.
+        return self.slot_seq is not None and self.slot_seq[seq % self.slots] == seq
+
+    def timestamp(self, seq):
+        return float(self.slot_time[seq % self.slots])
+
+    def close(self):
+        if self.owner:
+            self.meta[CLOSED] = 1
+        self.meta = self.slot_seq = self.slot_time = self.frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # A caller still holds a frame view; the mapping goes away once that view is released.
+            pass
+        if self.owner:
+            self.shm.unlink()
+
+
+def capture_loop(source, name, mirror=True, stop=None):
+    ring = FrameRing.attach(name)
+    cap = source.open()
+    try:
+        while cap.isOpened() and (stop is None or not stop.is_set()):
+            ok, frame = cap.read()
+            if not ok:
+                break
+            ring.write(frame, mirror=mirror)
+    finally:
+        cap.release()
+        ring.meta[CLOSED] = 1
+        ring.close()
+
+
+class RingCapture:
+    # Capture process feeding a shared-memory ring; any number of RingSource readers can attach by name.
+    def __init__(self, source, shape=(480, 640, 3), slots=8, name=None, mirror=True):
+        self.ring = FrameRing.create(shape, slots, name)
+        self.name = self.ring.name
+        self._stop = multiprocessing.Event()
+        self.process = multiprocessing.Process(target=capture_loop, args=(source, self.name, mirror, self._stop),
+                                               name=f"ring-capture-{self.name}", daemon=True)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def start(self):
+        self.process.start()
+        return self
+
+    def stop(self, timeout=2):
+        self._stop.set()
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.ring.close()
+
+
+class RingSource(FrameSource):
+    # Reads mirrored RGB frames from a ring. latest=True always jumps to the newest frame; otherwise
+    # frames are read in order and the ones the writer overwrote first are counted as dropped.
+    # stride/offset split the stream between several workers (worker k of n: stride=n, offset=k).
+    # Frames are zero-copy RingFrame views: check frame_valid() once done with one and drop it if False.
+    preprocessed = True
+
+    def __init__(self, name, latest=True, stride=1, offset=0, poll_interval=0.001):
+        super().__init__(realtime=False)
+        self.name = name
+        self.latest = latest
+        self.stride = stride
+        self.offset = offset
+        self.poll_interval = poll_interval
+        self.ring = None
+        self.seq = 0
+        self.dropped = 0
+
+    def open(self):
+        super().open()
+        if self.ring is None:
+            self.ring = FrameRing.attach(self.name)
+        self.seq = 0
+        return self
+
+    def isOpened(self):
+        return self.ring is not None
+
+    def _next_seq(self, newest):
+        if self.latest or self.seq == 0:
+            # Newest frame that belongs to this reader.
+            return newest - (newest - self.offset) % self.stride
+        seq = max(self.seq + 1, newest - self.ring.slots + 1)
+        return seq + (self.offset - seq) % self.stride
+
+    def read(self):
+        while self.ring is not None:
+            newest = self.ring.write_seq
+            if newest > self.seq:
+                seq = self._next_seq(newest)
+                if self.seq < seq <= newest:
+                    frame = self.ring.view(seq)
+                    if frame is not None:
+                        if not self.latest and self.seq:
+                            self.dropped += (seq - self.seq) // self.stride - 1
+                        self.seq = seq
+                        return True, frame
+                    continue
+            if self.ring.closed:
+                break
+            time.sleep(self.poll_interval)
+        return False, None
+
+    def frame_valid(self):
+        return self.ring is not None and self.ring.valid(self.seq)
+
+    def release(self):
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
@@ -0,0 +1,248 @@
+import os
+import sys
+import time
+import cv2
+import numpy as np
+from landmark_session import load_session
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+def camera_backends():
+    if sys.platform.startswith("win"):
+        return [cv2.CAP_DSHOW, cv2.CAP_MSMF, cv2.CAP_ANY]
+    if sys.platform == "darwin":
+        return [cv2.CAP_AVFOUNDATION, cv2.CAP_ANY]
+    return [cv2.CAP_V4L2, cv2.CAP_ANY]
+
+
+class HandResult:
+    def __init__(self, multi_hand_landmarks=None):
+        self.multi_hand_landmarks = multi_hand_landmarks
+
+
+class ReplayFrame(np.ndarray):
+    # Blank frame that carries its own landmarks, so threaded consumers never read another frame's hands.
+    landmarks = None
+
+
+def frame_valid(frame):
+    # False only for a shared-memory ring frame the writer has overwritten since it was read.
+    check = getattr(frame, "frame_valid", None)
+    return check is None or check()
+
+
+class FrameSource:
+    provides_landmarks = False
+
+    def __init__(self, realtime=True, fps=30):
+        self.realtime = realtime
+        self.fps = fps
+        self._start = None
+        self._frames = 0
+
+    def open(self):
+        self._start = None
+        self._frames = 0
+        return self
+
+    def isOpened(self):
+        return False
+
+    def read(self):
+        return False, None
+
+    def release(self):
+        pass
+
+    def set(self, prop, value):
+        return False
+
+    def _pace(self, timestamp=None):
+        # Real-time sources sleep until the frame is due; otherwise frames are served as fast as possible.
+        now = time.perf_counter()
+        if self._start is None:
+            self._start = now
+        if self.realtime:
+            due = self._start + (timestamp if timestamp is not None else self._frames / self.fps)
+            if due > now:
+                time.sleep(due - now)
+        self._frames += 1
+
+
+class CameraSource(FrameSource):
+    def __init__(self, index=0, backends=None, width=640, height=480, fps=30, warmup_frames=5):
+        super().__init__(realtime=True, fps=fps)
+        self.index = index
+        self.backends = backends
+        self.width = width
+        self.height = height
+        self.warmup_frames = warmup_frames
+        self.backend = None
+        self.cap = None
+
+    def open(self):
+        super().open()
+        if self.cap is not None and self.cap.isOpened():
+            return self
+        for backend in self.backends or camera_backends():
+            cap = cv2.VideoCapture(self.index, backend)
+            if cap.isOpened():
+                self.cap = cap
+                self.backend = backend
+                break
+            cap.release()
+        else:
+            return self
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        self.cap.set(cv2.CAP_PROP_FPS, self.fps)
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        for _ in range(self.warmup_frames):
+            self.cap.read()
+        return self
+
+    def isOpened(self):
+        return self.cap is not None and self.cap.isOpened()
+
+    def read(self):
+        if self.cap is None:
+            return False, None
+        return self.cap.read()
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    def set(self, prop, value):
+        return self.cap is not None and self.cap.set(prop, value)
+
+
+class VideoFileSource(FrameSource):
+    def __init__(self, path, realtime=False, fps=None, loop=False):
+        super().__init__(realtime=realtime, fps=fps or 30)
+        self.path = path
+        self.loop = loop
+        self._requested_fps = fps
+        self.cap = None
+        self.images = None
+        self._position = 0
+        self._released = False
+
+    def open(self):
+        super().open()
+        self._position = 0
+        self._released = False
+        if os.path.isdir(self.path):
+            self.images = sorted(
+                os.path.join(self.path, name) for name in os.listdir(self.path)
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            )
+        else:
+            self.release()
+            self.cap = cv2.VideoCapture(self.path)
+            if self._requested_fps is None:
+                self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30
+        return self
+
+    def isOpened(self):
+        if self.images is not None:
+            return not self._released and (self.loop or self._position < len(self.images))
+        return self.cap is not None and self.cap.isOpened()
+
+    def read(self):
+        if self.images is not None:
+            if self._released or not self.images or (self._position >= len(self.images) and not self.loop):
+                return False, None
+            frame = cv2.imread(self.images[self._position % len(self.images)])
+            self._position += 1
+        else:
+            if self.cap is None:
+                return False, None
+            ok, frame = self.cap.read()
+            if not ok and self.loop:
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ok, frame = self.cap.read()
+            if not ok:
+                self.release()
+                return False, None
+        self._pace()
+        return frame is not None, frame
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+        if self.images is not None:
+            self._released = True
+
+
+class LandmarkReplaySource(FrameSource):
+    # Serves recorded landmarks instead of pixels so runs skip MediaPipe entirely.
+    # landmarks: (N, hands, 21, 3) with NaN rows for frames where a hand was missing.
+    provides_landmarks = True
+
+    def __init__(self, landmarks, timestamps=None, realtime=False, fps=30, frame_shape=(480, 640, 3)):
+        super().__init__(realtime=realtime, fps=fps)
+        self.landmarks = np.asarray(landmarks, dtype=np.float32)
+        self.timestamps = None if timestamps is None else np.asarray(timestamps, dtype=np.float64)
+        self.frame = np.zeros(frame_shape, dtype=np.uint8)
+        self.current = None
+        self._position = None
+
+    @classmethod
+    def from_session(cls, path, realtime=False):
+        session = load_session(path)
+        return cls(session["landmarks"], session["timestamps"], realtime=realtime)
+
+    def open(self):
+        super().open()
+        self._position = 0
+        return self
+
+    def isOpened(self):
+        return self._position is not None and self._position < len(self.landmarks)
+
+    def read(self):
+        if not self.isOpened():
+            return False, None
+        i = self._position
+        self.current = [hand for hand in self.landmarks[i] if not np.isnan(hand).any()]
+        self._position += 1
+        timestamp = None
+        if self.timestamps is not None:
+            timestamp = self.timestamps[i] - self.timestamps[0]
+        self._pace(timestamp)
+        frame = self.frame.copy().view(ReplayFrame)
+        frame.landmarks = self.current
+        return True, frame
+
+    def release(self):
+        self._position = None
+
+    def tracker(self, max_num_hands=2):
+        return LandmarkTracker(self, max_num_hands)
+
+
+class LandmarkTracker:
+    # Stands in for mp.solutions.hands.Hands when the frame source already carries landmarks.
+    def __init__(self, source, max_num_hands):
+        self.source = source
+        self.max_num_hands = max_num_hands
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def close(self):
+        pass
+
+    def process(self, image):
+        current = getattr(image, "landmarks", None)
+        if current is None:
+            current = self.source.current
+        hands = current[:self.max_num_hands] if current else []
+        return HandResult(hands or None)
@@ -1,86 +1,197 @@
 import cv2
 import mediapipe as mp
 import numpy as np
-import json
 import os
+import time
+from collections import deque
 from datetime import datetime
+from compact import CompactGallery, load_models
+from gesture_gallery import GestureGallery, MAX_DISTANCE, distance_to_similarity
+from gesture_features import batch_features, feature_size, hand_features, two_hands_features
+from template_store import TemplateStore
+from frame_sources import CameraSource, frame_valid
+from pipeline import FramePipeline
+from hands_pool import HandsPool
+from roi_tracker import RoiHands
+from presence import FaceDetectorPool, MotionDetector, PresenceGate
+from landmark_session import SessionWriter
+from enrollment import StreamingTemplate
+from metrics import Metrics
+from multi_template import ADAPT_SCORE, MAX_TEMPLATES, adapt, enrol_templates, nearest_distances, user_templates
+from temporal import SequenceGallery, SlidingWindow, dtw_distance, resample_sequence
+from sequential import ACCEPT, SequentialTest
+from overlay import RecordOverlay, ThrottledObserver, VerifyOverlay
+from camera_arbiter import CameraArbiter, SharedHands
 
 class GestureAuthenticator:
-    def __init__(self):
+    def __init__(self, store_path="users_db", frame_source=None, pipelined=False, warm_hands=True,
+                 roi=False, inference_budget_ms=None, metrics=None, presence=None, idle_fps=2.0, idle_after=5.0, compact=None,
+                 adapt=True, adapt_score=ADAPT_SCORE, max_templates=MAX_TEMPLATES, camera_idle_release=30.0,
+                 camera_wait=0.0):
+        # metrics: True (or a Metrics instance) times every stage of the capture/match loops.
+        # presence: "motion", "face" or a detector callable; hand inference then pauses while nobody is there.
+        # compact: a model file from compact.py; identification then scores quantized PCA templates.
+        # adapt: accepted logins scoring at least adapt_score update the user's templates (max_templates each).
+        # camera_idle_release: seconds the camera stays open after the last session; camera_wait: seconds a
+        # session waits for another one to finish before raising CameraBusy (None waits forever).
         self.mp_hands = mp.solutions.hands
         self.mp_face = mp.solutions.face_detection
         self.mp_draw = mp.solutions.drawing_utils
         self.users_db = "users_db.json"
+        self.store = TemplateStore(store_path)
+        self.frame_source = frame_source if frame_source is not None else CameraSource()
         self.cap = None
+        self.camera = CameraArbiter(lambda: self.frame_source.open(), idle_release=camera_idle_release)
+        self.camera_wait = camera_wait
+        self.pipelined = pipelined
+        self.roi = roi
+        self.inference_budget_ms = inference_budget_ms
+        self.roi_hands = None
+        self.presence = presence
+        self.idle_fps = idle_fps
+        self.idle_after = idle_after
+        self.presence_gate = None
+        self.adapt = adapt
+        self.adapt_score = adapt_score
+        self.max_templates = max_templates
+        if metrics is None or isinstance(metrics, bool):
+            metrics = Metrics(enabled=bool(metrics))
+        self.metrics = metrics
+        self.pipeline = None
+        self.last_pipeline_stats = None
+        self.torn_frames = 0
+        self.gallery = CompactGallery(load_models(compact)) if compact else GestureGallery()
+        self.sequences = SequenceGallery()
+        self.hands_pool = HandsPool()
+        self.face_pool = FaceDetectorPool(self.mp_face)
+        if warm_hands and not self.frame_source.provides_landmarks:
+            self.hands_pool.warm([2, 1])
         self.load_users()
         
     def load_users(self):
-        if os.path.exists(self.users_db):
-            with open(self.users_db, 'r') as f:
-                self.users = json.load(f)
+        if not self.store.exists() and os.path.exists(self.users_db):
+            self.users = self.store.migrate_json(self.users_db)
         else:
-            self.users = {}
+            self.users = self.store.load()
+        self.gallery.rebuild(self.users)
+        self.sequences.rebuild(self.users)
             
     def save_users(self):
-        with open(self.users_db, 'w') as f:
-            json.dump(self.users, f, indent=4)
+        self.store.compact()
     
     def init_camera(self):
-        if self.cap is None or not self.cap.isOpened():
-            self.cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
-            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-            self.cap.set(cv2.CAP_PROP_FPS, 30)
-            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-            for _ in range(5):
-                self.cap.read()
+        # Opens the device ahead of the first session; it is released again after camera_idle_release.
+        self.cap = self.camera.open()
         return self.cap
     
+    def acquire_camera(self, shared=False, timeout=None):
+        # Exclusive by default; shared sessions run side by side on the same frames.
+        lease = self.camera.acquire(exclusive=not shared, wait=self.camera_wait, timeout=timeout)
+        self.cap = lease.source
+        return lease
+    
+    def cancel_sessions(self):
+        self.camera.cancel_all()
+    
     def release_camera(self):
+        self.camera.close()
         if self.cap is not None:
-            self.cap.release()
             self.cap = None
             cv2.destroyAllWindows()
+
+    def close(self):
+        # Shutdown: the camera, the pooled MediaPipe graphs and the store journal.
+        self.release_camera()
+        self.hands_pool.close()
+        self.face_pool.close()
+        self.store.close()
+    
+    def frames(self, cap, hands):
+        if self.pipelined:
+            self.pipeline = FramePipeline(cap, hands.process, metrics=self.metrics)
+            try:
+                with self.pipeline:
+                    yield from self.pipeline
+            finally:
+                self.last_pipeline_stats = self.pipeline.stats()
+                self.pipeline = None
+            return
+        metrics = self.metrics
+        # Shared-memory ring frames are already mirrored RGB (read-only views), and replay frames carry
+        # their own landmarks, which a flip would drop; both go to hands.process as they are.
+        preprocessed = getattr(cap, "preprocessed", False) or getattr(cap, "provides_landmarks", False)
+        idle_delay = getattr(hands, "idle_delay", None)
+        while cap.isOpened():
+            if idle_delay is not None:
+                # Idle: no need to pull and convert every camera frame between the low-rate checks.
+                delay = idle_delay()
+                if delay > 0:
+                    time.sleep(delay)
+            t = metrics.now()
+            ret, frame = cap.read()
+            if not ret:
+                break
+            t = metrics.lap("capture", t)
+            
+            if preprocessed:
+                rgb = frame
+            else:
+                frame = cv2.flip(frame, 1)
+                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                t = metrics.lap("preprocess", t)
+            result = hands.process(rgb)
+            metrics.lap("inference", t)
+            if not frame_valid(rgb):
+                # The ring writer lapped this frame during inference; the result may mix two frames.
+                self.torn_frames += 1
+                continue
+            yield frame, result
+    
+    def create_hands(self, max_hands, cap=None):
+        cap = cap if cap is not None else self.cap
+        if getattr(cap, "provides_landmarks", False):
+            return cap.tracker(max_hands)
+        hands = self.hands_pool.acquire(max_hands, min_detection_confidence=0.7, min_tracking_confidence=0.7)
+        if self.roi or self.inference_budget_ms is not None:
+            hands = RoiHands(hands, track=self.roi, budget_ms=self.inference_budget_ms, max_hands=max_hands)
+            self.roi_hands = hands
+        if self.presence is not None:
+            hands = PresenceGate(hands, self.create_presence_detector(), self.idle_fps, self.idle_after,
+                                 previous=self.presence_gate)
+            self.presence_gate = hands
+        if getattr(cap, "exclusive", True) is False and not self.pipelined:
+            # Shared sessions run inference once per frame between them.
+            hands = SharedHands(hands, cap, self.camera.results, max_hands)
+        return hands
+    
+    def create_presence_detector(self):
+        if self.presence == "motion":
+            return MotionDetector()
+        if self.presence == "face":
+            return self.face_pool.acquire()
+        return self.presence
+    
+    def draw_hand(self, frame, hand_landmarks):
+        if not isinstance(hand_landmarks, np.ndarray):
+            self.mp_draw.draw_landmarks(frame, hand_landmarks, self.mp_hands.HAND_CONNECTIONS)
+            return
+        h, w = frame.shape[:2]
+        points = (hand_landmarks[:, :2] * (w, h)).astype(int).tolist()
+        for start, end in self.mp_hands.HAND_CONNECTIONS:
+            cv2.line(frame, tuple(points[start]), tuple(points[end]), (224, 224, 224), 2)
+        for x, y in points:
+            cv2.circle(frame, (x, y), 3, (0, 0, 255), -1)
     
     def extract_hand_features(self, hand_landmarks):
-        if not hand_landmarks:
+        if hand_landmarks is None:
             return None
-        features = []
-        landmarks = hand_landmarks.landmark
-        for lm in landmarks:
-            features.extend([lm.x, lm.y, lm.z])
-        tip_ids = [4, 8, 12, 16, 20]
-        for tip_id in tip_ids:
-            if tip_id > 0:
-                dx = landmarks[tip_id].x - landmarks[tip_id - 2].x
-                dy = landmarks[tip_id].y - landmarks[tip_id - 2].y
-                features.append(np.arctan2(dy, dx))
-        palm_center = landmarks[0]
-        for tip_id in tip_ids:
-            dx = landmarks[tip_id].x - palm_center.x
-            dy = landmarks[tip_id].y - palm_center.y
-            features.append(np.sqrt(dx**2 + dy**2))
-        return np.array(features)
+        return hand_features(hand_landmarks)
     
     def extract_two_hands_features(self, multi_hand_landmarks):
-        if not multi_hand_landmarks or len(multi_hand_landmarks) < 2:
-            return None
-        hand1_features = self.extract_hand_features(multi_hand_landmarks[0])
-        hand2_features = self.extract_hand_features(multi_hand_landmarks[1])
-        if hand1_features is None or hand2_features is None:
-            return None
-        hand1_center = multi_hand_landmarks[0].landmark[0]
-        hand2_center = multi_hand_landmarks[1].landmark[0]
-        hand_distance = np.sqrt(
-            (hand1_center.x - hand2_center.x)**2 + 
-            (hand1_center.y - hand2_center.y)**2 + 
-            (hand1_center.z - hand2_center.z)**2
-        )
-        hand_angle = np.arctan2(
-            hand2_center.y - hand1_center.y,
-            hand2_center.x - hand1_center.x
-        )
-        return np.concatenate([hand1_features, hand2_features, [hand_distance, hand_angle]])
+        return two_hands_features(multi_hand_landmarks)
+    
+    def extract_features_batch(self, landmarks):
+        return batch_features(landmarks)
     
     def calculate_gesture_similarity(self, features1, features2):
         if features1 is None or features2 is None:
@@ -88,76 +199,141 @@ class GestureAuthenticator:
         f1 = np.array(features1)
         f2 = np.array(features2)
         distance = np.linalg.norm(f1 - f2)
-        max_distance = 5.0
-        return max(0, 100 * (1 - distance / max_distance))
+        return max(0, 100 * (1 - distance / MAX_DISTANCE))
+    
+    def calculate_user_similarity(self, features, username):
+        # Best score over all of the user's templates, as one vectorized distance computation.
+        if features is None:
+            return 0.0
+        return float(distance_to_similarity(nearest_distances(features, user_templates(self.users[username])).min()))
+    
+    def enrol(self, username, template, use_two_hands):
+        # Stores a finished StreamingTemplate as the averaged gesture plus its cluster centres.
+        user = {
+            "gesture": template.mean.tolist(),
+            "variance": template.variance.tolist(),
+            "two_hands": use_two_hands,
+            "created_at": datetime.now().isoformat()
+        }
+        user.update(enrol_templates(template.recorded()))
+        return user
+    
+    def adaptation(self, username, features, score):
+        # The record and action adapt_user would store, or (None, None) when the login is not used.
+        if not self.adapt or features is None or score < self.adapt_score or username not in self.users:
+            return None, None
+        return adapt(self.users[username], features, self.max_templates)
+
+    def adapt_user(self, username, features, score):
+        # Learns from an accepted login; returns the action taken, or None when the login is not used.
+        user, action = self.adaptation(username, features, score)
+        if user is None:
+            return None
+        self.store.put(username, user)
+        self.gallery.add(username, user_templates(self.users[username]), user.get("two_hands", True))
+        return action
     
-    def record_gesture(self, duration=8, min_frames=60, use_two_hands=True):
-        cap = self.init_camera()
-        recorded_features = []
+    def record_gesture(self, duration=8, min_frames=60, use_two_hands=True, tolerance=0.02, session_path=None,
+                       session_label=""):
+        result = self.record_gesture_headless(duration, min_frames, use_two_hands, observer=RecordOverlay(self),
+                                              tolerance=tolerance, session_path=session_path,
+                                              session_label=session_label)
+        return result["gesture"]
+    
+    def record_gesture_headless(self, duration=8, min_frames=60, use_two_hands=True, observer=None, preview_fps=None,
+                                tolerance=0.02, session_path=None, session_label="", shared=False):
+        # Stops before `duration` once the running mean has moved less than `tolerance` between checks
+        # and `min_frames` frames are in; tolerance=None always records for the full duration.
+        if observer is not None and preview_fps:
+            observer = ThrottledObserver(observer, preview_fps)
         max_hands = 2 if use_two_hands else 1
-        with self.mp_hands.Hands(
-            max_num_hands=max_hands,
-            min_detection_confidence=0.7,
-            min_tracking_confidence=0.7
-        ) as hands:
-            start_time = datetime.now()
-            frame_count = 0
+        template = StreamingTemplate(feature_size(max_hands), tolerance=tolerance)
+        converged = False
+        cancelled = False
+        processed = 0
+        metrics = self.metrics
+        session = SessionWriter(session_path, max_hands, session_label) if session_path else None
+        lease = self.acquire_camera(shared)
+        with lease, self.create_hands(max_hands, lease) as hands:
+            start_time = time.perf_counter()
             
-            while (datetime.now() - start_time).seconds < duration:
-                ret, frame = cap.read()
-                if not ret:
+            for frame, result in self.frames(lease, hands):
+                t = metrics.now()
+                elapsed = time.perf_counter() - start_time
+                if elapsed >= duration:
                     break
-                
-                frame = cv2.flip(frame, 1)
-                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                result = hands.process(rgb)
-                if result.multi_hand_landmarks:
-                    for hand_landmarks in result.multi_hand_landmarks:
-                        self.mp_draw.draw_landmarks(frame, hand_landmarks, self.mp_hands.HAND_CONNECTIONS)
-                    if use_two_hands:
-                        if len(result.multi_hand_landmarks) >= 2:
-                            features = self.extract_two_hands_features(result.multi_hand_landmarks)
-                            if features is not None:
-                                recorded_features.append(features.tolist())
-                                frame_count += 1
-                            cv2.putText(frame, "TWO HANDS DETECTED!", (10, frame.shape[0] - 60),
-                                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                        else:
-                            cv2.putText(frame, "SHOW BOTH HANDS!", (10, frame.shape[0] - 60),
-                                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-                    else:
-                        features = self.extract_hand_features(result.multi_hand_landmarks[0])
-                        if features is not None:
-                            recorded_features.append(features.tolist())
-                            frame_count += 1
-                        cv2.putText(frame, "ONE HAND DETECTED!", (10, frame.shape[0] - 60),
-                                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                remaining = duration - (datetime.now() - start_time).seconds
-                cv2.putText(frame, f"Recording: {remaining}s", (10, 30),
-                           cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-                cv2.putText(frame, f"Frames: {frame_count}", (10, 70),
-                           cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-                cv2.imshow("Record Gesture", frame)
-                if cv2.waitKey(1) & 0xFF == 27:
-                    cv2.destroyAllWindows()
-                    return None
-        cv2.destroyAllWindows()
-        if len(recorded_features) < min_frames:
-            return None
-        return np.mean(recorded_features, axis=0).tolist()
+                processed += 1
+                if session is not None:
+                    session.write(result.multi_hand_landmarks)
+                num_hands = len(result.multi_hand_landmarks) if result.multi_hand_landmarks else 0
+                metrics.frame(num_hands)
+                features = None
+                if use_two_hands:
+                    if num_hands >= 2:
+                        features = self.extract_two_hands_features(result.multi_hand_landmarks)
+                elif num_hands:
+                    features = self.extract_hand_features(result.multi_hand_landmarks[0])
+                if features is not None:
+                    template.add(features)
+                t = metrics.lap("features", t)
+                if observer is not None:
+                    state = {
+                        "hands": num_hands,
+                        "two_hands": use_two_hands,
+                        "frames": template.count,
+                        "remaining": duration - int(elapsed),
+                    }
+                    keep_going = observer(frame, result, state)
+                    metrics.lap("render", t)
+                    if not keep_going:
+                        cancelled = True
+                        break
+                if template.converged(min_frames):
+                    converged = True
+                    break
+        cancelled = cancelled or lease.cancelled
+        if session is not None:
+            session.close()
+        close = getattr(observer, "close", None)
+        if close is not None:
+            close()
+        gesture = None
+        variance = None
+        if not cancelled and template.count >= min_frames:
+            gesture = template.mean.tolist()
+            variance = template.variance.tolist()
+        return {
+            "gesture": gesture,
+            "variance": variance,
+            "template": template,
+            "converged": converged,
+            "frames": template.count,
+            "processed_frames": processed,
+            "cancelled": cancelled,
+            "duration": time.perf_counter() - start_time,
+        }
     
-    def register_user(self, username, use_two_hands=True):
+    def register_user(self, username, use_two_hands=True, dynamic=False, observer=None, session_path=None):
+        # dynamic=True also keeps the motion: a fixed 3 s recording stored as a resampled feature sequence.
+        # An enrolment recording is labelled with the new username: whoever enrols is that user.
         if username in self.users:
             return False, "Username already exists!"
-        gesture_features = self.record_gesture(duration=8, use_two_hands=use_two_hands)
-        if gesture_features is None:
+        observer = observer if observer is not None else RecordOverlay(self)
+        options = dict(use_two_hands=use_two_hands, observer=observer, session_path=session_path, session_label=username)
+        if dynamic:
+            recording = self.record_gesture_headless(duration=3, tolerance=None, **options)
+        else:
+            recording = self.record_gesture_headless(duration=8, **options)
+        if recording["gesture"] is None:
             return False, "Gesture recording failed!"
-        self.users[username] = {
-            "gesture": gesture_features,
-            "two_hands": use_two_hands,
-            "created_at": datetime.now().isoformat()
-        }
-        self.save_users()
+        user = self.enrol(username, recording["template"], use_two_hands)
+        if dynamic:
+            user["sequence"] = resample_sequence(recording["template"].recorded())
+            user["sequence_frames"] = recording["frames"]
+        self.store.put(username, user)
+        self.gallery.add(username, user["templates"], use_two_hands)
+        if dynamic:
+            self.sequences.add(username, user["sequence"], user["sequence_frames"], use_two_hands)
         return True, "User registered successfully!"
     
     def authenticate_user(self, username, threshold=75):
@@ -167,88 +343,225 @@ class GestureAuthenticator:
         gesture_features = self.record_gesture(duration=8, use_two_hands=use_two_hands)
         if gesture_features is None:
             return False, "Gesture authentication failed!"
-        stored_gesture = self.users[username]["gesture"]
-        similarity = self.calculate_gesture_similarity(gesture_features, stored_gesture)
+        similarity = self.calculate_user_similarity(gesture_features, username)
         if similarity >= threshold:
             return True, f"Authentication successful! (Match: {similarity:.2f}%)"
         else:
             return False, f"Gesture doesn't match! (Match: {similarity:.2f}%)"
     
-    def verify_gesture_live(self, username, threshold=75):
+    def verify_gesture_live(self, username, threshold=75, sequential=None, dynamic=None, observer=None, timeout=10,
+                            session_path=None, session_label=""):
+        # timeout=None keeps the session open until a decision or cancel.
         if username not in self.users:
             return False, "User not found!"
-        cap = self.init_camera()
-        stored_gesture = self.users[username]["gesture"]
-        use_two_hands = self.users[username].get("two_hands", True)
+        observer = observer if observer is not None else VerifyOverlay(self)
+        result = self.verify_gesture_headless(username, threshold, timeout=timeout, observer=observer,
+                                              sequential=sequential, dynamic=dynamic, session_path=session_path,
+                                              session_label=session_label)
+        if result["authenticated"]:
+            return True, f"Authenticated! (Match: {result['score']:.1f}%)"
+        elif result["decision"] == "timeout":
+            return False, "Authentication timed out!"
+        else:
+            return False, "Authentication failed!"
+    
+    def verify_gesture_headless(self, username, threshold=75, timeout=10, observer=None, preview_fps=None,
+                                sequential=None, session_path=None, dynamic=None, shared=False, session_label=""):
+        # dynamic=None matches the motion whenever the user enrolled one. session_label is the ground truth
+        # written to the recording: leave it empty (the directory name is used) unless the person is known,
+        # since the claimed username may be an impostor's.
+        if username not in self.users:
+            return None
+        user = self.users[username]
+        use_two_hands = user.get("two_hands", True)
+        if dynamic is None:
+            dynamic = user.get("sequence") is not None
+        if dynamic:
+            stored_sequence = np.asarray(user["sequence"], dtype=np.float64)
+            window = SlidingWindow(user.get("sequence_frames", len(stored_sequence)), len(stored_sequence))
+            def score(features, two_hands):
+                sequence = window.push(features)
+                if sequence is None:
+                    return username, None
+                return username, self.calculate_sequence_similarity(sequence, stored_sequence)
+        else:
+            templates = user_templates(user)
+            def score(features, two_hands):
+                return username, float(distance_to_similarity(nearest_distances(features, templates).min()))
+        result = self._match(score, use_two_hands, threshold, timeout, observer, preview_fps, sequential,
+                             session_path, session_label, shared)
+        if result["authenticated"] and not dynamic:
+            result["adapted"] = self.adapt_user(username, result["features"], result["score"])
+        return result
+    
+    def calculate_sequence_similarity(self, sequence1, sequence2):
+        return float(distance_to_similarity(dtw_distance(sequence1, np.asarray(sequence2)[None])[0]))
+    
+    def identify(self, features, two_hands=True, top_k=5):
+        return self.gallery.identify(features, two_hands, top_k)
+    
+    def identify_sequence(self, sequence, two_hands=True, top_k=5):
+        return self.sequences.identify(sequence, two_hands, top_k)
+    
+    def identify_gesture_live(self, use_two_hands=None, threshold=75, sequential=None, dynamic=False, observer=None,
+                              timeout=10, session_path=None, session_label=""):
+        if len(self.gallery) == 0:
+            return False, None, "No users registered!"
+        observer = observer if observer is not None else VerifyOverlay(self)
+        result = self.identify_gesture_headless(use_two_hands, threshold, timeout=timeout, observer=observer,
+                                                sequential=sequential, dynamic=dynamic, session_path=session_path,
+                                                session_label=session_label)
+        if result["authenticated"]:
+            username = result["user"]
+            return True, username, f"Identified {username}! (Match: {result['score']:.1f}%)"
+        elif result["decision"] == "timeout":
+            return False, None, "Identification timed out!"
+        else:
+            return False, None, "Identification failed!"
+    
+    def identify_gesture_headless(self, use_two_hands=None, threshold=75, timeout=10, observer=None, preview_fps=None,
+                                  sequential=None, session_path=None, dynamic=False, shared=False, session_label=""):
+        if dynamic:
+            # One window per hand mode; each covers the typical enrolled gesture length of that mode.
+            windows = {}
+            def score(features, two_hands):
+                window = windows.get(two_hands)
+                if window is None:
+                    frames = self.sequences.matrix_for(two_hands).window_frames()
+                    window = windows[two_hands] = SlidingWindow(frames, self.sequences.length)
+                sequence = window.push(features)
+                if sequence is None:
+                    return None, None
+                matches = self.identify_sequence(sequence, two_hands, top_k=1)
+                return matches[0] if matches else (None, 0.0)
+        else:
+            def score(features, two_hands):
+                matches = self.identify(features, two_hands, top_k=1)
+                return matches[0] if matches else (None, 0.0)
+        result = self._match(score, use_two_hands, threshold, timeout, observer, preview_fps, sequential, session_path,
+                             session_label, shared)
+        if result["authenticated"] and not dynamic:
+            result["adapted"] = self.adapt_user(result["user"], result["features"], result["score"])
+        return result
+    
+    def _match(self, score, use_two_hands, threshold, timeout, observer, preview_fps, sequential=None,
+               session_path=None, session_label="", shared=False):
+        # use_two_hands=None accepts whichever gesture type is shown (identification mode).
+        # sequential (a SequentialTest, or True for defaults) replaces the 15-stable-frames rule.
+        if sequential is True:
+            sequential = SequentialTest()
+        if sequential is not None:
+            sequential.calibrate(threshold).reset()
+        decision = None
+        if observer is not None and preview_fps:
+            observer = ThrottledObserver(observer, preview_fps)
         authenticated = False
+        cancelled = False
+        matched = None
         similarity_score = 0
-        max_hands = 2 if use_two_hands else 1
-        with self.mp_hands.Hands(
-            max_num_hands=max_hands,
-            min_detection_confidence=0.7,
-            min_tracking_confidence=0.7
-        ) as hands:
+        scores = []
+        frames = 0
+        decided_at = None
+        timed_out = False
+        max_hands = 1 if use_two_hands is False else 2
+        metrics = self.metrics
+        session = SessionWriter(session_path, max_hands, session_label) if session_path else None
+        # Features of the current run of matching frames; their mean is what adaptation learns from.
+        accepted = deque(maxlen=30)
+        # The lease ends with the session timeout, so a stalled camera cannot hold the loop past it.
+        lease = self.acquire_camera(shared, timeout)
+        with lease, self.create_hands(max_hands, lease) as hands:
             stable_frames = 0
             required_stable_frames = 15
+            start_time = time.perf_counter()
             
-            while cap.isOpened():
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                frame = cv2.flip(frame, 1)
-                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                result = hands.process(rgb)
-                if result.multi_hand_landmarks:
-                    for hand_landmarks in result.multi_hand_landmarks:
-                        self.mp_draw.draw_landmarks(frame, hand_landmarks, self.mp_hands.HAND_CONNECTIONS)
-                    current_features = None
-                    if use_two_hands:
-                        if len(result.multi_hand_landmarks) >= 2:
-                            current_features = self.extract_two_hands_features(result.multi_hand_landmarks)
-                            cv2.putText(frame, "TWO HANDS DETECTED", (10, frame.shape[0] - 60),
-                                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                        else:
-                            cv2.putText(frame, "SHOW BOTH HANDS!", (10, frame.shape[0] - 60),
-                                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-                    else:
+            for frame, result in self.frames(lease, hands):
+                t = metrics.now()
+                frames += 1
+                if session is not None:
+                    session.write(result.multi_hand_landmarks)
+                num_hands = len(result.multi_hand_landmarks) if result.multi_hand_landmarks else 0
+                metrics.frame(num_hands)
+                two_hands = num_hands >= 2 if use_two_hands is None else use_two_hands
+                current_features = None
+                frame_score = None
+                if num_hands:
+                    if not two_hands:
                         current_features = self.extract_hand_features(result.multi_hand_landmarks[0])
-                        cv2.putText(frame, "ONE HAND DETECTED", (10, frame.shape[0] - 60),
-                                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                    if current_features is not None:
-                        similarity_score = self.calculate_gesture_similarity(current_features.tolist(), stored_gesture)
+                    elif num_hands >= 2:
+                        current_features = self.extract_two_hands_features(result.multi_hand_landmarks)
+                t = metrics.lap("features", t)
+                if current_features is not None:
+                    label, frame_score = score(current_features, two_hands)
+                    t = metrics.lap("similarity", t)
+                if frame_score is not None:
+                    similarity_score = frame_score
+                    scores.append(float(similarity_score))
+                    if label != matched or similarity_score < threshold:
+                        accepted.clear()
+                    if similarity_score >= threshold:
+                        accepted.append(current_features)
+                    if sequential is not None:
+                        if label != matched:
+                            sequential.reset()
+                            matched = label
+                        decision = sequential.update(similarity_score)
+                        stable_frames = sequential.frames
+                        authenticated = decision == ACCEPT
+                    else:
                         if similarity_score >= threshold:
-                            stable_frames += 1
-                            color = (0, 255, 0)
-                            status = "MATCH!"
+                            stable_frames = stable_frames + 1 if label == matched else 1
+                            matched = label
                         else:
                             stable_frames = 0
-                            color = (0, 0, 255)
-                            status = "NO MATCH"
-                        cv2.putText(frame, status, (10, 40), cv2.FONT_HERSHEY_SIMPLEX, 1.5, color, 3)
-                        cv2.putText(frame, f"Match: {similarity_score:.1f}%", (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
-                        cv2.putText(frame, f"Stable: {stable_frames}/{required_stable_frames}", (10, 130), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 0), 2)
-                        if stable_frames >= required_stable_frames:
-                            authenticated = True
-                            cv2.putText(frame, "AUTHENTICATED!", (10, 180), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 0), 3)
-                            cv2.imshow("Gesture Authentication", frame)
-                            cv2.waitKey(1500)
-                            break
-                    else:
-                        stable_frames = 0
-                else:
-                    cv2.putText(frame, "Show BOTH hands" if use_two_hands else "No hand detected", (10, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
+                        authenticated = stable_frames >= required_stable_frames
+                elif sequential is None:
                     stable_frames = 0
-                cv2.putText(frame, "Press ESC to cancel", (10, frame.shape[0] - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
-                cv2.imshow("Gesture Authentication", frame)
-                if cv2.waitKey(1) & 0xFF == 27:
+                if authenticated or decision is not None:
+                    decided_at = time.perf_counter()
+                if observer is not None:
+                    state = {
+                        "hands": num_hands,
+                        "two_hands": two_hands,
+                        "use_two_hands": use_two_hands,
+                        "score": frame_score,
+                        "matched": frame_score is not None and frame_score >= threshold,
+                        "stable_frames": stable_frames,
+                        "required_stable_frames": required_stable_frames,
+                        "authenticated": authenticated,
+                        "evidence": sequential.progress() if sequential is not None else None,
+                    }
+                    keep_going = observer(frame, result, state)
+                    metrics.lap("render", t)
+                    if not keep_going and not authenticated:
+                        cancelled = True
+                        break
+                if authenticated or decision is not None:
                     break
-        cv2.destroyAllWindows()
-        if authenticated:
-            return True, f"Authenticated! (Match: {similarity_score:.1f}%)"
-        else:
-            return False, "Authentication failed!"
+                if timeout is not None and time.perf_counter() - start_time >= timeout:
+                    timed_out = True
+                    break
+        cancelled = cancelled or lease.cancelled
+        timed_out = timed_out or lease.reason == "timeout"
+        if session is not None:
+            session.close()
+        close = getattr(observer, "close", None)
+        if close is not None:
+            close()
+        return {
+            "authenticated": authenticated,
+            "user": matched if authenticated else None,
+            "score": float(similarity_score),
+            "scores": scores,
+            "features": np.mean(accepted, axis=0) if authenticated and accepted else None,
+            "stable_frames": stable_frames,
+            "frames": frames,
+            "decision": decision or (ACCEPT if authenticated else ("timeout" if timed_out else None)),
+            "decision_frames": sequential.frames if sequential is not None else stable_frames,
+            "cancelled": cancelled,
+            "decision_time": decided_at - start_time if decided_at is not None else None,
+            "decided_at": time.time() - (time.perf_counter() - decided_at) if decided_at is not None else None,
+        }
     
     def list_users(self):
         return list(self.users.keys())
-
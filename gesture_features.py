@@ -0,0 +1,102 @@
+import math
+import numpy as np
+
+NUM_LANDMARKS = 21
+TIP_IDS = np.array([4, 8, 12, 16, 20])
+TIP_BASE_IDS = TIP_IDS - 2
+HAND_FEATURES = NUM_LANDMARKS * 3 + 2 * len(TIP_IDS)
+TWO_HANDS_FEATURES = 2 * HAND_FEATURES + 2
+TIPS = TIP_IDS.tolist()
+
+
+def feature_size(num_hands):
+    return HAND_FEATURES if num_hands == 1 else TWO_HANDS_FEATURES
+
+
+def landmarks_to_array(hand_landmarks):
+    if isinstance(hand_landmarks, np.ndarray):
+        return hand_landmarks.astype(np.float32, copy=False).reshape(NUM_LANDMARKS, 3)
+    return np.array(_coords(hand_landmarks), dtype=np.float32).reshape(NUM_LANDMARKS, 3)
+
+
+def _coords(hand_landmarks):
+    # Flat [x0, y0, z0, x1, ...] as Python floats; one pass over the protobuf is most of the cost.
+    if isinstance(hand_landmarks, np.ndarray):
+        return hand_landmarks.astype(np.float64).reshape(-1).tolist()
+    coords = []
+    for lm in hand_landmarks.landmark:
+        coords += (lm.x, lm.y, lm.z)
+    return coords
+
+
+def _hand_features(c):
+    # Same operations as the original per-landmark loop, so single frames give identical bits.
+    out = np.empty(HAND_FEATURES, dtype=np.float64)
+    out[:NUM_LANDMARKS * 3] = c
+    out[NUM_LANDMARKS * 3:NUM_LANDMARKS * 3 + 5] = np.arctan2([c[3 * t + 1] - c[3 * t - 5] for t in TIPS],
+                                                              [c[3 * t] - c[3 * t - 6] for t in TIPS])
+    out[NUM_LANDMARKS * 3 + 5:] = [math.sqrt((c[3 * t] - c[0])**2 + (c[3 * t + 1] - c[1])**2) for t in TIPS]
+    return out
+
+
+def hand_features(hand_landmarks):
+    # One hand (MediaPipe landmarks or a (21, 3) array) -> (73,). The live loop's path; use batch_features for N > 1.
+    return _hand_features(_coords(hand_landmarks))
+
+
+def two_hands_features(multi_hand_landmarks):
+    if not multi_hand_landmarks or len(multi_hand_landmarks) < 2:
+        return None
+    c1 = _coords(multi_hand_landmarks[0])
+    c2 = _coords(multi_hand_landmarks[1])
+    out = np.empty(TWO_HANDS_FEATURES, dtype=np.float64)
+    out[:HAND_FEATURES] = _hand_features(c1)
+    out[HAND_FEATURES:2 * HAND_FEATURES] = _hand_features(c2)
+    out[-2] = math.sqrt((c1[0] - c2[0])**2 + (c1[1] - c2[1])**2 + (c1[2] - c2[2])**2)
+    out[-1] = np.arctan2(c2[1] - c1[1], c2[0] - c1[0])
+    return out
+
+
+def multi_landmarks_to_array(multi_hand_landmarks, num_hands):
+    if not multi_hand_landmarks or len(multi_hand_landmarks) < num_hands:
+        return None
+    return np.stack([landmarks_to_array(h) for h in multi_hand_landmarks[:num_hands]])
+
+
+def batch_hand_features(landmarks):
+    # landmarks: (N, 21, 3). Computed in float64; vectorized math can differ from the single-frame path
+    # by an ulp or two depending on the platform's SIMD kernels.
+    lm = np.asarray(landmarks, dtype=np.float64)
+    n = lm.shape[0]
+    tips = lm[:, TIP_IDS, :2]
+    bases = lm[:, TIP_BASE_IDS, :2]
+    palm = lm[:, :1, :2]
+    d_tip = tips - bases
+    d_palm = tips - palm
+    out = np.empty((n, HAND_FEATURES), dtype=np.float64)
+    out[:, :NUM_LANDMARKS * 3] = lm.reshape(n, -1)
+    out[:, NUM_LANDMARKS * 3:NUM_LANDMARKS * 3 + 5] = np.arctan2(d_tip[..., 1], d_tip[..., 0])
+    out[:, NUM_LANDMARKS * 3 + 5:] = np.sqrt(d_palm[..., 0]**2 + d_palm[..., 1]**2)
+    return out
+
+
+def batch_features(landmarks):
+    # landmarks: (N, hands, 21, 3) with hands in {1, 2}; returns (N, 73) or (N, 148).
+    lm = np.asarray(landmarks)
+    n, num_hands = lm.shape[:2]
+    if num_hands == 1:
+        return batch_hand_features(lm[:, 0])
+    hand1 = batch_hand_features(lm[:, 0])
+    hand2 = batch_hand_features(lm[:, 1])
+    c1 = lm[:, 0, 0].astype(np.float64)
+    c2 = lm[:, 1, 0].astype(np.float64)
+    out = np.empty((n, TWO_HANDS_FEATURES), dtype=np.float64)
+    out[:, :HAND_FEATURES] = hand1
+    out[:, HAND_FEATURES:2 * HAND_FEATURES] = hand2
+    out[:, -2] = np.sqrt(
+        (c1[:, 0] - c2[:, 0])**2 +
+        (c1[:, 1] - c2[:, 1])**2 +
+        (c1[:, 2] - c2[:, 2])**2
+    )
+    out[:, -1] = np.arctan2(c2[:, 1] - c1[:, 1], c2[:, 0] - c1[:, 0])
+    return out
@@ -0,0 +1,313 @@
+import numpy as np
+from gesture_features import feature_size
+from multi_template import user_templates
+
+MAX_DISTANCE = 5.0
+COARSE_DIMS = 16
+COARSE_MIN_USERS = 2048
+# Relative allowance for float32 rounding in the coarse distances, so the bound never overshoots.
+COARSE_SLACK = 1e-5
+
+
+def distance_to_similarity(distance):
+    return np.maximum(0, 100 * (1 - np.asarray(distance) / MAX_DISTANCE))
+
+
+class TemplateMatrix:
+    def __init__(self, dim, capacity=64):
+        self.dim = dim
+        self.names = []
+        self.rows = {}
+        self.matrix = np.empty((capacity, dim), dtype=np.float32)
+        self.sq_norms = np.empty(capacity, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.rows
+
+    def _grow(self, capacity):
+        matrix = np.empty((capacity, self.dim), dtype=np.float32)
+        sq_norms = np.empty(capacity, dtype=np.float32)
+        size = len(self.names)
+        matrix[:size] = self.matrix[:size]
+        sq_norms[:size] = self.sq_norms[:size]
+        self.matrix, self.sq_norms = matrix, sq_norms
+
+    def add(self, name, template):
+        row = self.rows.get(name)
+        if row is None:
+            row = len(self.names)
+            if row == len(self.matrix):
+                self._grow(2 * len(self.matrix))
+            self.names.append(name)
+            self.rows[name] = row
+        self.matrix[row] = template
+        self.sq_norms[row] = self.matrix[row] @ self.matrix[row]
+
+    def extend(self, names, templates):
+        size = len(self.names)
+        needed = size + len(names)
+        if needed > len(self.matrix):
+            self._grow(max(needed, 2 * len(self.matrix)))
+        self.matrix[size:needed] = templates
+        self.sq_norms[size:needed] = np.einsum("ij,ij->i", self.matrix[size:needed], self.matrix[size:needed])
+        for row, name in enumerate(names, size):
+            self.rows[name] = row
+        self.names.extend(names)
+
+    def remove(self, name):
+        row = self.rows.pop(name, None)
+        if row is None:
+            return
+        last = len(self.names) - 1
+        if row != last:
+            moved = self.names[last]
+            self.matrix[row] = self.matrix[last]
+            self.sq_norms[row] = self.sq_norms[last]
+            self.names[row] = moved
+            self.rows[moved] = row
+        self.names.pop()
+
+    def search(self, probe, top_k=5):
+        size = len(self.names)
+        if size == 0:
+            return []
+        probe = np.asarray(probe, dtype=np.float32)
+        # ||g - p||^2 = ||g||^2 - 2 g.p + ||p||^2 as one GEMV over the whole gallery.
+        d2 = self.sq_norms[:size] - 2 * (self.matrix[:size] @ probe) + probe @ probe
+        top_k = min(top_k, size)
+        if top_k < size:
+            candidates = np.argpartition(d2, top_k - 1)[:top_k]
+        else:
+            candidates = np.arange(size)
+        # Rescore the short list exactly so scores agree with calculate_gesture_similarity.
+        diff = self.matrix[candidates].astype(np.float64) - probe.astype(np.float64)
+        distances = np.linalg.norm(diff, axis=1)
+        order = np.argsort(distances)
+        scores = distance_to_similarity(distances[order])
+        return [(self.names[candidates[i]], float(s)) for i, s in zip(order, scores)]
+
+
+class CoarseIndex:
+    # One column per user for the first stage of identification: the centroid c of the user's templates
+    # projected onto the leading principal axes, plus the length of the part the projection leaves out.
+    # The distance between these columns never exceeds ||p - c||, and every template lies within `radius`
+    # of c, so (coarse distance - radius) is a lower bound on the user's best template distance.
+    # Users whose bound is above a distance already found cannot be in the top-k and are never scored.
+    def __init__(self, templates, dims=COARSE_DIMS, max_candidates=512, capacity=64):
+        # The axes come from a sample of the gallery's templates; any orthonormal axes keep the bound valid.
+        sample = np.asarray(templates[::max(1, len(templates) // 20000)], dtype=np.float64)
+        self.mean = sample.mean(axis=0)
+        sample = sample - self.mean
+        _, axes = np.linalg.eigh(sample.T @ sample)
+        self.axes = axes[:, ::-1][:, :dims].T.copy()
+        self.max_candidates = max_candidates
+        self.names = []
+        self.rows = {}
+        # Column-major: the product with a short query vector streams each coordinate once.
+        self.vectors = np.empty((len(self.axes) + 1, capacity), dtype=np.float32)
+        self.sq_norms = np.empty(capacity, dtype=np.float32)
+        self.radius = np.empty(capacity, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.names)
+
+    def project(self, vectors):
+        centred = np.atleast_2d(np.asarray(vectors, dtype=np.float64)) - self.mean
+        projected = centred @ self.axes.T
+        rest = np.einsum("ij,ij->i", centred, centred) - np.einsum("ij,ij->i", projected, projected)
+        return np.hstack([projected, np.sqrt(np.maximum(rest, 0))[:, None]])
+
+    def _grow(self, capacity):
+        size = len(self.names)
+        vectors = np.empty((len(self.vectors), capacity), dtype=np.float32)
+        vectors[:, :size] = self.vectors[:, :size]
+        sq_norms = np.empty(capacity, dtype=np.float32)
+        sq_norms[:size] = self.sq_norms[:size]
+        radius = np.empty(capacity, dtype=np.float32)
+        radius[:size] = self.radius[:size]
+        self.vectors, self.sq_norms, self.radius = vectors, sq_norms, radius
+
+    def add(self, username, templates):
+        self.remove(username)
+        templates = np.atleast_2d(np.asarray(templates, dtype=np.float32))
+        self.extend([username], templates, np.zeros(1, dtype=np.int64))
+
+    def extend(self, usernames, templates, starts, chunk=8192):
+        # templates: every new user's templates, grouped per user; starts: where each user's group begins.
+        size = len(self.names)
+        needed = size + len(usernames)
+        if needed > len(self.sq_norms):
+            self._grow(max(needed, 2 * len(self.sq_norms)))
+        ends = np.append(starts[1:], len(templates))
+        for first in range(0, len(usernames), chunk):
+            last = min(first + chunk, len(usernames))
+            group = templates[starts[first]:ends[last - 1]].astype(np.float64)
+            offsets = starts[first:last] - starts[first]
+            counts = ends[first:last] - starts[first:last]
+            if (counts == counts[0]).all():
+                centroids = group.reshape(len(counts), counts[0], -1).mean(axis=1)
+            else:
+                # Group sums as differences of a running sum; reduceat along rows is far slower.
+                running = np.cumsum(group, axis=0)
+                sums = running[offsets + counts - 1]
+                sums[1:] -= running[offsets[1:] - 1]
+                centroids = sums / counts[:, None]
+            spread = np.linalg.norm(group - np.repeat(centroids, counts, axis=0), axis=1)
+            vectors = self.project(centroids)
+            self.vectors[:, size + first:size + last] = vectors.T
+            self.sq_norms[size + first:size + last] = np.einsum("ij,ij->i", vectors, vectors)
+            # Rounded up so the float32 copy never understates it.
+            self.radius[size + first:size + last] = np.maximum.reduceat(spread, offsets) * (1 + 1e-6) + 1e-6
+        for row, username in enumerate(usernames, size):
+            self.rows[username] = row
+        self.names.extend(usernames)
+
+    def remove(self, username):
+        row = self.rows.pop(username, None)
+        if row is None:
+            return
+        last = len(self.names) - 1
+        if row != last:
+            moved = self.names[last]
+            self.vectors[:, row] = self.vectors[:, last]
+            self.sq_norms[row] = self.sq_norms[last]
+            self.radius[row] = self.radius[last]
+            self.names[row] = moved
+            self.rows[moved] = row
+        self.names.pop()
+
+    def _distances(self, matrix, counts, users, probe):
+        # Exact best-template distance of each user, computed like TemplateMatrix.search rescoring.
+        rows, starts = [], []
+        for username in users:
+            starts.append(len(rows))
+            rows.extend(matrix.rows[(username, i)] for i in range(counts[username]))
+        distances = np.linalg.norm(matrix.matrix[rows].astype(np.float64) - probe, axis=1)
+        return dict(zip(users, np.minimum.reduceat(distances, starts)))
+
+    def identify(self, matrix, counts, probe, top_k):
+        # Exact top-k over `matrix`, or None when too many users survive the bound to be worth it.
+        size = len(self.names)
+        if size <= top_k:
+            return None
+        probe = np.asarray(probe, dtype=np.float64)
+        query = self.project(probe)[0].astype(np.float32)
+        d2 = (1 - COARSE_SLACK) * self.sq_norms[:size] - 2 * (query @ self.vectors[:, :size])
+        d2 += (1 - COARSE_SLACK) * (query @ query)
+        # The nearest centroids give a first top-k; only users whose bound beats its worst distance can change it.
+        seeds = [int(d2.argmin())] if top_k == 1 else np.argpartition(d2, top_k - 1)[:top_k].tolist()
+        names = self.names
+        best = self._distances(matrix, counts, [names[i] for i in seeds], probe)
+        worst = max(best.values())
+        candidates = np.flatnonzero(np.sqrt(np.maximum(d2, 0, out=d2), out=d2) - self.radius[:size] <= worst)
+        if len(candidates) > self.max_candidates:
+            return None
+        rest = [names[i] for i in candidates if names[i] not in best]
+        if rest:
+            best.update(self._distances(matrix, counts, rest, probe))
+        ranked = sorted(best.items(), key=lambda item: item[1])[:top_k]
+        return [(username, float(distance_to_similarity(distance))) for username, distance in ranked]
+
+
+class GestureGallery:
+    # One row per template, keyed (username, i); a user's score is the best of their templates.
+    # Modes with COARSE_MIN_USERS users or more also keep a CoarseIndex, so identification only
+    # scores the templates of users that can still be among the best matches.
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.one_hand = self._matrix(False)
+        self.two_hands = self._matrix(True)
+        self.counts = {}
+        self.modes = {}
+        self.coarse = {False: None, True: None}
+
+    def _matrix(self, two_hands):
+        return TemplateMatrix(feature_size(2 if two_hands else 1))
+
+    def __len__(self):
+        return len(self.counts)
+
+    def matrix_for(self, two_hands):
+        return self.two_hands if two_hands else self.one_hand
+
+    def add(self, username, template, two_hands):
+        # template: one feature vector or a (k, dim) stack of the user's templates.
+        self.remove(username)
+        templates = np.atleast_2d(np.asarray(template, dtype=np.float32))
+        self.matrix_for(two_hands).extend([(username, i) for i in range(len(templates))], templates)
+        self.counts[username] = len(templates)
+        self.modes[username] = two_hands
+        if self.coarse[two_hands] is not None:
+            self.coarse[two_hands].add(username, templates)
+        elif len(self.counts) >= COARSE_MIN_USERS and self.users_in(two_hands) >= COARSE_MIN_USERS:
+            # Grown past the threshold one add() at a time since the last rebuild.
+            self.build_coarse(two_hands)
+
+    def remove(self, username):
+        for i in range(self.counts.pop(username, 0)):
+            self.one_hand.remove((username, i))
+            self.two_hands.remove((username, i))
+        two_hands = self.modes.pop(username, None)
+        if two_hands is not None and self.coarse[two_hands] is not None:
+            self.coarse[two_hands].remove(username)
+
+    def users_in(self, two_hands):
+        return sum(mode == two_hands for mode in self.modes.values())
+
+    def build_coarse(self, two_hands):
+        # Fits the coarse stage on the users currently in the mode; only full float32 rows qualify.
+        matrix = self.matrix_for(two_hands)
+        self.coarse[two_hands] = None
+        if not isinstance(matrix, TemplateMatrix):
+            return None
+        users = {}
+        owners = np.fromiter((users.setdefault(username, len(users)) for username, _ in matrix.names),
+                             dtype=np.int64, count=len(matrix))
+        if len(users) < COARSE_MIN_USERS:
+            return None
+        order = np.argsort(owners, kind="stable")
+        templates = matrix.matrix[:len(matrix)][order]
+        starts = np.searchsorted(owners[order], np.arange(len(users)))
+        coarse = CoarseIndex(templates)
+        coarse.extend(list(users), templates, starts)
+        self.coarse[two_hands] = coarse
+        return coarse
+
+    def rebuild(self, users):
+        self.clear()
+        for two_hands in (False, True):
+            names, templates = [], []
+            for username, user in users.items():
+                if user.get("two_hands", True) == two_hands:
+                    stack = user_templates(user)
+                    names.extend((username, i) for i in range(len(stack)))
+                    templates.append(stack)
+                    self.counts[username] = len(stack)
+                    self.modes[username] = two_hands
+            if names:
+                self.matrix_for(two_hands).extend(names, np.concatenate(templates))
+            self.build_coarse(two_hands)
+
+    def identify(self, features, two_hands, top_k=5):
+        if features is None:
+            return []
+        matrix = self.matrix_for(two_hands)
+        coarse = self.coarse[two_hands]
+        if coarse is not None:
+            matches = coarse.identify(matrix, self.counts, features, top_k)
+            if matches is not None:
+                return matches
+        # Enough rows that top_k distinct users survive collapsing templates to their best score.
+        rows = top_k * max(self.counts.values(), default=1)
+        best = {}
+        for (username, _), score in matrix.search(features, rows):
+            if username not in best:
+                best[username] = score
+                if len(best) == top_k:
+                    break
+        return list(best.items())
@@ -1,23 +1,201 @@
+import argparse
+import json
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
-from gesture_auth import GestureAuthenticator
-from PIL import Image, ImageTk
-import cv2
+
+STARTED = time.perf_counter()
+
+
+def elapsed_ms(since=STARTED):
+    return (time.perf_counter() - since) * 1000
+
+
+class Warmup:
+    # Loads the backend off the Tk thread: cv2/MediaPipe are imported, the template store is loaded,
+    # the Hands graphs are built and the camera is opened while the login screen is already usable.
+    def __init__(self, on_progress=None, open_camera=True, **auth_options):
+        self.on_progress = on_progress
+        self.open_camera = open_camera
+        self.auth_options = auth_options
+        self.auth = None
+        self.error = None
+        self.camera_error = None
+        self.timings = {}
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="gui-warmup", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _progress(self, text):
+        if self.on_progress is not None:
+            self.on_progress(text)
+
+    def _lap(self, stage, since):
+        self.timings[f"{stage}_ms"] = elapsed_ms(since)
+        return time.perf_counter()
+
+    def _open_camera(self, auth):
+        t = time.perf_counter()
+        try:
+            auth.init_camera()
+        except Exception as e:
+            self.camera_error = e
+        self._lap("camera", t)
+
+    def run(self):
+        try:
+            t = time.perf_counter()
+            self._progress("Loading hand tracking...")
+            from gesture_auth import GestureAuthenticator
+            t = self._lap("import", t)
+            self._progress("Loading users...")
+            auth = GestureAuthenticator(warm_hands=False, **self.auth_options)
+            t = self._lap("store", t)
+            # The camera driver and the MediaPipe graphs initialise in parallel.
+            camera = None
+            if self.open_camera:
+                camera = threading.Thread(target=self._open_camera, args=(auth,), name="gui-camera", daemon=True)
+                camera.start()
+            self._progress("Preparing hand models...")
+            auth.hands_pool.warm([2, 1], background=False)
+            self._lap("models", t)
+            if camera is not None:
+                self._progress("Opening camera...")
+                camera.join()
+            self.auth = auth
+            self._progress("Ready" if self.camera_error is None else "Ready (camera will retry on login)")
+        except Exception as e:
+            self.error = e
+            self._progress(f"Startup failed: {e}")
+        finally:
+            self.timings["ready_ms"] = elapsed_ms()
+            self.ready.set()
+
+    def wait(self):
+        self.ready.wait()
+        if self.error is not None:
+            raise self.error
+        return self.auth
+
 
 class GestureLoginApp:
-    def __init__(self, root):
+    def __init__(self, root, warmup=True, preview_fps=15, preview_size=(560, 420), camera_idle_release=30.0,
+                 print_timings=False):
         self.root = root
         self.root.title("Gesture Authentication System")
         self.root.geometry("800x600")
         self.root.configure(bg="#1e1e2e")
         
-        self.auth = GestureAuthenticator()
+        self.auth = None
         self.current_user = None
+        self.readiness = "Starting..."
+        self.readiness_label = None
+        self.startup_reported = False
+        self.print_timings = print_timings
+        self.preview_fps = preview_fps
+        self.preview_size = preview_size
+        self.preview = None
+        self.warmup = Warmup(on_progress=lambda text: self.root.after(0, self.set_readiness, text),
+                             camera_idle_release=camera_idle_release)
+        if warmup:
+            self.warmup.start()
+        else:
+            self.warmup.run()
+        self.timings = self.warmup.timings
         
         self.setup_styles()
         
         self.show_login_screen()
+        self.root.after_idle(self.mark_window_shown)
+    
+    def mark_window_shown(self):
+        self.timings["window_ms"] = elapsed_ms()
+    
+    def set_readiness(self, text):
+        self.readiness = text
+        if self.readiness_label is not None and self.readiness_label.winfo_exists():
+            color = "#a6e3a1" if text.startswith("Ready") else "#f38ba8" if "failed" in text else "#f9e2af"
+            self.readiness_label.config(text=f"● {text}", fg=color)
+        if self.print_timings and self.warmup.ready.is_set() and not self.startup_reported:
+            self.startup_reported = True
+            print(f"Startup: window after {self.timings.get('window_ms', 0):.0f} ms, "
+                  f"ready after {self.timings['ready_ms']:.0f} ms")
+    
+    def get_auth(self):
+        # Called from worker threads; blocks until the warm-up has finished.
+        if self.auth is None:
+            self.auth = self.warmup.wait()
+        return self.auth
+    
+    def preview_observer(self, overlay, clicked=None):
+        # Worker side of the embedded preview: drawing and the hand-off run at most preview_fps times a
+        # second, so the preview never costs the matching loop more than that.
+        from overlay import FirstFrameObserver, ThrottledObserver
+        observer = overlay
+        if clicked is not None:
+            def on_first_frame():
+                self.timings["click_to_first_frame_ms"] = elapsed_ms(clicked)
+                if self.print_timings:
+                    print(f"Click to first frame: {self.timings['click_to_first_frame_ms']:.0f} ms")
+            observer = FirstFrameObserver(observer, on_first_frame)
+        return ThrottledObserver(observer, self.preview_fps)
+    
+    def show_camera_screen(self, title):
+        # Returns the PreviewBuffer the auth worker draws into; the Tk side repaints it at preview_fps.
+        from preview import PreviewBuffer, TkPreview
+        self.clear_screen()
+        
+        main_frame = tk.Frame(self.root, bg="#1e1e2e")
+        main_frame.place(relx=0.5, rely=0.5, anchor="center")
+        
+        title_label = tk.Label(main_frame,
+                              text=title,
+                              font=("Segoe UI", 18, "bold"),
+                              bg="#1e1e2e",
+                              fg="#cdd6f4")
+        title_label.pack(pady=(0, 10))
+        
+        video_label = tk.Label(main_frame, bg="#11111b", bd=0)
+        video_label.pack()
+        
+        self.status_label = tk.Label(main_frame,
+                                    text="Starting camera...",
+                                    font=("Segoe UI", 10),
+                                    bg="#1e1e2e",
+                                    fg="#f9e2af")
+        self.status_label.pack(pady=5)
+        
+        buffer = PreviewBuffer(self.preview_size)
+        cancel_btn = tk.Button(main_frame,
+                              text="Cancel",
+                              font=("Segoe UI", 10, "bold"),
+                              bg="#1e1e2e",
+                              fg="#f38ba8",
+                              activebackground="#1e1e2e",
+                              activeforeground="#eba0ac",
+                              bd=0,
+                              cursor="hand2",
+                              command=lambda: self.cancel_session(buffer))
+        cancel_btn.pack()
+        
+        self.preview = TkPreview(video_label, buffer, self.preview_fps).start()
+        return buffer
+    
+    def cancel_session(self, buffer):
+        # Also ends a session that is still waiting for its first camera frame.
+        buffer.cancel()
+        if self.auth is not None:
+            self.auth.cancel_sessions()
+    
+    def stop_preview(self):
+        if self.preview is not None:
+            self.preview.stop()
+            self.timings["preview"] = self.preview.stats()
+            self.preview = None
     
     def setup_styles(self):
         style = ttk.Style()
@@ -104,31 +282,63 @@ class GestureLoginApp:
                                     bg="#1e1e2e",
                                     fg="#f38ba8")
         self.status_label.pack(pady=10)
+        
+        self.readiness_label = tk.Label(main_frame,
+                                       text="",
+                                       font=("Segoe UI", 9),
+                                       bg="#1e1e2e",
+                                       fg="#f9e2af")
+        self.readiness_label.pack(pady=5)
+        self.set_readiness(self.readiness)
     
     def login_with_gesture(self):
+        clicked = time.perf_counter()
         username = self.username_entry.get().strip()
-        if not username:
-            messagebox.showerror("Error", "Please enter your username!")
-            return
-        self.status_label.config(text="Initializing camera... Please wait", fg="#f9e2af")
-        self.root.update()
+        title = f"Verifying {username}" if username else "Identifying..."
+        buffer = self.show_camera_screen(title)
+        if self.warmup.ready.is_set():
+            self.status_label.config(text="Initializing camera... Please wait", fg="#f9e2af")
+        else:
+            self.status_label.config(text="Finishing startup... Please wait", fg="#f9e2af")
         def authenticate():
             try:
-                self.auth.init_camera()
+                auth = self.get_auth()
+                if not username and not auth.list_users():
+                    def no_user():
+                        self.stop_preview()
+                        self.show_login_screen()
+                        messagebox.showerror("Error", "Please enter your username!")
+                    self.root.after(0, no_user)
+                    return
+                auth.init_camera()
                 self.root.after(0, lambda: self.status_label.config(
                     text="Camera ready! Show your gesture...", fg="#a6e3a1"))
-                success, message = self.auth.verify_gesture_live(username)
+                from overlay import VerifyOverlay
+                observer = self.preview_observer(VerifyOverlay(auth, sink=buffer), clicked)
+                if username:
+                    success, message = auth.verify_gesture_live(username, observer=observer)
+                    user = username
+                else:
+                    success, user, message = auth.identify_gesture_live(observer=observer)
                 def update_gui():
+                    self.stop_preview()
                     if success:
-                        self.status_label.config(text=message, fg="#a6e3a1")
-                        messagebox.showinfo("Success", f"Welcome back, {username}!\n{message}")
-                        self.show_dashboard(username)
+                        messagebox.showinfo("Success", f"Welcome back, {user}!\n{message}")
+                        self.show_dashboard(user)
                     else:
+                        self.show_login_screen()
+                        if buffer.cancelled:
+                            self.status_label.config(text="Cancelled", fg="#a6adc8")
+                            return
                         self.status_label.config(text=message, fg="#f38ba8")
                         messagebox.showerror("Failed", message)
                 self.root.after(0, update_gui)
             except Exception as e:
-                self.root.after(0, lambda: messagebox.showerror("Error", f"Authentication error: {str(e)}"))
+                def show_error():
+                    self.stop_preview()
+                    self.show_login_screen()
+                    messagebox.showerror("Error", f"Authentication error: {str(e)}")
+                self.root.after(0, show_error)
         thread = threading.Thread(target=authenticate, daemon=True)
         thread.start()
     
@@ -212,7 +422,7 @@ class GestureLoginApp:
                 gesture_info = (
                     "Click OK and perform your unique TWO-HAND gesture.\n"
                     "This gesture will be used for authentication.\n\n"
-                    "Recording Duration: 8 seconds\n"
+                    "Recording: up to 8 seconds, stops early once the gesture is steady\n"
                     "Enhanced Security: Using BOTH hands!\n\n"
                     "Tips:\n"
                     "- BOTH hands must be visible at all times\n"
@@ -227,7 +437,7 @@ class GestureLoginApp:
                 gesture_info = (
                     "Click OK and perform your unique ONE-HAND gesture.\n"
                     "This gesture will be used for authentication.\n\n"
-                    "Recording Duration: 8 seconds\n"
+                    "Recording: up to 8 seconds, stops early once the gesture is steady\n"
                     "One Hand Mode\n\n"
                     "Tips:\n"
                     "- Keep one hand visible at all times\n"
@@ -241,23 +451,37 @@ class GestureLoginApp:
             
             messagebox.showinfo(title, gesture_info)
             
+            buffer = self.show_camera_screen(f"Recording gesture for {username}")
+            
             def register_thread():
                 try:
-                    self.auth.init_camera()
+                    auth = self.get_auth()
+                    auth.init_camera()
+                    self.root.after(0, lambda: self.status_label.config(
+                        text="Hold your gesture steady...", fg="#a6e3a1"))
                     
-                    success, message = self.auth.register_user(username, use_two_hands=use_two_hands)
+                    from overlay import RecordOverlay
+                    observer = self.preview_observer(RecordOverlay(auth, sink=buffer))
+                    success, message = auth.register_user(username, use_two_hands=use_two_hands, observer=observer)
                     
                     def update_gui():
+                        self.stop_preview()
                         if success:
                             messagebox.showinfo("Success", f"{message}\nYou can now login!")
                             self.show_login_screen()
                         else:
-                            messagebox.showerror("Failed", message)
+                            self.show_register_screen()
+                            if not buffer.cancelled:
+                                messagebox.showerror("Failed", message)
                     
                     self.root.after(0, update_gui)
                     
                 except Exception as e:
-                    self.root.after(0, lambda: messagebox.showerror("Error", f"Registration error: {str(e)}"))
+                    def show_error():
+                        self.stop_preview()
+                        self.show_register_screen()
+                        messagebox.showerror("Error", f"Registration error: {str(e)}")
+                    self.root.after(0, show_error)
             
             thread = threading.Thread(target=register_thread, daemon=True)
             thread.start()
@@ -331,9 +555,24 @@ class GestureLoginApp:
         logout_btn.pack(pady=20, ipadx=30, ipady=10)
 
 def main():
+    parser = argparse.ArgumentParser(description="Gesture authentication GUI")
+    parser.add_argument("--no-warmup", action="store_true",
+                        help="load everything before showing the window (the old startup, for comparison)")
+    parser.add_argument("--timings", help="print startup and click-to-first-frame times, and write them with the "
+                                          "preview timings (JSON) here on exit")
+    parser.add_argument("--preview-fps", type=float, default=15, help="refresh rate of the embedded camera preview")
+    parser.add_argument("--camera-idle", type=float, default=30.0,
+                        help="seconds the camera stays open between logins before it is released")
+    args = parser.parse_args()
     root = tk.Tk()
-    app = GestureLoginApp(root)
+    app = GestureLoginApp(root, warmup=not args.no_warmup, preview_fps=args.preview_fps,
+                          camera_idle_release=args.camera_idle, print_timings=bool(args.timings))
     root.mainloop()
+    if app.warmup.auth is not None:
+        app.warmup.auth.close()
+    if args.timings:
+        with open(args.timings, "w") as f:
+            json.dump(app.timings, f, indent=2)
 
 if __name__ == "__main__":
     main()
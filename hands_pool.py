@@ -0,0 +1,145 @@
+import threading
+import time
+import numpy as np
+import mediapipe as mp
+
+WARMUP_FRAME = np.zeros((480, 640, 3), dtype=np.uint8)
+
+
+def hands_config(max_num_hands, min_detection_confidence=0.7, min_tracking_confidence=0.7):
+    return (max_num_hands, min_detection_confidence, min_tracking_confidence)
+
+
+class PooledHands:
+    def __init__(self, pool, config, hands, acquired_at, warm):
+        self.pool = pool
+        self.config = config
+        self.hands = hands
+        self.acquired_at = acquired_at
+        self.warm = warm
+        self.time_to_first_inference = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def process(self, image):
+        result = self.hands.process(image)
+        if self.time_to_first_inference is None:
+            self.time_to_first_inference = time.perf_counter() - self.acquired_at
+            self.pool._record_first_inference(self)
+        return result
+
+    def reset(self):
+        reset = getattr(self.hands, "reset", None)
+        if reset is not None:
+            reset()
+
+    def close(self):
+        if self.hands is not None:
+            self.pool.release(self.config, self.hands)
+            self.hands = None
+
+
+class HandsPool:
+    # Keeps pre-built MediaPipe Hands graphs per configuration so sessions skip model loading.
+    def __init__(self, max_idle=1, factory=None):
+        self.max_idle = max_idle
+        self.factory = factory or self._create
+        self._idle = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.sessions = 0
+        self.warm_sessions = 0
+        self.last_time_to_first_inference = None
+        self.first_inference_times = []
+
+    def _create(self, config):
+        max_num_hands, detection, tracking = config
+        hands = mp.solutions.hands.Hands(
+            max_num_hands=max_num_hands,
+            min_detection_confidence=detection,
+            min_tracking_confidence=tracking
+        )
+        # The graph is only initialised on the first process() call, so run one on a blank frame.
+        hands.process(WARMUP_FRAME)
+        return hands
+
+    def warm(self, configs, background=True):
+        configs = [hands_config(*c) if isinstance(c, tuple) else hands_config(c) for c in configs]
+        with self._lock:
+            configs = [c for c in configs if not self._idle.get(c) and c not in self._pending]
+            for config in configs:
+                self._pending[config] = threading.Event()
+        def build():
+            for config in configs:
+                try:
+                    hands = self.factory(config)
+                    with self._lock:
+                        self._idle.setdefault(config, []).append(hands)
+                finally:
+                    with self._lock:
+                        self._pending.pop(config).set()
+        if background:
+            thread = threading.Thread(target=build, name="hands-warmup", daemon=True)
+            thread.start()
+            return thread
+        build()
+        return None
+
+    def acquire(self, max_num_hands, min_detection_confidence=0.7, min_tracking_confidence=0.7):
+        acquired_at = time.perf_counter()
+        config = hands_config(max_num_hands, min_detection_confidence, min_tracking_confidence)
+        while True:
+            with self._lock:
+                idle = self._idle.get(config)
+                if idle:
+                    hands, warm = idle.pop(), True
+                    break
+                pending = self._pending.get(config)
+            if pending is None:
+                hands, warm = self.factory(config), False
+                break
+            pending.wait()
+        with self._lock:
+            self.sessions += 1
+            self.warm_sessions += warm
+        return PooledHands(self, config, hands, acquired_at, warm)
+
+    def release(self, config, hands):
+        reset = getattr(hands, "reset", None)
+        if reset is not None:
+            reset()
+        with self._lock:
+            idle = self._idle.setdefault(config, [])
+            if len(idle) < self.max_idle:
+                idle.append(hands)
+                return
+        hands.close()
+
+    def _record_first_inference(self, session):
+        with self._lock:
+            self.last_time_to_first_inference = session.time_to_first_inference
+            self.first_inference_times.append(session.time_to_first_inference)
+            del self.first_inference_times[:-100]
+
+    def stats(self):
+        with self._lock:
+            times = list(self.first_inference_times)
+            return {
+                "sessions": self.sessions,
+                "warm_sessions": self.warm_sessions,
+                "idle": {str(c): len(v) for c, v in self._idle.items()},
+                "last_time_to_first_inference_ms": None if self.last_time_to_first_inference is None else self.last_time_to_first_inference * 1000,
+                "median_time_to_first_inference_ms": float(np.median(times)) * 1000 if times else None,
+            }
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for instances in idle.values():
+            for hands in instances:
+                hands.close()
@@ -0,0 +1,88 @@
+import os
+import struct
+import time
+import numpy as np
+from gesture_features import NUM_LANDMARKS, landmarks_to_array
+
+# File layout: header, UTF-8 label, then one float32 record per frame:
+# [seconds since start, hands * 21 * (x, y, z)], with NaN for hands that were not detected.
+MAGIC = b"GLMS"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIdH")
+SESSION_EXTENSION = ".gls"
+
+
+class SessionWriter:
+    def __init__(self, path, num_hands, label=""):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.num_hands = num_hands
+        self.label = label
+        self.frames = 0
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self._record = np.empty(1 + num_hands * NUM_LANDMARKS * 3, dtype=np.float32)
+        self._file = open(path, "wb")
+        self._write_header()
+
+    def _write_header(self):
+        label = self.label.encode("utf-8")
+        self._file.write(HEADER.pack(MAGIC, VERSION, self.num_hands, self.frames, self.start_time, len(label)))
+        self._file.write(label)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def write(self, multi_hand_landmarks, timestamp=None):
+        record = self._record
+        record[0] = time.perf_counter() - self._start if timestamp is None else timestamp
+        hands = record[1:].reshape(self.num_hands, NUM_LANDMARKS, 3)
+        hands[:] = np.nan
+        for i, hand in enumerate((multi_hand_landmarks or [])[:self.num_hands]):
+            hands[i] = landmarks_to_array(hand)
+        self._file.write(record.tobytes())
+        self.frames += 1
+
+    def close(self):
+        if self._file is None:
+            return
+        self._file.seek(0)
+        self._write_header()
+        self._file.close()
+        self._file = None
+
+
+def load_session(path):
+    with open(path, "rb") as f:
+        blob = f.read()
+    magic, version, num_hands, frames, start_time, label_len = HEADER.unpack_from(blob, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a landmark session file")
+    offset = HEADER.size + label_len
+    label = blob[HEADER.size:offset].decode("utf-8")
+    width = 1 + num_hands * NUM_LANDMARKS * 3
+    # The header frame count is only written on close; fall back to the file size after a crash.
+    available = (len(blob) - offset) // (4 * width)
+    frames = min(frames, available) if frames else available
+    records = np.frombuffer(blob, dtype=np.float32, count=frames * width, offset=offset).reshape(frames, width)
+    return {
+        "path": path,
+        "label": label,
+        "num_hands": num_hands,
+        "start_time": start_time,
+        "timestamps": records[:, 0],
+        "landmarks": records[:, 1:].reshape(frames, num_hands, NUM_LANDMARKS, 3),
+    }
+
+
+def find_sessions(root):
+    paths = []
+    for directory, _, names in os.walk(root):
+        paths.extend(os.path.join(directory, n) for n in names if n.endswith(SESSION_EXTENSION))
+    return sorted(paths)
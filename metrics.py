@@ -0,0 +1,124 @@
+import json
+import os
+import time
+import numpy as np
+
+STAGES = ("capture", "preprocess", "inference", "features", "similarity", "render")
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class RollingWindow:
+    # Fixed-size ring of the most recent samples; percentiles are computed on demand from a copy.
+    def __init__(self, size=1024):
+        self.values = np.zeros(size, dtype=np.float64)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value):
+        self.values[self.count % len(self.values)] = value
+        self.count += 1
+        self.total += value
+
+    def recent(self):
+        return self.values[:min(self.count, len(self.values))].copy()
+
+
+class Metrics:
+    # Per-stage timings chain through lap(): t = metrics.lap("inference", t).
+    # When disabled, now() and lap() return 0.0 straight away and nothing is recorded.
+    def __init__(self, enabled=True, window=1024):
+        self.enabled = enabled
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.frame_times = RollingWindow(self.window)
+        self.hand_counts = [0, 0, 0]
+
+    def now(self):
+        return time.perf_counter() if self.enabled else 0.0
+
+    def lap(self, stage, since):
+        if not self.enabled:
+            return 0.0
+        now = time.perf_counter()
+        window = self.stages.get(stage)
+        if window is None:
+            window = self.stages[stage] = RollingWindow(self.window)
+        window.add(now - since)
+        return now
+
+    def frame(self, num_hands):
+        if not self.enabled:
+            return
+        self.frame_times.add(time.perf_counter())
+        self.hand_counts[min(num_hands, 2)] += 1
+
+    def fps(self):
+        times = self.frame_times.recent()
+        if len(times) < 2:
+            return 0.0
+        return (len(times) - 1) / max(times.max() - times.min(), 1e-9)
+
+    def snapshot(self):
+        stages = {}
+        for stage in sorted(list(self.stages), key=lambda s: (STAGES.index(s) if s in STAGES else len(STAGES), s)):
+            window = self.stages[stage]
+            recent = window.recent() * 1000
+            p50, p95, p99 = np.percentile(recent, [100 * q for q in QUANTILES])
+            stages[stage] = {
+                "count": window.count,
+                "total_ms": window.total * 1000,
+                "mean_ms": float(recent.mean()),
+                "p50_ms": float(p50),
+                "p95_ms": float(p95),
+                "p99_ms": float(p99),
+                "max_ms": float(recent.max()),
+            }
+        return {
+            "enabled": self.enabled,
+            "uptime_s": time.perf_counter() - self.started,
+            "frames": self.frame_times.count,
+            "fps": self.fps(),
+            "hands": {"0": self.hand_counts[0], "1": self.hand_counts[1], "2": self.hand_counts[2]},
+            "stages": stages,
+        }
+
+    def to_prometheus(self, prefix="gesture"):
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_stage_latency_seconds Per-stage latency over the last {self.window} samples.",
+            f"# TYPE {prefix}_stage_latency_seconds summary",
+        ]
+        for stage, stats in snapshot["stages"].items():
+            for q in QUANTILES:
+                value = stats[f"p{round(q * 100)}_ms"] / 1000
+                lines.append(f'{prefix}_stage_latency_seconds{{stage="{stage}",quantile="{q:g}"}} {value:.9f}')
+            lines.append(f'{prefix}_stage_latency_seconds_sum{{stage="{stage}"}} {stats["total_ms"] / 1000:.9f}')
+            lines.append(f'{prefix}_stage_latency_seconds_count{{stage="{stage}"}} {stats["count"]}')
+        lines += [
+            f"# HELP {prefix}_frames_total Processed frames by number of hands detected.",
+            f"# TYPE {prefix}_frames_total counter",
+        ]
+        for hands, count in snapshot["hands"].items():
+            lines.append(f'{prefix}_frames_total{{hands="{hands}"}} {count}')
+        lines += [
+            f"# HELP {prefix}_fps Processed frames per second over the rolling window.",
+            f"# TYPE {prefix}_fps gauge",
+            f"{prefix}_fps {snapshot['fps']:.3f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        # .prom/.txt get the Prometheus text format (e.g. for node_exporter's textfile collector), anything else JSON.
+        if path.endswith((".prom", ".txt")):
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.snapshot(), indent=4)
+        temp_path = path + ".tmp"
+        with open(temp_path, "w") as f:
+            f.write(content)
+        os.replace(temp_path, path)
+        return path
@@ -0,0 +1,111 @@
+import numpy as np
+
+ENROL_TEMPLATES = 3
+MAX_TEMPLATES = 8
+ADAPT_SCORE = 90.0
+MERGE_DISTANCE = 0.25
+MERGE_RATE = 0.2
+ENROLLED, ADAPTED = 0.0, 1.0
+
+# A user's templates live next to the averaged "gesture" as parallel float32 arrays in the store:
+#   templates           (k, dim) cluster centres from enrolment plus templates learned from logins
+#   template_origin     (k,) ENROLLED or ADAPTED; enrolled centres are never evicted or moved
+#   template_last_used  (k,) value of the user's "logins" counter when the template last matched a login
+
+
+def kmeans(points, k, iterations=25, seed=0):
+    # k-means++ seeding followed by Lloyd iterations; returns (centres, counts) ordered by cluster size.
+    points = np.asarray(points, dtype=np.float64)
+    k = max(1, min(k, len(points)))
+    rng = np.random.default_rng(seed)
+    centres = [points[rng.integers(len(points))]]
+    d2 = np.sum((points - centres[0]) ** 2, axis=1)
+    for _ in range(1, k):
+        total = d2.sum()
+        if total <= 0:
+            break
+        centres.append(points[rng.choice(len(points), p=d2 / total)])
+        d2 = np.minimum(d2, np.sum((points - centres[-1]) ** 2, axis=1))
+    centres = np.array(centres)
+    sq_norms = np.einsum("ij,ij->i", points, points)
+    for _ in range(iterations):
+        distances = sq_norms[:, None] - 2 * points @ centres.T + np.einsum("ij,ij->i", centres, centres)[None]
+        labels = distances.argmin(axis=1)
+        counts = np.bincount(labels, minlength=len(centres))
+        sums = np.zeros_like(centres)
+        np.add.at(sums, labels, points)
+        updated = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centres)
+        if np.allclose(updated, centres):
+            break
+        centres = updated
+    keep = counts > 0
+    order = np.argsort(-counts[keep], kind="stable")
+    return centres[keep][order], counts[keep][order]
+
+
+def enrol_templates(frames, k=ENROL_TEMPLATES, min_cluster=10):
+    # Cluster centres of the enrolment frames; tiny clusters (stray poses) are dropped.
+    centres, counts = kmeans(frames, k)
+    centres = centres[counts >= min(min_cluster, counts.max())]
+    return {
+        "templates": centres.astype(np.float32),
+        "template_origin": np.full(len(centres), ENROLLED, dtype=np.float32),
+        "template_last_used": np.zeros(len(centres), dtype=np.float32),
+        "logins": 0,
+    }
+
+
+def user_templates(user):
+    templates = user.get("templates")
+    if templates is None or len(templates) == 0:
+        return np.asarray(user["gesture"], dtype=np.float32)[None]
+    return np.asarray(templates, dtype=np.float32)
+
+
+def nearest_distances(features, templates):
+    return np.linalg.norm(templates - np.asarray(features, dtype=np.float32), axis=1)
+
+
+def adapt(user, features, max_templates=MAX_TEMPLATES, merge_distance=MERGE_DISTANCE, merge_rate=MERGE_RATE):
+    # Folds the features of an accepted, high-confidence login into the user's templates and returns
+    # (updated user, action). Close to an adapted template: that template moves toward the login.
+    # Close to an enrolled one: only its use is recorded. Otherwise the login becomes a new template,
+    # evicting the least recently used adapted template once max_templates is reached.
+    features = np.asarray(features, dtype=np.float32)
+    templates = user_templates(user).copy()
+    count = len(templates)
+    origin = np.asarray(user.get("template_origin", np.full(count, ENROLLED)), dtype=np.float32).copy()
+    last_used = np.asarray(user.get("template_last_used", np.zeros(count)), dtype=np.float32).copy()
+    logins = int(user.get("logins", 0)) + 1
+    distances = nearest_distances(features, templates)
+    nearest = int(distances.argmin())
+    if distances[nearest] <= merge_distance:
+        if origin[nearest] == ADAPTED:
+            templates[nearest] += merge_rate * (features - templates[nearest])
+            action = "merged"
+        else:
+            action = "refreshed"
+        last_used[nearest] = logins
+    elif count < max_templates:
+        templates = np.vstack([templates, features[None]])
+        origin = np.append(origin, ADAPTED)
+        last_used = np.append(last_used, logins)
+        action = "added"
+    else:
+        adapted = np.flatnonzero(origin == ADAPTED)
+        if len(adapted) == 0:
+            last_used[nearest] = logins
+            action = "refreshed"
+        else:
+            evict = adapted[np.argmin(last_used[adapted])]
+            templates[evict] = features
+            last_used[evict] = logins
+            action = "replaced"
+    user = dict(user)
+    user.update({
+        "templates": templates.astype(np.float32),
+        "template_origin": origin.astype(np.float32),
+        "template_last_used": last_used.astype(np.float32),
+        "logins": logins,
+    })
+    return user, action
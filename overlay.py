@@ -0,0 +1,129 @@
+import time
+import cv2
+
+
+class ThrottledObserver:
+    # Forwards at most `fps` frames per second to the wrapped observer; decision frames always go through.
+    def __init__(self, observer, fps):
+        self.observer = observer
+        self.interval = 1.0 / fps
+        self._last = None
+
+    def __call__(self, frame, result, state):
+        now = time.perf_counter()
+        if not state.get("authenticated") and self._last is not None and now - self._last < self.interval:
+            return True
+        self._last = now
+        return self.observer(frame, result, state)
+
+    def close(self):
+        close = getattr(self.observer, "close", None)
+        if close is not None:
+            close()
+
+
+class FirstFrameObserver:
+    # Calls on_first_frame() once, when the first processed frame reaches the wrapped observer.
+    def __init__(self, observer, on_first_frame):
+        self.observer = observer
+        self.on_first_frame = on_first_frame
+
+    def __call__(self, frame, result, state):
+        if self.on_first_frame is not None:
+            on_first_frame, self.on_first_frame = self.on_first_frame, None
+            on_first_frame()
+        return self.observer(frame, result, state)
+
+    def close(self):
+        close = getattr(self.observer, "close", None)
+        if close is not None:
+            close()
+
+
+class VerifyOverlay:
+    # sink: a preview.PreviewBuffer; frames are handed to it instead of a cv2.imshow window.
+    def __init__(self, auth, window="Gesture Authentication", show=True, hold_ms=1500, sink=None):
+        self.auth = auth
+        self.window = window
+        self.show = show
+        self.hold_ms = hold_ms
+        self.sink = sink
+
+    def _show(self, frame, wait_ms):
+        if self.sink is not None:
+            self.sink.publish(frame)
+            return not self.sink.cancelled
+        if not self.show:
+            return True
+        cv2.imshow(self.window, frame)
+        return cv2.waitKey(wait_ms) & 0xFF != 27
+
+    def _drawable(self, frame):
+        # Shared-memory ring frames are read-only RGB views; draw on a BGR copy instead.
+        if frame.flags.writeable:
+            return frame
+        return cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+
+    def __call__(self, frame, result, state):
+        frame = self._drawable(frame)
+        if result.multi_hand_landmarks:
+            for hand_landmarks in result.multi_hand_landmarks:
+                self.auth.draw_hand(frame, hand_landmarks)
+            if state["two_hands"]:
+                if state["hands"] >= 2:
+                    cv2.putText(frame, "TWO HANDS DETECTED", (10, frame.shape[0] - 60),
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                else:
+                    cv2.putText(frame, "SHOW BOTH HANDS!", (10, frame.shape[0] - 60),
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+            else:
+                cv2.putText(frame, "ONE HAND DETECTED", (10, frame.shape[0] - 60),
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+            if state["score"] is not None:
+                color = (0, 255, 0) if state["matched"] else (0, 0, 255)
+                status = "MATCH!" if state["matched"] else "NO MATCH"
+                cv2.putText(frame, status, (10, 40), cv2.FONT_HERSHEY_SIMPLEX, 1.5, color, 3)
+                cv2.putText(frame, f"Match: {state['score']:.1f}%", (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
+                if state.get("evidence") is not None:
+                    cv2.putText(frame, f"Evidence: {100 * state['evidence']:.0f}%", (10, 130), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 0), 2)
+                else:
+                    cv2.putText(frame, f"Stable: {state['stable_frames']}/{state['required_stable_frames']}", (10, 130), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 0), 2)
+                if state["authenticated"]:
+                    cv2.putText(frame, "AUTHENTICATED!", (10, 180), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 0), 3)
+                    self._show(frame, self.hold_ms)
+                    return True
+        else:
+            cv2.putText(frame, "No hand detected" if state["use_two_hands"] is False else "Show BOTH hands", (10, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
+        if self.sink is None:
+            cv2.putText(frame, "Press ESC to cancel", (10, frame.shape[0] - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+        return self._show(frame, 1)
+
+    def close(self):
+        if self.show and self.sink is None:
+            cv2.destroyAllWindows()
+
+
+class RecordOverlay(VerifyOverlay):
+    def __init__(self, auth, window="Record Gesture", show=True, sink=None):
+        super().__init__(auth, window, show, sink=sink)
+
+    def __call__(self, frame, result, state):
+        frame = self._drawable(frame)
+        if result.multi_hand_landmarks:
+            for hand_landmarks in result.multi_hand_landmarks:
+                self.auth.draw_hand(frame, hand_landmarks)
+            if state["two_hands"]:
+                if state["hands"] >= 2:
+                    cv2.putText(frame, "TWO HANDS DETECTED!", (10, frame.shape[0] - 60),
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                else:
+                    cv2.putText(frame, "SHOW BOTH HANDS!", (10, frame.shape[0] - 60),
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+            else:
+                cv2.putText(frame, "ONE HAND DETECTED!", (10, frame.shape[0] - 60),
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+        cv2.putText(frame, f"Recording: {state['remaining']}s", (10, 30),
+                   cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        cv2.putText(frame, f"Frames: {state['frames']}", (10, 70),
+                   cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        return self._show(frame, 1)
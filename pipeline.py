@@ -0,0 +1,153 @@
+import threading
+import time
+import cv2
+from frame_sources import frame_valid
+from metrics import Metrics
+
+
+class LatestSlot:
+    # Bounded single-slot queue: put() replaces a waiting item instead of blocking, and counts it as dropped.
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._full = False
+        self.closed = False
+        self.put_count = 0
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if self._full:
+                self.dropped += 1
+            self._item = item
+            self._full = True
+            self.put_count += 1
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._full or self.closed, timeout):
+                return None
+            if not self._full:
+                return None
+            item = self._item
+            self._item = None
+            self._full = False
+            return item
+
+    def depth(self):
+        return 1 if self._full else 0
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class FramePipeline:
+    # capture thread -> LatestSlot -> inference thread -> LatestSlot -> caller (render stage).
+    # Each stage only ever sees the newest item, so a slow stage drops frames instead of adding latency.
+    def __init__(self, cap, process, flip=True, metrics=None):
+        self.cap = cap
+        self.process = process
+        self.flip = flip
+        self.metrics = metrics if metrics is not None else Metrics(enabled=False)
+        self.raw_frames = getattr(cap, "provides_landmarks", False) or getattr(cap, "preprocessed", False)
+        self.captured = LatestSlot()
+        self.inferred = LatestSlot()
+        self.rendered = 0
+        self.torn = 0
+        self.latency = 0.0
+        self._running = False
+        self._threads = []
+        self._start_time = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def start(self):
+        self._running = True
+        self._start_time = time.perf_counter()
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="gesture-capture", daemon=True),
+            threading.Thread(target=self._inference_loop, name="gesture-inference", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._running = False
+        self.captured.close()
+        self.inferred.close()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout=2)
+        self._threads = []
+
+    def _capture_loop(self):
+        try:
+            while self._running and self.cap.isOpened():
+                t = self.metrics.now()
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                self.metrics.lap("capture", t)
+                self.captured.put((time.perf_counter(), frame))
+        finally:
+            self.captured.close()
+
+    def _inference_loop(self):
+        try:
+            while self._running:
+                item = self.captured.get()
+                if item is None:
+                    break
+                captured_at, frame = item
+                t = self.metrics.now()
+                if self.raw_frames:
+                    rgb = frame
+                else:
+                    if self.flip:
+                        frame = cv2.flip(frame, 1)
+                    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                    t = self.metrics.lap("preprocess", t)
+                result = self.process(rgb)
+                self.metrics.lap("inference", t)
+                if not frame_valid(rgb):
+                    # The ring writer lapped this frame during inference; the result may mix two frames.
+                    self.torn += 1
+                    continue
+                self.inferred.put((captured_at, frame, result))
+        finally:
+            self.inferred.close()
+
+    def __iter__(self):
+        while self._running:
+            item = self.inferred.get()
+            if item is None:
+                break
+            captured_at, frame, result = item
+            self.rendered += 1
+            self.latency = time.perf_counter() - captured_at
+            self.metrics.lap("latency", captured_at)
+            yield frame, result
+
+    def stats(self):
+        elapsed = max(time.perf_counter() - (self._start_time or time.perf_counter()), 1e-9)
+        return {
+            "captured": self.captured.put_count,
+            "inferred": self.inferred.put_count,
+            "rendered": self.rendered,
+            "capture_queue_depth": self.captured.depth(),
+            "inference_queue_depth": self.inferred.depth(),
+            "dropped_before_inference": self.captured.dropped,
+            "dropped_before_render": self.inferred.dropped,
+            "torn_frames": self.torn,
+            "render_fps": self.rendered / elapsed,
+            "latency_ms": self.latency * 1000,
+        }
@@ -0,0 +1,188 @@
+import threading
+import time
+import cv2
+import numpy as np
+from frame_sources import HandResult
+
+
+def _downscale(image, width):
+    h, w = image.shape[:2]
+    if w <= width:
+        return image
+    return cv2.resize(image, (width, max(1, int(h * width / w))), interpolation=cv2.INTER_AREA)
+
+
+class MotionDetector:
+    # Fraction of pixels that changed by more than pixel_threshold between consecutive tiny grayscale frames.
+    def __init__(self, pixel_threshold=25, area=0.02, width=160):
+        self.pixel_threshold = pixel_threshold
+        self.area = area
+        self.width = width
+        self._previous = None
+
+    def reset(self):
+        self._previous = None
+
+    def __call__(self, rgb):
+        gray = cv2.GaussianBlur(cv2.cvtColor(_downscale(rgb, self.width), cv2.COLOR_RGB2GRAY), (5, 5), 0)
+        previous, self._previous = self._previous, gray
+        if previous is None or previous.shape != gray.shape:
+            return False
+        return float(np.mean(cv2.absdiff(gray, previous) > self.pixel_threshold)) >= self.area
+
+    def close(self):
+        pass
+
+
+class FaceDetector:
+    # MediaPipe face detection (short-range model) on a downscaled frame. With a pool, the graph is
+    # borrowed from it and handed back on close instead of being built and torn down every session.
+    def __init__(self, mp_face, min_confidence=0.5, width=320, pool=None):
+        self.width = width
+        self.pool = pool
+        if pool is not None:
+            self.detector = pool.take()
+        else:
+            self.detector = mp_face.FaceDetection(model_selection=0, min_detection_confidence=min_confidence)
+
+    def reset(self):
+        pass
+
+    def __call__(self, rgb):
+        return bool(self.detector.process(np.ascontiguousarray(_downscale(rgb, self.width))).detections)
+
+    def close(self):
+        if self.detector is None:
+            return
+        detector, self.detector = self.detector, None
+        if self.pool is not None:
+            self.pool.release(detector)
+        else:
+            detector.close()
+
+
+class FaceDetectorPool:
+    # Keeps built face-detection graphs between sessions, like HandsPool does for Hands.
+    def __init__(self, mp_face, min_confidence=0.5, max_idle=1):
+        self.mp_face = mp_face
+        self.min_confidence = min_confidence
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+        self.created = 0
+
+    def acquire(self, width=320):
+        return FaceDetector(self.mp_face, self.min_confidence, width, pool=self)
+
+    def take(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+            self.created += 1
+        return self.mp_face.FaceDetection(model_selection=0, min_detection_confidence=self.min_confidence)
+
+    def release(self, detector):
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(detector)
+                return
+        detector.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for detector in idle:
+            detector.close()
+
+
+class PresenceGate:
+    # Wraps a Hands-like object. While idle, hands.process is skipped and only the cheap detector runs,
+    # at idle_fps; once it fires, every frame goes to hands.process until no hand has been seen for
+    # idle_after seconds. `previous` is the gate of the last session: its mode, timers and counters carry
+    # over, so a kiosk that starts one short session after another still goes (and stays) idle.
+    def __init__(self, hands, detector, idle_fps=2.0, idle_after=5.0, start_active=True, previous=None):
+        self.hands = hands
+        self.detector = detector
+        self.idle_interval = 1.0 / idle_fps
+        self.idle_after = idle_after
+        if previous is not None:
+            self.active = previous.active
+            self._last_seen = previous._last_seen
+            self._last_check = previous._last_check
+            self._mode_since = previous._mode_since
+            self.idle_checks = previous.idle_checks
+            self.activations = previous.activations
+            self.idle_seconds = previous.idle_seconds
+            self.active_seconds = previous.active_seconds
+            return
+        self.active = start_active
+        now = time.perf_counter()
+        self._last_seen = now
+        self._last_check = None
+        self._mode_since = now
+        self.idle_checks = 0
+        self.activations = 0
+        self.idle_seconds = 0.0
+        self.active_seconds = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.detector.close()
+        return self.hands.__exit__(*exc)
+
+    def close(self):
+        self.detector.close()
+        self.hands.close()
+
+    def _switch(self, active, now):
+        elapsed = now - self._mode_since
+        if self.active:
+            self.active_seconds += elapsed
+        else:
+            self.idle_seconds += elapsed
+        self.active = active
+        self._mode_since = now
+        if active:
+            self.activations += 1
+            self._last_seen = now
+        else:
+            self.detector.reset()
+            reset = getattr(self.hands, "reset", None)
+            if reset is not None:
+                reset()
+
+    def idle_delay(self):
+        # How long a capture loop may sleep before the next idle check is due (0 when active).
+        if self.active or self._last_check is None:
+            return 0.0
+        return max(0.0, self._last_check + self.idle_interval - time.perf_counter())
+
+    def process(self, image):
+        now = time.perf_counter()
+        if not self.active:
+            if self._last_check is not None and now - self._last_check < self.idle_interval:
+                return HandResult()
+            self._last_check = now
+            self.idle_checks += 1
+            if not self.detector(image):
+                return HandResult()
+            self._switch(True, now)
+        result = self.hands.process(image)
+        if result.multi_hand_landmarks:
+            self._last_seen = now
+        elif now - self._last_seen >= self.idle_after:
+            self._switch(False, now)
+            self._last_check = now
+        return result
+
+    def stats(self):
+        elapsed = time.perf_counter() - self._mode_since
+        return {
+            "active": self.active,
+            "activations": self.activations,
+            "idle_checks": self.idle_checks,
+            "active_seconds": self.active_seconds + (elapsed if self.active else 0.0),
+            "idle_seconds": self.idle_seconds + (0.0 if self.active else elapsed),
+        }
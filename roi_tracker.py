@@ -0,0 +1,147 @@
+import time
+import cv2
+import numpy as np
+from frame_sources import HandResult
+from gesture_features import landmarks_to_array
+
+
+class RoiHands:
+    # Wraps a Hands-like object and runs it on a crop around the hands found in the previous frame.
+    # Landmarks are mapped back to full-frame normalized coordinates, so features are unaffected.
+    # While fewer than max_hands hands are tracked, every rescan_every-th frame is a full-frame scan so a
+    # hand outside the crop is still found.
+    def __init__(self, hands, track=True, margin=0.3, edge=0.1, budget_ms=None, min_scale=0.4, min_side=96,
+                 max_hands=2, rescan_every=10):
+        self.hands = hands
+        self.track = track
+        self.max_hands = max_hands
+        self.rescan_every = rescan_every
+        self.margin = margin
+        self.edge = edge
+        self.budget_ms = budget_ms
+        self.min_scale = min_scale
+        self.min_side = min_side
+        self.scale = 1.0
+        self.box = None
+        self.expected_hands = 0
+        self.partial_frames = 0
+        self.inference_ms = None
+        self.roi_frames = 0
+        self.full_scans = 0
+        self.rescans = 0
+        self.lost = 0
+
+    def __enter__(self):
+        self.reset()
+        return self
+
+    def reset(self):
+        # Forget the previous session's crop; the inference scale is a property of the machine and stays.
+        self.box = None
+        self.expected_hands = 0
+        self.partial_frames = 0
+        reset = getattr(self.hands, "reset", None)
+        if reset is not None:
+            reset()
+
+    def __exit__(self, *exc):
+        return self.hands.__exit__(*exc)
+
+    def close(self):
+        self.hands.close()
+
+    def _infer(self, image):
+        h, w = image.shape[:2]
+        scale = max(self.scale, self.min_side / min(h, w)) if min(h, w) else 1.0
+        if scale < 1.0:
+            image = cv2.resize(image, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+        else:
+            image = np.ascontiguousarray(image)
+        start = time.perf_counter()
+        result = self.hands.process(image)
+        self._adapt((time.perf_counter() - start) * 1000)
+        return result
+
+    def _adapt(self, elapsed_ms):
+        self.inference_ms = elapsed_ms if self.inference_ms is None else 0.8 * self.inference_ms + 0.2 * elapsed_ms
+        if self.budget_ms is None:
+            return
+        if self.inference_ms > self.budget_ms:
+            self.scale = max(self.min_scale, self.scale * 0.85)
+        elif self.inference_ms < 0.6 * self.budget_ms:
+            self.scale = min(1.0, self.scale * 1.05)
+
+    def _needs_new_box(self, points, width, height):
+        if self.box is None:
+            return True
+        x0, y0, x1, y1 = self.box
+        pad_x = self.edge * (x1 - x0)
+        pad_y = self.edge * (y1 - y0)
+        px = points[..., 0] * width
+        py = points[..., 1] * height
+        return px.min() < x0 + pad_x or px.max() > x1 - pad_x or py.min() < y0 + pad_y or py.max() > y1 - pad_y
+
+    def _update_box(self, points, width, height):
+        # The crop only moves when the hands near its edge, so MediaPipe's tracker keeps a stable frame.
+        if not self.track or not self._needs_new_box(points, width, height):
+            return
+        x0, y0 = points[..., 0].min() * width, points[..., 1].min() * height
+        x1, y1 = points[..., 0].max() * width, points[..., 1].max() * height
+        side = max(x1 - x0, y1 - y0) * (1 + 2 * self.margin)
+        cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+        box = (
+            int(max(0, cx - side / 2)), int(max(0, cy - side / 2)),
+            int(min(width, cx + side / 2)), int(min(height, cy + side / 2)),
+        )
+        self._set_box(box if box[2] - box[0] >= 8 and box[3] - box[1] >= 8 else None)
+
+    def _set_box(self, box):
+        # MediaPipe tracks in the coordinates of its input image, so its state is stale once the crop moves.
+        self.box = box
+        reset = getattr(self.hands, "reset", None)
+        if reset is not None:
+            reset()
+
+    def process(self, rgb):
+        height, width = rgb.shape[:2]
+        if self.box is not None and self.expected_hands < self.max_hands:
+            self.partial_frames += 1
+            if self.partial_frames >= self.rescan_every:
+                self.rescans += 1
+                self._set_box(None)
+        if self.box is not None:
+            x0, y0, x1, y1 = self.box
+            result = self._infer(rgb[y0:y1, x0:x1])
+            found = result.multi_hand_landmarks or []
+            if found and len(found) >= self.expected_hands:
+                self.roi_frames += 1
+                self.expected_hands = len(found)
+                crop_w, crop_h = x1 - x0, y1 - y0
+                points = np.stack([landmarks_to_array(h) for h in found])
+                points[..., 0] = (x0 + points[..., 0] * crop_w) / width
+                points[..., 1] = (y0 + points[..., 1] * crop_h) / height
+                points[..., 2] *= crop_w / width
+                self._update_box(points, width, height)
+                return HandResult(list(points))
+            self.lost += 1
+            self._set_box(None)
+        self.full_scans += 1
+        self.partial_frames = 0
+        result = self._infer(rgb)
+        found = result.multi_hand_landmarks or []
+        self.expected_hands = len(found)
+        if not found:
+            return HandResult(None)
+        points = np.stack([landmarks_to_array(h) for h in found])
+        self._update_box(points, width, height)
+        return HandResult(list(points))
+
+    def stats(self):
+        return {
+            "roi_frames": self.roi_frames,
+            "full_scans": self.full_scans,
+            "rescans": self.rescans,
+            "lost": self.lost,
+            "scale": self.scale,
+            "inference_ms": self.inference_ms,
+        }
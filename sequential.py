@@ -0,0 +1,56 @@
+import math
+
+ACCEPT = "accept"
+REJECT = "reject"
+
+
+class SequentialTest:
+    # Wald's sequential probability ratio test over the per-frame similarity stream.
+    # Scores are modelled as Gaussians around genuine_mean (same user) and impostor_mean (someone else).
+    def __init__(self, far=0.001, frr=0.01, genuine_mean=None, impostor_mean=None, sigma=10.0,
+                 frame_weight=0.5, max_step=2.0, max_frames=None):
+        self.far = far
+        self.frr = frr
+        self.genuine_mean = genuine_mean
+        self.impostor_mean = impostor_mean
+        self.sigma = sigma
+        # Consecutive frames are strongly correlated, so each one counts as a fraction of an independent sample.
+        self.frame_weight = frame_weight
+        self.max_step = max_step
+        self.max_frames = max_frames
+        self.accept_bound = math.log((1 - frr) / far)
+        self.reject_bound = math.log(frr / (1 - far))
+        self.reset()
+
+    def calibrate(self, threshold):
+        if self.genuine_mean is None:
+            self.genuine_mean = threshold + 10.0
+        if self.impostor_mean is None:
+            self.impostor_mean = threshold - 20.0
+        return self
+
+    def reset(self):
+        self.llr = 0.0
+        self.frames = 0
+        self.decision = None
+
+    def update(self, score):
+        if self.decision is not None:
+            return self.decision
+        mu1, mu0 = self.genuine_mean, self.impostor_mean
+        step = ((score - mu0) ** 2 - (score - mu1) ** 2) / (2 * self.sigma ** 2)
+        step = max(-self.max_step, min(self.max_step, step))
+        self.llr += self.frame_weight * step
+        self.frames += 1
+        if self.llr >= self.accept_bound:
+            self.decision = ACCEPT
+        elif self.llr <= self.reject_bound:
+            self.decision = REJECT
+        elif self.max_frames is not None and self.frames >= self.max_frames:
+            self.decision = REJECT
+        return self.decision
+
+    def progress(self):
+        if self.llr >= 0:
+            return min(1.0, self.llr / self.accept_bound)
+        return -min(1.0, self.llr / self.reject_bound)
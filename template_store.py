@@ -0,0 +1,247 @@
+import argparse
+import json
+import os
+import struct
+import threading
+import zlib
+import numpy as np
+
+INDEX_FILE = "index.json"
+RECORD_HEADER = struct.Struct("<III")
+STORE_VERSION = 1
+
+
+def _is_array(value):
+    return isinstance(value, (np.ndarray, list, tuple))
+
+
+def _fsync_dir(path):
+    if os.name == "nt":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class TemplateStore:
+    # Layout of the store directory:
+    #   index.json          metadata index; replacing it atomically is the commit point
+    #   templates-<g>.f32   flat float32 snapshot, gestures grouped per hand mode, memory-mapped on load
+    #   journal-<g>.log     append-only (crc32, meta_len, data_len, meta, float32 data) records since snapshot <g>
+    def __init__(self, path, compact_every=1000):
+        self.path = path
+        self.compact_every = compact_every
+        self.generation = 0
+        self.journal_records = 0
+        self.skipped_records = 0
+        self.users = {}
+        self._journal = None
+        self._lock = threading.Lock()
+
+    def exists(self):
+        return os.path.exists(os.path.join(self.path, INDEX_FILE))
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def load(self):
+        with self._lock:
+            self.close()
+            self.users = {}
+            if not self.exists():
+                self._write_snapshot()
+                return self.users
+            with open(self._file(INDEX_FILE), "r") as f:
+                index = json.load(f)
+            self.generation = index["generation"]
+            data_file = self._file(index["templates"])
+            data = np.memmap(data_file, dtype=np.float32, mode="r") if os.path.getsize(data_file) else np.empty(0, np.float32)
+            for username, entry in index["users"].items():
+                user = dict(entry["fields"])
+                for name, (offset, shape) in entry["arrays"].items():
+                    user[name] = data[offset:offset + int(np.prod(shape))].reshape(shape)
+                self.users[username] = user
+            self._replay(self._file(index["journal"]))
+            self._remove_stale(index)
+            return self.users
+
+    def _replay(self, journal_path):
+        # Only the last record can be torn (a crash mid-append), so only a record running past the end of
+        # the file is cut off. A complete record with a bad checksum is skipped by its length prefix and
+        # counted in skipped_records. A short record after such a skip means the lengths themselves can't
+        # be trusted, so the journal is left untouched and loading fails instead of cutting off what follows.
+        self.journal_records = 0
+        self.skipped_records = 0
+        valid = 0
+        if os.path.exists(journal_path):
+            with open(journal_path, "rb") as f:
+                blob = f.read()
+            pos = 0
+            while pos < len(blob):
+                end = pos + RECORD_HEADER.size
+                if end <= len(blob):
+                    crc, meta_len, data_len = RECORD_HEADER.unpack_from(blob, pos)
+                    end += meta_len + data_len
+                if end > len(blob):
+                    if self.skipped_records:
+                        raise ValueError(f"{journal_path} is corrupt at byte {pos}")
+                    break
+                body = blob[pos + RECORD_HEADER.size:end]
+                if zlib.crc32(body) != crc:
+                    self.skipped_records += 1
+                else:
+                    self._apply(json.loads(body[:meta_len]), body[meta_len:])
+                    self.journal_records += 1
+                pos = end
+            valid = pos
+        # Drop a torn tail left by a crash in the middle of an append.
+        self._journal = open(journal_path, "ab")
+        self._journal.truncate(valid)
+        self._journal.seek(valid)
+
+    def _apply(self, meta, data):
+        if meta["op"] == "del":
+            self.users.pop(meta["user"], None)
+            return
+        user = dict(meta["fields"])
+        values = np.frombuffer(data, dtype=np.float32)
+        offset = 0
+        for name, shape in meta["arrays"]:
+            size = int(np.prod(shape))
+            user[name] = values[offset:offset + size].reshape(shape)
+            offset += size
+        self.users[meta["user"]] = user
+
+    def _append(self, meta, data=b""):
+        meta_bytes = json.dumps(meta).encode("utf-8")
+        body = meta_bytes + data
+        self._journal.write(RECORD_HEADER.pack(zlib.crc32(body), len(meta_bytes), len(data)) + body)
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self.journal_records += 1
+
+    def put(self, username, user):
+        fields = {}
+        arrays = []
+        chunks = []
+        for name, value in user.items():
+            if _is_array(value):
+                value = np.ascontiguousarray(value, dtype=np.float32)
+                arrays.append([name, list(value.shape)])
+                chunks.append(value.tobytes())
+            else:
+                fields[name] = value
+        meta = {"op": "put", "user": username, "fields": fields, "arrays": arrays}
+        with self._lock:
+            self._append(meta, b"".join(chunks))
+            self._apply(meta, b"".join(chunks))
+            if self.journal_records >= self.compact_every:
+                self._write_snapshot()
+
+    def put_many(self, users):
+        with self._lock:
+            for username, user in users.items():
+                self.users[username] = {
+                    name: np.array(value, dtype=np.float32) if _is_array(value) else value
+                    for name, value in user.items()
+                }
+            self._write_snapshot()
+
+    def delete(self, username):
+        with self._lock:
+            if username not in self.users:
+                return False
+            self._append({"op": "del", "user": username})
+            self.users.pop(username)
+            if self.journal_records >= self.compact_every:
+                self._write_snapshot()
+            return True
+
+    def compact(self):
+        with self._lock:
+            self._write_snapshot()
+
+    def _write_snapshot(self):
+        os.makedirs(self.path, exist_ok=True)
+        generation = self.generation + 1
+        templates = f"templates-{generation}.f32"
+        journal = f"journal-{generation}.log"
+        entries = {}
+        offset = 0
+        # Gestures of each hand mode go first and contiguously so galleries can map them as one matrix.
+        order = sorted(self.users, key=lambda u: bool(self.users[u].get("two_hands", True)))
+        with open(self._file(templates), "wb") as f:
+            for gestures in (True, False):
+                for username in order:
+                    entry = entries.setdefault(username, {"fields": {}, "arrays": {}})
+                    for name, value in self.users[username].items():
+                        if not _is_array(value):
+                            entry["fields"][name] = value
+                        elif (name == "gesture") == gestures:
+                            value = np.ascontiguousarray(value, dtype=np.float32)
+                            f.write(value.tobytes())
+                            entry["arrays"][name] = [offset, list(value.shape)]
+                            offset += value.size
+            f.flush()
+            os.fsync(f.fileno())
+        open(self._file(journal), "wb").close()
+        index = {
+            "version": STORE_VERSION,
+            "generation": generation,
+            "templates": templates,
+            "journal": journal,
+            "users": entries,
+        }
+        tmp = self._file(INDEX_FILE + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(index, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._file(INDEX_FILE))
+        _fsync_dir(self.path)
+        self.generation = generation
+        self.close()
+        self._journal = open(self._file(journal), "ab")
+        self.journal_records = 0
+        self._remove_stale(index)
+
+    def _remove_stale(self, index):
+        keep = {INDEX_FILE, index["templates"], index["journal"]}
+        for name in os.listdir(self.path):
+            if name not in keep and (name.startswith("templates-") or name.startswith("journal-")):
+                try:
+                    os.remove(self._file(name))
+                except OSError:
+                    # Still memory-mapped (Windows); removed on a later load.
+                    pass
+
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def migrate_json(self, json_path):
+        with open(json_path, "r") as f:
+            users = json.load(f)
+        with self._lock:
+            self.close()
+            self.users = {}
+        self.put_many(users)
+        return self.users
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate users_db.json into a binary template store")
+    parser.add_argument("json_path", nargs="?", default="users_db.json")
+    parser.add_argument("store_path", nargs="?", default="users_db")
+    args = parser.parse_args()
+    store = TemplateStore(args.store_path)
+    users = store.migrate_json(args.json_path)
+    store.close()
+    print(f"Migrated {len(users)} users to {args.store_path}")
+
+
+if __name__ == "__main__":
+    main()
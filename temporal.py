@@ -0,0 +1,210 @@
+from collections import deque
+import numpy as np
+from gesture_features import feature_size
+from gesture_gallery import distance_to_similarity
+
+SEQUENCE_LENGTH = 32
+BAND = 4
+PAA_SEGMENTS = 8
+
+
+def resample_sequence(features, length=SEQUENCE_LENGTH):
+    # Linear interpolation along time, so recordings of any frame count compare step for step.
+    features = np.asarray(features, dtype=np.float64)
+    if len(features) == 1:
+        return np.repeat(features, length, axis=0)
+    position = np.linspace(0, len(features) - 1, length)
+    left = np.floor(position).astype(int)
+    right = np.minimum(left + 1, len(features) - 1)
+    weight = (position - left)[:, None]
+    return features[left] * (1 - weight) + features[right] * weight
+
+
+def envelope(sequence, band=BAND):
+    # Running max/min over a +-band window: the LB_Keogh envelope of a (length, dim) sequence.
+    padded = np.pad(sequence, ((band, band), (0, 0)), mode="edge")
+    windows = np.lib.stride_tricks.sliding_window_view(padded, 2 * band + 1, axis=0)
+    return windows.max(axis=-1), windows.min(axis=-1)
+
+
+def lb_keogh(upper, lower, candidates, weight=1):
+    # Lower bound on the banded DTW cost of every candidate at once: squared excursions outside the envelope.
+    outside = (candidates - np.clip(candidates, lower, upper)).reshape(len(candidates), -1)
+    return weight * np.einsum("ij,ij->i", outside, outside)
+
+
+def paa(sequences, segments):
+    # Piecewise aggregate approximation: mean over equal time segments.
+    return sequences.reshape(sequences.shape[:-2] + (segments, -1, sequences.shape[-1])).mean(axis=-2)
+
+
+def paa_envelope(upper, lower, segments):
+    # Loosened envelope per segment; LB_Keogh on PAA means against it still bounds the full LB_Keogh (Jensen).
+    upper = upper.reshape(segments, -1, upper.shape[-1]).max(axis=1)
+    lower = lower.reshape(segments, -1, lower.shape[-1]).min(axis=1)
+    return upper, lower
+
+
+def dtw_costs(query, candidates, band=BAND):
+    # Banded DTW with squared-Euclidean local cost for a batch of equal-length candidates.
+    # Cells on one anti-diagonal only depend on the previous two, so each diagonal is one vectorized
+    # update across all of its cells and all candidates.
+    length = len(query)
+    cost = (np.einsum("ld,ld->l", query, query)[None, :, None]
+            + np.einsum("bld,bld->bl", candidates, candidates)[:, None, :]
+            - 2 * (query @ candidates.transpose(0, 2, 1)))
+    np.maximum(cost, 0, out=cost)
+    acc = np.full((len(candidates), length + 1, length + 1), np.inf)
+    acc[:, 0, 0] = 0
+    for k in range(2, 2 * length + 1):
+        i = np.arange(max(1, k - length), min(length, k - 1) + 1)
+        i = i[np.abs(2 * i - k) <= band]
+        j = k - i
+        acc[:, i, j] = cost[:, i - 1, j - 1] + np.minimum(np.minimum(acc[:, i - 1, j], acc[:, i, j - 1]), acc[:, i - 1, j - 1])
+    return acc[:, length, length]
+
+
+def dtw_distance(query, candidates, band=BAND):
+    # Root mean cost per step, so an unchanging pose scores exactly like the static template distance.
+    return np.sqrt(dtw_costs(query, candidates, band) / len(query))
+
+
+class SequenceMatrix:
+    def __init__(self, dim, length=SEQUENCE_LENGTH, segments=PAA_SEGMENTS, capacity=64):
+        self.dim = dim
+        self.length = length
+        self.segments = segments
+        self.names = []
+        self.rows = {}
+        self.sequences = np.empty((capacity, length, dim), dtype=np.float32)
+        self.reduced = np.empty((capacity, segments, dim), dtype=np.float32)
+        self.frame_counts = np.empty(capacity, dtype=np.int64)
+        self.last_pruned = 0
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.rows
+
+    def add(self, name, sequence, frames):
+        row = self.rows.get(name)
+        if row is None:
+            row = len(self.names)
+            if row == len(self.sequences):
+                size = 2 * len(self.sequences)
+                sequences = np.empty((size, self.length, self.dim), dtype=np.float32)
+                reduced = np.empty((size, self.segments, self.dim), dtype=np.float32)
+                frame_counts = np.empty(size, dtype=np.int64)
+                sequences[:row] = self.sequences[:row]
+                reduced[:row] = self.reduced[:row]
+                frame_counts[:row] = self.frame_counts[:row]
+                self.sequences, self.reduced, self.frame_counts = sequences, reduced, frame_counts
+            self.names.append(name)
+            self.rows[name] = row
+        self.sequences[row] = sequence
+        self.reduced[row] = paa(self.sequences[row], self.segments)
+        self.frame_counts[row] = frames
+
+    def remove(self, name):
+        row = self.rows.pop(name, None)
+        if row is None:
+            return
+        last = len(self.names) - 1
+        if row != last:
+            moved = self.names[last]
+            self.sequences[row] = self.sequences[last]
+            self.reduced[row] = self.reduced[last]
+            self.frame_counts[row] = self.frame_counts[last]
+            self.names[row] = moved
+            self.rows[moved] = row
+        self.names.pop()
+
+    def window_frames(self):
+        return int(np.median(self.frame_counts[:len(self.names)])) if self.names else 0
+
+    def search(self, probe, top_k=5, band=BAND, batch=64):
+        # Cascade: PAA lower bound for everyone, LB_Keogh for each batch in bound order, DTW for survivors.
+        size = len(self.names)
+        if size == 0:
+            return []
+        probe = np.asarray(probe, dtype=np.float64)
+        upper, lower = envelope(probe, band)
+        paa_upper, paa_lower = paa_envelope(upper, lower, self.segments)
+        bounds = lb_keogh(paa_upper.astype(np.float32), paa_lower.astype(np.float32), self.reduced[:size],
+                          self.length // self.segments)
+        order = np.argsort(bounds)
+        top_k = min(top_k, size)
+        best_rows = np.empty(0, dtype=np.int64)
+        best_costs = np.empty(0)
+        checked = 0
+        computed = 0
+        while checked < size:
+            # Stop once the next lower bound can't beat the current k-th best exact cost.
+            if len(best_costs) == top_k and bounds[order[checked]] >= best_costs[-1]:
+                break
+            rows = order[checked:checked + batch]
+            checked += len(rows)
+            candidates = self.sequences[rows].astype(np.float64)
+            if len(best_costs) == top_k:
+                keep = lb_keogh(upper, lower, candidates) < best_costs[-1]
+                rows, candidates = rows[keep], candidates[keep]
+            if not len(rows):
+                continue
+            computed += len(rows)
+            best_rows = np.concatenate([best_rows, rows])
+            best_costs = np.concatenate([best_costs, dtw_costs(probe, candidates, band)])
+            keep = np.argsort(best_costs)[:top_k]
+            best_rows, best_costs = best_rows[keep], best_costs[keep]
+        self.last_pruned = size - computed
+        scores = distance_to_similarity(np.sqrt(best_costs / self.length))
+        return [(self.names[row], float(s)) for row, s in zip(best_rows, scores)]
+
+
+class SequenceGallery:
+    def __init__(self, length=SEQUENCE_LENGTH):
+        self.length = length
+        self.one_hand = SequenceMatrix(feature_size(1), length)
+        self.two_hands = SequenceMatrix(feature_size(2), length)
+
+    def __len__(self):
+        return len(self.one_hand) + len(self.two_hands)
+
+    def matrix_for(self, two_hands):
+        return self.two_hands if two_hands else self.one_hand
+
+    def add(self, username, sequence, frames, two_hands):
+        self.remove(username)
+        self.matrix_for(two_hands).add(username, sequence, frames)
+
+    def remove(self, username):
+        self.one_hand.remove(username)
+        self.two_hands.remove(username)
+
+    def rebuild(self, users):
+        self.__init__(self.length)
+        for username, user in users.items():
+            if user.get("sequence") is not None:
+                self.add(username, user["sequence"], user.get("sequence_frames", self.length),
+                         user.get("two_hands", True))
+
+    def identify(self, sequence, two_hands, top_k=5):
+        if sequence is None:
+            return []
+        return self.matrix_for(two_hands).search(sequence, top_k)
+
+
+class SlidingWindow:
+    # Keeps the last `frames` feature vectors; once full, every push returns the resampled window.
+    def __init__(self, frames, length=SEQUENCE_LENGTH):
+        self.length = length
+        self.window = deque(maxlen=max(2, frames))
+
+    def push(self, features):
+        self.window.append(features)
+        if len(self.window) < self.window.maxlen:
+            return None
+        return resample_sequence(np.array(self.window), self.length)
+
+    def reset(self):
+        self.window.clear()
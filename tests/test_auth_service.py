@@ -0,0 +1,115 @@
+import asyncio
+import threading
+import time
+import numpy as np
+from synthetic import SyntheticUsers
+from auth_service import AuthService, ServiceClient
+from frame_sources import LandmarkReplaySource
+from gesture_auth import GestureAuthenticator
+
+USERS = SyntheticUsers(0, 2)
+
+
+def make_service(tmp_path):
+    auth = GestureAuthenticator(store_path=str(tmp_path / "store"), warm_hands=False,
+                                frame_source=LandmarkReplaySource(np.zeros((1, 2, 21, 3), np.float32)))
+    return AuthService(auth, workers=1)
+
+
+async def run(service, scenario):
+    server = await asyncio.start_server(service.handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        return await scenario(port)
+
+
+def test_register_reserves_the_username(tmp_path):
+    service = make_service(tmp_path)
+
+    async def scenario(port):
+        first = await ServiceClient(port=port).connect()
+        second = await ServiceClient(port=port).connect()
+        assert (await first.open("register", user="alice"))["status"] == "ready"
+        refused = await second.open("register", user="alice")
+        assert refused == {"status": "error", "error": "Username already exists!"}
+        for hands in USERS.stream(0, 120):
+            reply = await first.send_landmarks(hands)
+            if reply["status"] != "pending":
+                break
+        assert reply["status"] == "registered"
+        # The name stays taken once registered, and is free again if the session is abandoned.
+        assert (await second.open("register", user="alice"))["status"] == "error"
+        assert (await second.open("register", user="bob"))["status"] == "ready"
+        await second.close()
+        await asyncio.sleep(0.05)
+        assert service.registering == set()
+        await first.close()
+
+    asyncio.run(run(service, scenario))
+    assert "alice" in service.auth.users
+    service.close()
+
+
+def test_store_writes_run_off_the_event_loop(tmp_path):
+    service = make_service(tmp_path)
+    threads = []
+    put = service.auth.store.put
+
+    def recording_put(username, user):
+        threads.append(threading.current_thread())
+        put(username, user)
+
+    service.auth.store.put = recording_put
+
+    async def scenario(port):
+        client = await ServiceClient(port=port).connect()
+        await client.open("register", user="alice")
+        for hands in USERS.stream(0, 120):
+            if (await client.send_landmarks(hands))["status"] != "pending":
+                break
+        await client.open("verify", user="alice")
+        for hands in USERS.stream(0, 60, session=1):
+            reply = await client.send_landmarks(hands)
+            if reply["status"] != "pending":
+                break
+        await client.close()
+        return reply
+
+    reply = asyncio.run(run(service, scenario))
+    assert reply["status"] == "accepted" and reply["adapted"]
+    assert len(threads) == 2 and threading.main_thread() not in threads
+    service.close()
+
+
+def test_concurrent_logins_of_one_user_both_adapt(tmp_path):
+    service = make_service(tmp_path)
+    auth = service.auth
+    gesture = np.zeros(auth.gallery.two_hands.dim, np.float32)
+    auth.store.put("alice", {"gesture": gesture, "two_hands": True, "created_at": ""})
+    auth.gallery.rebuild(auth.users)
+    put = auth.store.put
+
+    def slow_put(username, user):
+        # Long enough for the other login to compute its update from the same stored record.
+        time.sleep(0.1)
+        put(username, user)
+
+    auth.store.put = slow_put
+    sessions = []
+    for axis in (0, 1):
+        session, _ = service.open_session({"op": "verify", "user": "alice"})
+        login = gesture.copy()
+        login[axis] = 0.4
+        session.accepted.append(login)
+        sessions.append(session)
+
+    async def scenario():
+        return await asyncio.gather(*(session.accept({}, "alice", 100.0) for session in sessions))
+
+    replies = asyncio.run(scenario())
+    assert [reply["adapted"] for reply in replies] == ["added", "added"]
+    # Neither login's template may be lost to the other's write, in the store or the gallery.
+    alice = auth.users["alice"]
+    assert alice["logins"] == 2 and len(alice["templates"]) == 3
+    assert auth.gallery.counts["alice"] == 3
+    service.close()
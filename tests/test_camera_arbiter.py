@@ -0,0 +1,148 @@
+import threading
+import time
+import numpy as np
+import pytest
+from synthetic import SyntheticUsers
+from camera_arbiter import CameraArbiter, CameraBusy, SharedHands, SharedResults
+from frame_sources import LandmarkReplaySource
+
+
+class FakeCamera:
+    # Live-camera stand-in: frames numbered from 1, at most one every `delay` seconds.
+    realtime = True
+
+    def __init__(self, delay=0.002):
+        self.delay = delay
+        self.frames = 0
+        self.opens = 0
+        self.released = True
+
+    def open(self):
+        self.opens += 1
+        self.released = False
+        return self
+
+    def isOpened(self):
+        return not self.released
+
+    def read(self):
+        time.sleep(self.delay)
+        self.frames += 1
+        return True, np.full((2, 2, 3), self.frames % 256, np.uint8)
+
+    def release(self):
+        self.released = True
+
+
+@pytest.fixture
+def camera():
+    source = FakeCamera()
+    arbiter = CameraArbiter(source.open, idle_release=0.05)
+    yield source, arbiter
+    arbiter.close()
+
+
+def test_second_exclusive_lease_is_refused(camera):
+    _, arbiter = camera
+    with arbiter.acquire():
+        with pytest.raises(CameraBusy):
+            arbiter.acquire(wait=0)
+        with pytest.raises(CameraBusy):
+            arbiter.acquire(exclusive=False, wait=0.05)
+    arbiter.acquire(wait=0).release()
+
+
+def test_shared_leases_see_the_same_frames_in_lockstep():
+    stream = SyntheticUsers(0, 2).stream(0, 40)
+    arbiter = CameraArbiter(LandmarkReplaySource(stream).open)
+    leases = [arbiter.acquire(exclusive=False) for _ in range(2)]
+    seen = [[], []]
+
+    def run(i):
+        while True:
+            ok, frame = leases[i].read()
+            if not ok:
+                break
+            seen[i].append((leases[i].seq, np.stack(frame.landmarks)))
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    arbiter.close()
+    # Replays are not live: no frame is skipped and both sessions get every one, paired with its own hands.
+    assert [seq for seq, _ in seen[0]] == [seq for seq, _ in seen[1]] == list(range(1, 41))
+    for i, ((_, a), (_, b)) in enumerate(zip(*seen)):
+        np.testing.assert_array_equal(a, stream[i])
+        np.testing.assert_array_equal(b, stream[i])
+
+
+def test_cancel_ends_and_releases_the_lease(camera):
+    _, arbiter = camera
+    lease = arbiter.acquire()
+    assert lease.read()[0]
+    threading.Timer(0.05, arbiter.cancel_all).start()
+    with lease:
+        while lease.read()[0]:
+            pass
+    assert lease.reason == "cancelled"
+    assert arbiter.stats()["leases"] == 0
+    arbiter.acquire(wait=0).release()
+
+
+def test_timeout_ends_and_releases_the_lease(camera):
+    _, arbiter = camera
+    start = time.perf_counter()
+    with arbiter.acquire(timeout=0.1) as lease:
+        frames = 0
+        while lease.read()[0]:
+            frames += 1
+    assert lease.reason == "timeout" and frames > 0
+    assert time.perf_counter() - start < 1.0
+    assert arbiter.stats()["leases"] == 0
+
+
+def test_device_closes_after_the_idle_period(camera):
+    source, arbiter = camera
+    with arbiter.acquire() as lease:
+        lease.read()
+    assert arbiter.stats()["open"]
+    deadline = time.perf_counter() + 2
+    while arbiter.stats()["open"] and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    assert not arbiter.stats()["open"] and source.released
+    # The next session opens the device again.
+    with arbiter.acquire() as lease:
+        assert lease.read()[0]
+    assert source.opens == 2
+
+
+class CountingHands:
+    def __init__(self):
+        self.calls = 0
+
+    def process(self, image):
+        self.calls += 1
+        return self.calls
+
+
+class Lease:
+    seq = None
+
+
+def test_shared_hands_runs_inference_once_per_frame_and_mode():
+    results = SharedResults()
+    leases = [Lease(), Lease(), Lease()]
+    hands = [CountingHands() for _ in leases]
+    shared = [SharedHands(hands[0], leases[0], results, 2), SharedHands(hands[1], leases[1], results, 2),
+              SharedHands(hands[2], leases[2], results, 1)]
+    for seq in (1, 2):
+        for lease in leases:
+            lease.seq = seq
+        two_hand = [shared[0].process(None), shared[1].process(None)]
+        assert two_hand[0] == two_hand[1]
+        shared[2].process(None)
+    # The two two-hand sessions share one inference per frame; the one-hand session runs its own.
+    assert hands[0].calls + hands[1].calls == 2 and hands[2].calls == 2
+    assert results.computed == 4 and results.reused == 2
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from synthetic import SyntheticUsers
+from gesture_features import batch_features
+from gesture_gallery import distance_to_similarity
+from compact import CompactMatrix, CompactModel, load_models, save_models
+
+USERS = SyntheticUsers(0, 2)
+THRESHOLD = 75
+# Score differences to the float32 gallery allowed for any pair, the 99th percentile and the mean;
+# most of it is the variance PCA drops, quantization adds little on top.
+MAX_ERROR = 4.0
+P99_ERROR = 2.5
+MEAN_ERROR = 0.5
+
+
+@pytest.fixture(scope="module")
+def data():
+    train = np.concatenate([batch_features(USERS.stream(user, 30, session=s)) for user in range(40) for s in range(2)])
+    templates = np.stack([batch_features(USERS.stream(user, 60, session=3)).mean(axis=0) for user in range(40)])
+    probes = np.concatenate([batch_features(USERS.stream(user, 5, session=4, impostor=impostor))
+                             for impostor in (False, True) for user in range(40)])
+    full = distance_to_similarity(np.linalg.norm(probes[:, None] - templates[None], axis=2))
+    return train, templates.astype(np.float32), probes.astype(np.float32), full
+
+
+def compact_scores(model, templates, probes):
+    matrix = CompactMatrix(model)
+    matrix.extend(list(range(len(templates))), templates)
+    scores = np.empty((len(probes), len(templates)))
+    for row, probe in enumerate(probes):
+        for name, score in matrix.search(probe, len(templates)):
+            scores[row, name] = score
+    return scores
+
+
+@pytest.mark.parametrize("kind", ["int8", "float16"])
+def test_quantized_scores_stay_close_to_float32(data, kind):
+    train, templates, probes, full = data
+    model = CompactModel.fit(train, kind)
+    assert model.dim < templates.shape[1]
+    compact = compact_scores(model, templates, probes)
+    # Pairs both galleries score 0 say nothing about the error.
+    errors = np.abs(full - compact)[(full > 0) | (compact > 0)]
+    assert errors.max() <= MAX_ERROR and np.percentile(errors, 99) <= P99_ERROR and errors.mean() <= MEAN_ERROR
+    # Only pairs within that error of the threshold may land on the other side of it.
+    clear = np.abs(full - THRESHOLD) > MAX_ERROR
+    np.testing.assert_array_equal(full[clear] >= THRESHOLD, compact[clear] >= THRESHOLD)
+    assert (full >= THRESHOLD).sum() > 100 and (full < THRESHOLD).sum() > 100
+
+
+def test_calibration_is_monotonic(data):
+    train, templates, probes, full = data
+    model = CompactModel.fit(train, "int8")
+    assert model.gain > 0 and model.offset >= 0
+    reduced = np.linspace(0, 30, 2001)
+    distances = model.distances(reduced)
+    assert (np.diff(distances) > 0).all()
+    # So the compact ranking of a probe is the ranking of its reduced distances, best first.
+    matrix = CompactMatrix(model)
+    matrix.extend(list(range(len(templates))), templates)
+    for probe in probes[::20]:
+        ranked = matrix.search(probe, len(templates))
+        reduced = np.sum((model.decode(matrix.codes[[name for name, _ in ranked]]) - model.project(probe)) ** 2, axis=1)
+        assert (np.diff([score for _, score in ranked]) <= 0).all()
+        assert (np.diff(reduced) >= -1e-4).all()
+
+
+def test_models_round_trip(data, tmp_path):
+    train, templates, probes, full = data
+    models = {True: CompactModel.fit(train, "int8"), False: CompactModel.fit(train[:, :74], "float16")}
+    save_models(tmp_path / "compact.npz", models)
+    loaded = load_models(tmp_path / "compact.npz")
+    for mode, model in models.items():
+        assert loaded[mode].kind == model.kind and loaded[mode].gain == model.gain
+        np.testing.assert_array_equal(loaded[mode].encode(probes[:, :model.mean.size]),
+                                      model.encode(probes[:, :model.mean.size]))
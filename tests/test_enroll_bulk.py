@@ -0,0 +1,84 @@
+import numpy as np
+from synthetic import SyntheticUsers
+from enroll_bulk import enroll
+from frame_sources import LandmarkReplaySource
+from gesture_auth import GestureAuthenticator
+from gesture_features import batch_features
+from landmark_session import SessionWriter
+from multi_template import ADAPTED, enrol_templates
+from template_store import TemplateStore
+from temporal import resample_sequence
+
+USERS = SyntheticUsers(0, 2)
+
+
+def motion(frames=90, seed=0):
+    # Alice's gesture: a sweep from one two-hand pose to another, with tracking jitter.
+    start, end = USERS.gesture(0), USERS.gesture(1)
+    t = np.linspace(0, 1, frames)[:, None, None, None]
+    rng = np.random.default_rng(seed)
+    return (start * (1 - t) + end * t + rng.normal(0, 0.002, (frames,) + start.shape)).astype(np.float32)
+
+
+def write_session(path, landmarks):
+    with SessionWriter(str(path), 2, "alice") as writer:
+        for i, hands in enumerate(landmarks):
+            writer.write(list(hands), timestamp=i / 30)
+
+
+def test_reenrol_keeps_dynamic_and_learned_templates(tmp_path):
+    recording = motion()
+    features = batch_features(recording)
+    learned = features.mean(axis=0) + 0.3
+    user = {"gesture": features.mean(axis=0), "two_hands": True, "created_at": "2024-01-01",
+            "sequence": resample_sequence(features), "sequence_frames": len(features)}
+    user.update(enrol_templates(features))
+    user["templates"] = np.vstack([user["templates"], learned[None]])
+    user["template_origin"] = np.append(user["template_origin"], ADAPTED)
+    user["template_last_used"] = np.append(user["template_last_used"], 4)
+    user["logins"] = 5
+    store = TemplateStore(str(tmp_path / "store"))
+    store.load()
+    store.put("alice", user)
+    store.close()
+    write_session(tmp_path / "recordings" / "alice" / "enrol.gls", recording)
+
+    summary = enroll(str(tmp_path / "recordings"), str(tmp_path / "store"), workers=1, progress=None)
+    assert summary["users"] == 1
+
+    auth = GestureAuthenticator(store_path=str(tmp_path / "store"), warm_hands=False, adapt=False,
+                                frame_source=LandmarkReplaySource(np.concatenate([motion(seed=1)] * 3)))
+    alice = auth.users["alice"]
+    assert alice["created_at"] == "2024-01-01"
+    assert alice["sequence"].shape == user["sequence"].shape
+    assert alice["sequence_frames"] == len(recording)
+    assert alice["logins"] == 5
+    origin = np.asarray(alice["template_origin"])
+    assert (origin == ADAPTED).sum() == 1
+    np.testing.assert_allclose(alice["templates"][origin == ADAPTED][0], learned, rtol=1e-6)
+    assert "alice" in auth.sequences.matrix_for(True)
+    result = auth.verify_gesture_headless("alice", timeout=None)
+    assert result["authenticated"]
+    auth.release_camera()
+    auth.store.close()
+
+
+def test_drop_adapted(tmp_path):
+    recording = motion()
+    features = batch_features(recording)
+    user = {"gesture": features.mean(axis=0), "two_hands": True, "created_at": ""}
+    user.update(enrol_templates(features))
+    user["templates"] = np.vstack([user["templates"], features.mean(axis=0)[None] + 0.3])
+    user["template_origin"] = np.append(user["template_origin"], ADAPTED)
+    user["template_last_used"] = np.append(user["template_last_used"], 1)
+    store = TemplateStore(str(tmp_path / "store"))
+    store.load()
+    store.put("alice", user)
+    store.close()
+    write_session(tmp_path / "recordings" / "alice" / "enrol.gls", recording)
+    enroll(str(tmp_path / "recordings"), str(tmp_path / "store"), workers=1, progress=None, keep_adapted=False)
+    store = TemplateStore(str(tmp_path / "store"))
+    alice = store.load()["alice"]
+    store.close()
+    assert not (np.asarray(alice["template_origin"]) == ADAPTED).any()
+    assert alice.get("sequence") is None
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from synthetic import SyntheticUsers
+from frame_sources import LandmarkReplaySource
+from gesture_auth import GestureAuthenticator
+from gesture_features import batch_features
+from enrollment import StreamingTemplate
+
+USERS = SyntheticUsers(0, 2)
+
+
+def fill(template, frames):
+    for features in frames:
+        template.add(features)
+    return template
+
+
+@pytest.mark.parametrize("count", [1, 2, 17, 300])
+def test_welford_matches_numpy(count):
+    frames = np.random.default_rng(count).normal(3.0, 0.5, (count, 148)).astype(np.float32)
+    # A small buffer so the frames also survive growing it.
+    template = fill(StreamingTemplate(148, capacity=8), frames)
+    assert template.count == count
+    np.testing.assert_array_equal(template.recorded(), frames)
+    np.testing.assert_allclose(template.mean, np.mean(frames, axis=0, dtype=np.float64), rtol=1e-12)
+    expected = np.var(frames, axis=0, ddof=1, dtype=np.float64) if count > 1 else np.zeros(148)
+    np.testing.assert_allclose(template.variance, expected, rtol=1e-9, atol=1e-15)
+
+
+def test_converges_once_the_template_is_steady():
+    steady = batch_features(USERS.stream(0, 200))
+    # One check against the first checkpoint is not enough, however steady.
+    assert not fill(StreamingTemplate(steady.shape[1], tolerance=0.02), steady[:20]).converged(10)
+    template = StreamingTemplate(steady.shape[1], tolerance=0.02)
+    for count, features in enumerate(steady, 1):
+        template.add(features)
+        if template.converged(60):
+            break
+    # Two stable checks after the first checkpoint at the earliest, and never before min_frames.
+    assert 60 <= count < 200 and count % template.check_every == 0
+    assert template.drift < template.tolerance
+    # A pose that keeps changing never settles, and tolerance=None never stops early.
+    moving = np.concatenate([batch_features(USERS.stream(user, 10)) for user in range(20)])
+    assert not fill(StreamingTemplate(moving.shape[1], tolerance=0.02), moving).converged(60)
+    assert not fill(StreamingTemplate(steady.shape[1]), steady).converged(60)
+
+
+def test_recording_stops_early_when_steady(tmp_path):
+    auth = GestureAuthenticator(store_path=str(tmp_path / "store"), warm_hands=False,
+                                frame_source=LandmarkReplaySource(USERS.stream(0, 240)))
+    result = auth.record_gesture_headless(duration=60, min_frames=60)
+    assert result["converged"] and 60 <= result["frames"] < 240
+    auth.frame_source = LandmarkReplaySource(USERS.stream(0, 240))
+    auth.release_camera()
+    result = auth.record_gesture_headless(duration=60, min_frames=60, tolerance=None)
+    assert not result["converged"] and result["frames"] == 240
+    auth.release_camera()
+    auth.store.close()
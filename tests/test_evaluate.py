@@ -0,0 +1,42 @@
+import numpy as np
+from gesture_gallery import MAX_DISTANCE, distance_to_similarity
+from evaluate import BIN_WIDTH, THRESHOLDS, distance_bins, error_curves, summarize
+
+
+def histogram(distances):
+    index, bins = distance_bins(np.asarray(distances, dtype=np.float64))
+    return np.bincount(index, minlength=bins)
+
+
+def brute_force(genuine, impostor):
+    accept = lambda d: distance_to_similarity(np.asarray(d))[:, None] >= THRESHOLDS[None]
+    return accept(impostor).mean(axis=0), 1 - accept(genuine).mean(axis=0)
+
+
+def test_curves_match_brute_force_including_the_extremes():
+    rng = np.random.default_rng(0)
+    # Exact matches, distances on the scored range and distances past MAX_DISTANCE, which all score 0.
+    genuine = np.concatenate([[0.0, 0.0], rng.uniform(0, 2, 500), rng.uniform(MAX_DISTANCE, 8, 20)])
+    impostor = np.concatenate([[0.0], rng.uniform(1, MAX_DISTANCE, 500), rng.uniform(MAX_DISTANCE, 8, 50)])
+    far, frr = error_curves(histogram(genuine), histogram(impostor))
+    expected_far, expected_frr = brute_force(genuine, impostor)
+    np.testing.assert_allclose(far, expected_far)
+    np.testing.assert_allclose(frr, expected_frr)
+    # Everyone scores at least 0; only identical vectors score 100.
+    assert far[0] == 1 and frr[0] == 0
+    assert far[-1] == 1 / len(impostor) and frr[-1] == 1 - 2 / len(genuine)
+
+
+def test_distances_on_a_bin_edge_count_as_accepted():
+    # 75 <=> distance 1.25 exactly: a pair right on the cutoff must be accepted at 75, not only at 74.5.
+    edge = (1 - 75 / 100) * MAX_DISTANCE
+    far, frr = error_curves(histogram([edge]), histogram([edge + BIN_WIDTH / 2]))
+    at = int(np.flatnonzero(THRESHOLDS == 75)[0])
+    assert frr[at] == 0 and far[at] == 0 and far[at - 1] == 1
+
+
+def test_summary_percentile_is_an_upper_bin_edge():
+    genuine = histogram(np.full(100, 1.0))
+    report = summarize(genuine, histogram([4.0]), target_far=0.001)
+    assert abs(report["genuine_distance_p99"] - 1.0) < 1e-9
+    assert report["far_at_recommended"] <= 0.001
@@ -0,0 +1,69 @@
+import numpy as np
+from frame_ring import CLOSED, FrameRing, RingSource
+from frame_sources import LandmarkReplaySource
+from gesture_auth import GestureAuthenticator
+from pipeline import FramePipeline
+
+SHAPE = (8, 8, 3)
+
+
+def write(ring, value):
+    return ring.write(np.full(SHAPE, value, np.uint8), mirror=False, to_rgb=False)
+
+
+class LappingHands:
+    # Stands in for Hands; while "processing" a frame it lets the writer run `laps[i]` frames ahead.
+    def __init__(self, ring, laps):
+        self.ring = ring
+        self.laps = list(laps)
+        self.seen = []
+
+    def process(self, image):
+        self.seen.append(int(image[0, 0, 0]))
+        for _ in range(self.laps.pop(0) if self.laps else 0):
+            write(self.ring, self.ring.write_seq + 1)
+        if not self.laps:
+            self.ring.meta[CLOSED] = 1
+        return image[0, 0, 0]
+
+
+def test_lapped_view_is_invalid():
+    ring = FrameRing.create(SHAPE, slots=4)
+    source = RingSource(ring.name).open()
+    try:
+        write(ring, 1)
+        ok, frame = source.read()
+        assert ok and frame.frame_valid() and source.frame_valid()
+        part = frame[2:4]
+        for value in range(2, 6):
+            write(ring, value)
+        assert not frame.frame_valid() and not part.frame_valid() and not source.frame_valid()
+        assert frame[0, 0, 0] == 5
+    finally:
+        source.release()
+        ring.close()
+
+
+def test_capture_loops_drop_lapped_frames(tmp_path):
+    auth = GestureAuthenticator(store_path=str(tmp_path / "store"), warm_hands=False,
+                                frame_source=LandmarkReplaySource(np.zeros((1, 2, 21, 3), np.float32)))
+    for pipelined in (False, True):
+        ring = FrameRing.create(SHAPE, slots=4)
+        source = RingSource(ring.name).open()
+        try:
+            write(ring, 1)
+            # Frame 1 is lapped while it is processed; later frames are not. The pipeline's capture
+            # thread may pick up frames the writer produced in between, so only frame 1 is fixed.
+            hands = LappingHands(ring, [4, 0])
+            if pipelined:
+                with FramePipeline(source, hands.process) as pipeline:
+                    results = [result for _, result in pipeline]
+                assert pipeline.stats()["torn_frames"] == 1
+            else:
+                results = [result for _, result in auth.frames(source, hands)]
+                assert auth.torn_frames == 1
+            assert hands.seen[0] == 1 and results == hands.seen[1:] and results
+        finally:
+            source.release()
+            ring.close()
+    auth.store.close()
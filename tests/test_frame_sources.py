@@ -0,0 +1,68 @@
+import cv2
+import numpy as np
+from frame_sources import LandmarkReplaySource, LandmarkTracker, VideoFileSource
+
+
+def image_dir(tmp_path, count=3):
+    for i in range(count):
+        cv2.imwrite(str(tmp_path / f"{i:03d}.png"), np.full((8, 8, 3), i * 40, np.uint8))
+    return str(tmp_path)
+
+
+def read_all(source, limit=20):
+    frames = []
+    while source.isOpened() and len(frames) < limit:
+        ok, frame = source.read()
+        if not ok:
+            break
+        frames.append(int(frame[0, 0, 0]))
+    return frames
+
+
+def test_image_directory_loops_again_after_release(tmp_path):
+    source = VideoFileSource(image_dir(tmp_path), loop=True).open()
+    assert read_all(source, 5) == [0, 40, 80, 0, 40]
+    source.release()
+    assert not source.isOpened()
+    assert source.read() == (False, None)
+    source.open()
+    assert source.loop
+    assert read_all(source, 5) == [0, 40, 80, 0, 40]
+
+
+def test_image_directory_without_loop_ends(tmp_path):
+    source = VideoFileSource(image_dir(tmp_path)).open()
+    assert read_all(source) == [0, 40, 80]
+    assert not source.isOpened()
+    source.open()
+    assert read_all(source) == [0, 40, 80]
+
+
+def test_landmark_replay_reopens_from_start():
+    landmarks = np.random.default_rng(0).random((4, 2, 21, 3), dtype=np.float32)
+    source = LandmarkReplaySource(landmarks).open()
+    first = [source.read()[1].landmarks for _ in range(4)]
+    assert not source.isOpened()
+    source.open()
+    np.testing.assert_array_equal(source.read()[1].landmarks[0], first[0][0])
+
+
+def test_serial_replay_never_falls_back_to_source_current(tmp_path, monkeypatch):
+    from gesture_auth import GestureAuthenticator
+    from synthetic import SyntheticUsers
+    fallbacks = []
+    process = LandmarkTracker.process
+
+    def counting_process(self, image):
+        if getattr(image, "landmarks", None) is None:
+            fallbacks.append(image)
+        return process(self, image)
+
+    monkeypatch.setattr(LandmarkTracker, "process", counting_process)
+    source = LandmarkReplaySource(SyntheticUsers(0, 2).stream(0, 50))
+    auth = GestureAuthenticator(store_path=str(tmp_path / "store"), warm_hands=False, frame_source=source)
+    result = auth.record_gesture_headless(duration=60, min_frames=60, tolerance=None)
+    auth.release_camera()
+    auth.store.close()
+    assert result["frames"] == 50
+    assert fallbacks == []
@@ -0,0 +1,63 @@
+import time
+import numpy as np
+import pytest
+from synthetic import SyntheticUsers
+from frame_sources import LandmarkReplaySource
+from gesture_auth import GestureAuthenticator
+from gesture_features import batch_features
+
+USERS = SyntheticUsers(0, 2)
+
+
+def quiet(frame, result, state):
+    return True
+
+
+@pytest.fixture
+def auth(tmp_path):
+    auth = GestureAuthenticator(store_path=str(tmp_path / "store"), warm_hands=False, adapt=False,
+                                frame_source=LandmarkReplaySource(np.zeros((1, 2, 21, 3), np.float32)))
+    auth.store.put("alice", {"gesture": batch_features(USERS.stream(0, 120)).mean(axis=0), "two_hands": True,
+                             "created_at": ""})
+    auth.gallery.rebuild(auth.users)
+    yield auth
+    auth.release_camera()
+    auth.store.close()
+
+
+def replay(auth, stream, realtime=False):
+    auth.frame_source = LandmarkReplaySource(stream, realtime=realtime)
+    auth.release_camera()
+
+
+def test_live_verify_accepts_genuine(auth):
+    replay(auth, USERS.stream(0, 100, session=1))
+    success, message = auth.verify_gesture_live("alice", observer=quiet)
+    assert success and message.startswith("Authenticated")
+
+
+def test_live_sessions_end_at_timeout(auth):
+    # Nobody in front of the camera: the session must still end on its own.
+    empty = np.full((100000, 2, 21, 3), np.nan, np.float32)
+    replay(auth, empty, realtime=True)
+    start = time.perf_counter()
+    success, message = auth.verify_gesture_live("alice", observer=quiet, timeout=0.3)
+    assert not success and "timed out" in message
+    success, user, message = auth.identify_gesture_live(observer=quiet, timeout=0.3)
+    assert not success and user is None and "timed out" in message
+    assert time.perf_counter() - start < 3
+
+
+def test_verify_recording_is_not_labelled_with_the_claim(auth, tmp_path):
+    from landmark_session import load_session
+    impostor = USERS.stream(0, 60, session=2, impostor=True)
+    replay(auth, impostor)
+    path = str(tmp_path / "sessions" / "mallory" / "attempt.gls")
+    success, _ = auth.verify_gesture_live("alice", observer=quiet, session_path=path)
+    assert not success
+    session = load_session(path)
+    assert session["label"] == ""
+    assert len(session["landmarks"]) == 60
+    replay(auth, impostor)
+    auth.identify_gesture_live(observer=quiet, session_path=str(tmp_path / "identify.gls"), session_label="mallory")
+    assert load_session(str(tmp_path / "identify.gls"))["label"] == "mallory"
@@ -0,0 +1,59 @@
+import numpy as np
+from synthetic import SyntheticUsers, as_mediapipe
+from gesture_features import batch_features, hand_features, two_hands_features
+
+
+def loop_hand_features(hand_landmarks):
+    # The original per-landmark implementation the vectorized engine replaced.
+    features = []
+    landmarks = hand_landmarks.landmark
+    for lm in landmarks:
+        features.extend([lm.x, lm.y, lm.z])
+    tip_ids = [4, 8, 12, 16, 20]
+    for tip_id in tip_ids:
+        dx = landmarks[tip_id].x - landmarks[tip_id - 2].x
+        dy = landmarks[tip_id].y - landmarks[tip_id - 2].y
+        features.append(np.arctan2(dy, dx))
+    palm_center = landmarks[0]
+    for tip_id in tip_ids:
+        dx = landmarks[tip_id].x - palm_center.x
+        dy = landmarks[tip_id].y - palm_center.y
+        features.append(np.sqrt(dx**2 + dy**2))
+    return np.array(features)
+
+
+def loop_two_hands_features(hands):
+    c1, c2 = hands[0].landmark[0], hands[1].landmark[0]
+    distance = np.sqrt((c1.x - c2.x)**2 + (c1.y - c2.y)**2 + (c1.z - c2.z)**2)
+    angle = np.arctan2(c2.y - c1.y, c2.x - c1.x)
+    return np.concatenate([loop_hand_features(hands[0]), loop_hand_features(hands[1]), [distance, angle]])
+
+
+def frames():
+    stream = SyntheticUsers(3, 2).stream(0, 300, session=1)
+    noise = np.random.default_rng(1).random((300, 2, 21, 3), dtype=np.float32) - 0.3
+    return np.concatenate([stream, noise])
+
+
+def test_single_frame_matches_loop_exactly():
+    for frame in frames():
+        hands = as_mediapipe(frame)
+        expected = loop_two_hands_features(hands)
+        assert np.array_equal(hand_features(hands[0]), expected[:73])
+        assert np.array_equal(hand_features(frame[1]), expected[73:146])
+        assert np.array_equal(two_hands_features(hands), expected)
+        assert np.array_equal(two_hands_features(list(frame)), expected)
+
+
+def test_batch_matches_loop_within_two_ulp():
+    # Vectorized arctan2/sqrt kernels may round differently from the scalar path on some platforms.
+    data = frames()
+    expected = np.stack([loop_two_hands_features(as_mediapipe(frame)) for frame in data])
+    np.testing.assert_array_max_ulp(batch_features(data), expected, maxulp=2)
+    np.testing.assert_array_max_ulp(batch_features(data[:, :1]), expected[:, :73], maxulp=2)
+
+
+def test_two_hands_needs_two():
+    hands = as_mediapipe(frames()[0])
+    assert two_hands_features(hands[:1]) is None
+    assert two_hands_features(None) is None
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+import gesture_gallery
+from gesture_gallery import GestureGallery, distance_to_similarity
+
+
+def brute_force(users, probe, top_k):
+    best = {name: np.linalg.norm(np.asarray(t, np.float32).astype(np.float64) - probe, axis=1).min()
+            for name, t in users.items()}
+    ranked = sorted(best.items(), key=lambda item: item[1])[:top_k]
+    return [(name, float(distance_to_similarity(d))) for name, d in ranked]
+
+
+@pytest.fixture
+def gallery(monkeypatch):
+    monkeypatch.setattr(gesture_gallery, "COARSE_MIN_USERS", 64)
+    rng = np.random.default_rng(0)
+    centres = rng.normal(0, 1, (300, 148))
+    # 1 to 8 templates per user, spread like enrolment clusters plus the odd far-off adapted template.
+    users = {}
+    for i, centre in enumerate(centres):
+        templates = centre + rng.normal(0, 0.05, (rng.integers(1, 9), 148))
+        if i % 17 == 0:
+            templates[-1] += rng.normal(0, 1, 148)
+        users[f"user{i}"] = templates.astype(np.float32)
+    gallery = GestureGallery()
+    gallery.rebuild({name: {"gesture": t.mean(axis=0), "templates": t, "two_hands": True} for name, t in users.items()})
+    assert gallery.coarse[True] is not None
+    return gallery, users, centres, rng
+
+
+def test_coarse_bound_never_exceeds_best_template_distance(gallery):
+    gallery, users, centres, rng = gallery
+    coarse = gallery.coarse[True]
+    for probe in centres[:20] + rng.normal(0, 0.3, (20, 148)):
+        query = coarse.project(probe)[0]
+        size = len(coarse)
+        d2 = np.sum((coarse.vectors[:, :size].T.astype(np.float64) - query) ** 2, axis=1)
+        bound = np.sqrt(d2) - coarse.radius[:size]
+        for name, templates in users.items():
+            assert bound[coarse.rows[name]] <= np.linalg.norm(templates.astype(np.float64) - probe, axis=1).min()
+
+
+@pytest.mark.parametrize("top_k", [1, 5])
+def test_identify_matches_brute_force(gallery, top_k):
+    gallery, users, centres, rng = gallery
+    probes = np.concatenate([centres[:30] + rng.normal(0, 0.05, (30, 148)), rng.normal(0, 1, (10, 148))])
+    for probe in probes:
+        assert gallery.coarse[True].identify(gallery.two_hands, gallery.counts, probe, top_k) is not None
+        matches = gallery.identify(probe.astype(np.float32), True, top_k)
+        expected = brute_force(users, probe.astype(np.float32).astype(np.float64), top_k)
+        assert [name for name, _ in matches] == [name for name, _ in expected]
+        np.testing.assert_allclose([s for _, s in matches], [s for _, s in expected], atol=1e-6)
+
+
+def test_coarse_index_follows_add_and_remove(gallery):
+    gallery, users, centres, rng = gallery
+    for i in range(0, 300, 3):
+        gallery.remove(f"user{i}")
+        del users[f"user{i}"]
+    moved = (centres[1] + rng.normal(0, 0.05, (2, 148))).astype(np.float32)
+    gallery.add("user4", moved, True)
+    users["user4"] = moved
+    assert len(gallery.coarse[True]) == len(users)
+    for probe in centres[:20]:
+        matches = gallery.identify(probe.astype(np.float32), True, 3)
+        assert [name for name, _ in matches] == [name for name, _ in brute_force(users, probe.astype(np.float32).astype(np.float64), 3)]
+
+
+def test_small_galleries_skip_the_coarse_stage():
+    gallery = GestureGallery()
+    gallery.rebuild({"alice": {"gesture": np.zeros(148, np.float32), "two_hands": True}})
+    assert gallery.coarse[True] is None
+    assert gallery.identify(np.zeros(148, np.float32), True, 1) == [("alice", 100.0)]
@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+from synthetic import SyntheticUsers
+from frame_sources import LandmarkReplaySource
+from gesture_auth import GestureAuthenticator
+from gesture_features import batch_features
+from enrollment import StreamingTemplate
+from multi_template import (ADAPTED, ENROL_TEMPLATES, ENROLLED, MAX_TEMPLATES, MERGE_RATE, adapt, enrol_templates,
+                            user_templates)
+
+USERS = SyntheticUsers(0, 2)
+
+
+def poses(*users, frames=40):
+    # Enrolment frames that hold one pose after another, so k-means has one clear cluster per pose.
+    return np.concatenate([batch_features(USERS.stream(user, frames)) for user in users])
+
+
+def record(frames):
+    template = StreamingTemplate(frames.shape[1])
+    for features in frames:
+        template.add(features)
+    return template
+
+
+@pytest.fixture
+def auth(tmp_path):
+    auth = GestureAuthenticator(store_path=str(tmp_path / "store"), warm_hands=False, max_templates=MAX_TEMPLATES,
+                                frame_source=LandmarkReplaySource(np.zeros((1, 2, 21, 3), np.float32)))
+    auth.store.put("alice", auth.enrol("alice", record(poses(0, 1, 2)), True))
+    auth.gallery.rebuild(auth.users)
+    yield auth
+    auth.release_camera()
+    auth.store.close()
+
+
+def gallery_rows(auth, username):
+    matrix = auth.gallery.matrix_for(True)
+    return sorted(i for name, i in matrix.names if name == username)
+
+
+def test_enrolment_yields_one_centre_per_cluster():
+    frames = poses(0, 1, 2)
+    user = enrol_templates(frames)
+    assert len(user["templates"]) == ENROL_TEMPLATES
+    assert (user["template_origin"] == ENROLLED).all() and user["logins"] == 0
+    # Every pose's mean lies next to exactly one centre.
+    means = frames.reshape(3, 40, -1).mean(axis=1)
+    nearest = np.linalg.norm(means[:, None] - user["templates"][None], axis=2).argmin(axis=1)
+    assert sorted(nearest) == [0, 1, 2]
+    # A stray handful of frames is not worth a template of its own.
+    assert len(enrol_templates(np.concatenate([poses(0, 1, frames=60), poses(2, frames=5)]))["templates"]) == 2
+
+
+def test_accepted_login_moves_only_the_nearest_adapted_template(auth):
+    features = poses(3, frames=1)[0]
+    auth.adapt_user("alice", features, auth.adapt_score)
+    before = user_templates(auth.users["alice"]).copy()
+    assert len(before) == ENROL_TEMPLATES + 1 and auth.users["alice"]["template_origin"][-1] == ADAPTED
+    login = features + 0.01
+    assert auth.adapt_user("alice", login, auth.adapt_score) == "merged"
+    after = user_templates(auth.users["alice"])
+    np.testing.assert_allclose(after[-1], before[-1] + MERGE_RATE * (login - before[-1]), atol=1e-6)
+    np.testing.assert_array_equal(after[:-1], before[:-1])
+    # Close to an enrolled centre: the centre stays put and only its use is recorded.
+    assert auth.adapt_user("alice", before[0], auth.adapt_score) == "refreshed"
+    np.testing.assert_array_equal(user_templates(auth.users["alice"]), after)
+    assert auth.users["alice"]["template_last_used"][0] == auth.users["alice"]["logins"]
+
+
+def test_rejected_login_never_changes_templates(auth):
+    before = {key: np.array(value) for key, value in auth.users["alice"].items() if key.startswith("template")}
+    far = poses(3, frames=1)[0]
+    assert auth.adapt_user("alice", far, auth.adapt_score - 1) is None
+    assert auth.adapt_user("mallory", far, 100.0) is None
+    auth.adapt = False
+    assert auth.adapt_user("alice", far, 100.0) is None
+    for key, value in before.items():
+        np.testing.assert_array_equal(auth.users["alice"][key], value)
+    assert auth.users["alice"]["logins"] == 0
+
+
+def test_templates_are_capped_with_lru_eviction_of_adapted_ones():
+    user = enrol_templates(poses(0, 1, 2))
+    logins = [poses(user, frames=1)[0] for user in range(3, 3 + MAX_TEMPLATES)]
+    for features in logins:
+        user, action = adapt(user, features)
+    assert action == "replaced" and len(user["templates"]) == MAX_TEMPLATES
+    # The oldest adapted templates went first, in login order; the enrolled centres are never evicted.
+    kept = sorted(user["templates"][ENROL_TEMPLATES:].tolist())
+    assert kept == sorted(np.stack(logins[-(MAX_TEMPLATES - ENROL_TEMPLATES):]).astype(np.float32).tolist())
+    assert (user["template_origin"][:ENROL_TEMPLATES] == ENROLLED).all()
+
+
+def test_gallery_rows_follow_reenrolment(auth):
+    for user in (3, 4):
+        auth.adapt_user("alice", poses(user, frames=1)[0], auth.adapt_score)
+    assert gallery_rows(auth, "alice") == list(range(ENROL_TEMPLATES + 2))
+    # Re-enrolling replaces the adapted templates; their rows must not linger in the gallery.
+    user = auth.enrol("alice", record(poses(5, 6, 7)), True)
+    auth.store.put("alice", user)
+    auth.gallery.add("alice", user["templates"], True)
+    assert gallery_rows(auth, "alice") == list(range(ENROL_TEMPLATES))
+    assert auth.gallery.counts["alice"] == ENROL_TEMPLATES
+    matrix = auth.gallery.matrix_for(True)
+    stored = np.stack([matrix.matrix[matrix.rows[("alice", i)]] for i in range(ENROL_TEMPLATES)])
+    np.testing.assert_array_equal(stored, user_templates(auth.users["alice"]))
+    assert auth.gallery.identify(poses(6, frames=1)[0], True, top_k=1)[0][0] == "alice"
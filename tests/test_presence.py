@@ -0,0 +1,107 @@
+import time
+import numpy as np
+from frame_sources import HandResult, LandmarkReplaySource
+from gesture_auth import GestureAuthenticator
+from presence import PresenceGate
+
+
+class FakeGraph:
+    def __init__(self):
+        self.closed = False
+        self.calls = 0
+
+    def process(self, image):
+        self.calls += 1
+        return type("Result", (), {"detections": None})()
+
+    def close(self):
+        self.closed = True
+
+
+class FakeFaceModule:
+    def __init__(self):
+        self.graphs = []
+
+    def FaceDetection(self, model_selection=0, min_detection_confidence=0.5):
+        self.graphs.append(FakeGraph())
+        return self.graphs[-1]
+
+
+class FakeHands:
+    def __init__(self):
+        self.calls = 0
+
+    def process(self, image):
+        self.calls += 1
+        return HandResult()
+
+    def close(self):
+        pass
+
+    def __exit__(self, *exc):
+        return False
+
+
+def test_face_graph_is_built_once_and_closed_on_shutdown(tmp_path):
+    auth = GestureAuthenticator(store_path=str(tmp_path / "store"), warm_hands=False, presence="face",
+                                frame_source=LandmarkReplaySource(np.zeros((1, 2, 21, 3), np.float32)))
+    faces = FakeFaceModule()
+    auth.face_pool.mp_face = faces
+    frame = np.zeros((48, 64, 3), np.uint8)
+    for _ in range(3):
+        with PresenceGate(FakeHands(), auth.create_presence_detector(), start_active=False) as gate:
+            gate.process(frame)
+        # PresenceGate closes its detector on exit and again on close(); the graph goes back only once.
+        gate.close()
+    assert len(faces.graphs) == 1 and faces.graphs[0].calls == 3
+    assert not faces.graphs[0].closed
+    auth.close()
+    assert faces.graphs[0].closed
+
+
+class EmptyScene:
+    # Camera stand-in showing nobody: blank frames, one every 2 ms.
+    def open(self):
+        self.released = False
+        return self
+
+    def isOpened(self):
+        return not self.released
+
+    def read(self):
+        time.sleep(0.002)
+        return True, np.zeros((48, 64, 3), np.uint8)
+
+    def release(self):
+        self.released = True
+
+
+class Nobody:
+    def reset(self):
+        pass
+
+    def __call__(self, rgb):
+        return False
+
+    def close(self):
+        pass
+
+
+def test_idle_mode_carries_over_and_cuts_hand_inference(tmp_path):
+    auth = GestureAuthenticator(store_path=str(tmp_path / "store"), warm_hands=False, presence=Nobody(),
+                                idle_after=0.1, idle_fps=20, frame_source=EmptyScene())
+    hands = FakeHands()
+    auth.hands_pool.acquire = lambda *args, **kwargs: hands
+    calls, frames = [], []
+    for _ in range(4):
+        before = hands.calls
+        result = auth.record_gesture_headless(duration=0.3, min_frames=1, tolerance=None)
+        calls.append(hands.calls - before)
+        frames.append(result["processed_frames"])
+    # The first session runs inference until idle_after has passed without a hand, then only checks.
+    assert 0 < calls[0] < frames[0]
+    # Later sessions pick up where the last one left off: still idle, so no inference at all.
+    assert calls[1:] == [0, 0, 0] and all(frames[1:])
+    stats = auth.presence_gate.stats()
+    assert not stats["active"] and stats["activations"] == 0 and stats["idle_checks"] >= 3
+    auth.close()
@@ -0,0 +1,74 @@
+import numpy as np
+from frame_sources import HandResult
+from roi_tracker import RoiHands
+
+WIDTH, HEIGHT = 640, 480
+
+
+class BlockHands:
+    # Stand-in for MediaPipe: every block of pixel value 100 or 200 in the image it is given is a hand,
+    # reported as 21 landmarks spread over the block in that image's normalized coordinates.
+    def __init__(self):
+        self.resets = 0
+
+    def process(self, image):
+        h, w = image.shape[:2]
+        hands = []
+        for value in (100, 200):
+            ys, xs = np.nonzero(image[..., 0] == value)
+            if len(xs):
+                t = np.linspace(0, 1, 21)
+                x = (xs.min() + t * (xs.max() - xs.min())) / w
+                y = (ys.min() + t * (ys.max() - ys.min())) / h
+                hands.append(np.stack([x, y, np.zeros(21)], axis=1).astype(np.float32))
+        return HandResult(hands or None)
+
+    def reset(self):
+        self.resets += 1
+
+    def __exit__(self, *exc):
+        return False
+
+
+def frame(second_hand=False):
+    image = np.zeros((HEIGHT, WIDTH, 3), np.uint8)
+    image[200:260, 100:160] = 100
+    if second_hand:
+        image[200:260, 480:540] = 200
+    return image
+
+
+def test_second_hand_outside_crop_is_found():
+    hands = BlockHands()
+    roi = RoiHands(hands, max_hands=2, rescan_every=5)
+    for _ in range(10):
+        assert len(roi.process(frame()).multi_hand_landmarks) == 1
+    assert roi.box is not None and roi.box[2] < 480
+    counts = [len(roi.process(frame(second_hand=True)).multi_hand_landmarks) for _ in range(10)]
+    assert counts[-1] == 2
+    assert counts.index(2) < 5
+    assert roi.rescans >= 1
+    # Both hands tracked: no more forced full-frame scans.
+    scans = roi.full_scans
+    for _ in range(20):
+        assert len(roi.process(frame(second_hand=True)).multi_hand_landmarks) == 2
+    assert roi.full_scans == scans
+
+
+def test_one_hand_mode_stays_on_the_crop():
+    hands = BlockHands()
+    roi = RoiHands(hands, max_hands=1, rescan_every=5)
+    for _ in range(20):
+        roi.process(frame(second_hand=True))
+    assert roi.full_scans == 1
+
+
+def test_reset_between_sessions():
+    hands = BlockHands()
+    roi = RoiHands(hands, max_hands=1)
+    roi.process(frame())
+    assert roi.box is not None
+    with roi:
+        assert roi.box is None
+        assert roi.expected_hands == 0
+    assert hands.resets >= 2
@@ -0,0 +1,89 @@
+import math
+import numpy as np
+import pytest
+from synthetic import SyntheticUsers
+from frame_sources import LandmarkReplaySource
+from gesture_auth import GestureAuthenticator
+from gesture_features import batch_features
+from sequential import ACCEPT, REJECT, SequentialTest
+
+USERS = SyntheticUsers(0, 2)
+THRESHOLD = 75
+
+
+def quiet(frame, result, state):
+    return True
+
+
+def run(test, scores):
+    for score in scores:
+        decision = test.update(score)
+        if decision is not None:
+            return decision
+    return None
+
+
+def fewest_frames(test, bound):
+    # Every frame moves the log-likelihood ratio by at most frame_weight * max_step.
+    return math.ceil(abs(bound) / (test.frame_weight * test.max_step))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_accepts_genuine_and_rejects_impostor_streams(seed):
+    rng = np.random.default_rng(seed)
+    test = SequentialTest().calibrate(THRESHOLD)
+    assert run(test, rng.normal(test.genuine_mean, test.sigma, 200)) == ACCEPT
+    assert test.llr >= test.accept_bound
+    assert fewest_frames(test, test.accept_bound) <= test.frames <= 60
+    test.reset()
+    assert test.llr == 0 and test.frames == 0 and test.decision is None
+    assert run(test, rng.normal(test.impostor_mean, test.sigma, 200)) == REJECT
+    assert test.llr <= test.reject_bound
+    assert fewest_frames(test, test.reject_bound) <= test.frames <= 60
+
+
+def test_decision_sticks_and_max_frames_rejects():
+    test = SequentialTest(max_frames=10).calibrate(THRESHOLD)
+    # Scores halfway between the two means carry no evidence either way.
+    halfway = (test.genuine_mean + test.impostor_mean) / 2
+    assert run(test, [halfway] * 20) == REJECT and test.frames == 10
+    assert test.update(100) == REJECT and test.frames == 10
+    assert test.progress() == 0
+
+
+@pytest.fixture
+def auth(tmp_path):
+    auth = GestureAuthenticator(store_path=str(tmp_path / "store"), warm_hands=False, adapt=False,
+                                frame_source=LandmarkReplaySource(np.zeros((1, 2, 21, 3), np.float32)))
+    for user, name in enumerate(["alice", "bob"]):
+        auth.store.put(name, {"gesture": batch_features(USERS.stream(user, 120)).mean(axis=0), "two_hands": True,
+                              "created_at": ""})
+    auth.gallery.rebuild(auth.users)
+    yield auth
+    auth.release_camera()
+    auth.store.close()
+
+
+def replay(auth, stream):
+    auth.frame_source = LandmarkReplaySource(stream)
+    auth.release_camera()
+
+
+def test_live_sequential_verify(auth):
+    replay(auth, USERS.stream(0, 100, session=1))
+    success, message = auth.verify_gesture_live("alice", sequential=True, observer=quiet)
+    assert success
+    replay(auth, USERS.stream(0, 100, session=1, impostor=True))
+    result = auth.verify_gesture_headless("alice", sequential=True, observer=quiet)
+    assert result["decision"] == REJECT and not result["authenticated"]
+
+
+def test_evidence_restarts_when_the_identified_user_changes(auth):
+    # A few of alice's frames, then bob: none of alice's evidence may count towards accepting bob.
+    lead = 5
+    replay(auth, np.concatenate([USERS.stream(0, lead, session=1), USERS.stream(1, 100, session=1)]))
+    test = SequentialTest()
+    result = auth.identify_gesture_headless(sequential=test, observer=quiet)
+    assert result["authenticated"] and result["user"] == "bob"
+    assert result["decision_frames"] == result["frames"] - lead
+    assert result["decision_frames"] >= fewest_frames(test, test.accept_bound)
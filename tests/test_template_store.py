@@ -0,0 +1,164 @@
+import json
+import os
+import struct
+import numpy as np
+import pytest
+from template_store import INDEX_FILE, RECORD_HEADER, TemplateStore
+
+
+def record(seed, dim=148):
+    rng = np.random.default_rng(seed)
+    return {"gesture": rng.random(dim).astype(np.float32), "two_hands": dim == 148, "created_at": f"day {seed}",
+            "templates": rng.random((3, dim)).astype(np.float32)}
+
+
+def reopen(path, **options):
+    store = TemplateStore(path, **options)
+    users = store.load()
+    return store, users
+
+
+def journal_path(path):
+    with open(os.path.join(path, INDEX_FILE)) as f:
+        return os.path.join(path, json.load(f)["journal"])
+
+
+def assert_user(user, expected):
+    assert user["two_hands"] == expected["two_hands"]
+    assert user["created_at"] == expected["created_at"]
+    np.testing.assert_array_equal(user["gesture"], expected["gesture"])
+    np.testing.assert_array_equal(user["templates"], expected["templates"])
+
+
+def test_append_then_reopen(tmp_path):
+    store, _ = reopen(tmp_path)
+    alice, bob = record(1), record(2, dim=73)
+    store.put("alice", alice)
+    store.put("bob", bob)
+    store.put("carol", record(3))
+    assert store.delete("carol")
+    store.close()
+    store, users = reopen(tmp_path)
+    assert sorted(users) == ["alice", "bob"]
+    assert_user(users["alice"], alice)
+    assert_user(users["bob"], bob)
+    assert store.journal_records == 4
+    store.close()
+
+
+def test_torn_tail_is_truncated(tmp_path):
+    store, _ = reopen(tmp_path)
+    alice = record(1)
+    store.put("alice", alice)
+    store.put("bob", record(2))
+    store.close()
+    path = journal_path(tmp_path)
+    size = os.path.getsize(path)
+    # Crash in the middle of the second append.
+    with open(path, "r+b") as f:
+        f.truncate(size - 100)
+    valid = size - 100
+    store, users = reopen(tmp_path)
+    assert list(users) == ["alice"]
+    assert_user(users["alice"], alice)
+    assert os.path.getsize(path) < valid
+    # New records append after the last good one and survive the next reopen.
+    store.put("carol", record(3))
+    store.close()
+    _, users = reopen(tmp_path)
+    assert sorted(users) == ["alice", "carol"]
+
+
+def record_offsets(path):
+    with open(path, "rb") as f:
+        blob = f.read()
+    offsets = [0]
+    while offsets[-1] < len(blob):
+        _, meta_len, data_len = RECORD_HEADER.unpack_from(blob, offsets[-1])
+        offsets.append(offsets[-1] + RECORD_HEADER.size + meta_len + data_len)
+    return offsets
+
+
+def test_corrupt_record_is_skipped(tmp_path):
+    store, _ = reopen(tmp_path)
+    alice, carol = record(1), record(3)
+    store.put("alice", alice)
+    store.put("bob", record(2))
+    store.put("carol", carol)
+    store.close()
+    path = journal_path(tmp_path)
+    size = os.path.getsize(path)
+    # Flip bytes inside bob's record: only that record is lost, not the ones after it.
+    with open(path, "r+b") as f:
+        f.seek(record_offsets(path)[2] - 10)
+        f.write(b"\xff" * 4)
+    store, users = reopen(tmp_path)
+    assert sorted(users) == ["alice", "carol"]
+    assert_user(users["alice"], alice)
+    assert_user(users["carol"], carol)
+    assert store.skipped_records == 1 and store.journal_records == 2
+    assert os.path.getsize(path) == size
+    store.put("dave", record(4))
+    store.close()
+    _, users = reopen(tmp_path)
+    assert sorted(users) == ["alice", "carol", "dave"]
+
+
+def test_corrupt_length_keeps_the_journal(tmp_path):
+    store, _ = reopen(tmp_path)
+    for i in range(3):
+        store.put(f"user{i}", record(i))
+    store.close()
+    path = journal_path(tmp_path)
+    # A bad length on the first record throws off the framing of everything after it.
+    with open(path, "r+b") as f:
+        f.seek(8)
+        f.write(struct.pack("<I", 100))
+    with open(path, "rb") as f:
+        before = f.read()
+    store = TemplateStore(str(tmp_path))
+    with pytest.raises(ValueError):
+        store.load()
+    with open(path, "rb") as f:
+        assert f.read() == before
+
+
+def test_compaction_after_threshold(tmp_path):
+    store, _ = reopen(tmp_path, compact_every=5)
+    generation = store.generation
+    expected = {f"user{i}": record(i) for i in range(7)}
+    for name, user in expected.items():
+        store.put(name, user)
+    assert store.generation == generation + 1
+    assert store.journal_records == 2
+    store.close()
+    names = sorted(os.listdir(tmp_path))
+    assert names == sorted([INDEX_FILE, f"templates-{generation + 1}.f32", f"journal-{generation + 1}.log"])
+    store, users = reopen(tmp_path)
+    assert sorted(users) == sorted(expected)
+    for name, user in expected.items():
+        assert_user(users[name], user)
+    store.compact()
+    assert store.journal_records == 0
+    store.close()
+    _, users = reopen(tmp_path)
+    assert sorted(users) == sorted(expected)
+
+
+def test_migrate_json(tmp_path):
+    legacy = {
+        "alice": {"gesture": list(range(148)), "two_hands": True, "created_at": "2024-01-01T00:00:00"},
+        "bob": {"gesture": [0.5] * 73, "two_hands": False, "created_at": "2024-01-02T00:00:00"},
+    }
+    json_path = tmp_path / "users_db.json"
+    json_path.write_text(json.dumps(legacy))
+    store = TemplateStore(str(tmp_path / "store"))
+    users = store.migrate_json(str(json_path))
+    store.close()
+    assert sorted(users) == ["alice", "bob"]
+    _, users = reopen(tmp_path / "store")
+    for name, user in legacy.items():
+        assert users[name]["gesture"].dtype == np.float32
+        np.testing.assert_array_equal(users[name]["gesture"], np.asarray(user["gesture"], dtype=np.float32))
+        assert users[name]["two_hands"] == user["two_hands"]
+        assert users[name]["created_at"] == user["created_at"]
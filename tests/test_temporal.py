@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from gesture_gallery import distance_to_similarity
+from temporal import (PAA_SEGMENTS, SequenceMatrix, dtw_costs, envelope, lb_keogh, paa, paa_envelope,
+                      resample_sequence)
+
+
+def reference_dtw(a, b, band):
+    # Textbook banded DTW with squared-Euclidean local cost.
+    n = len(a)
+    acc = np.full((n + 1, n + 1), np.inf)
+    acc[0, 0] = 0
+    for i in range(1, n + 1):
+        for j in range(1, n + 1):
+            if abs(i - j) <= band:
+                acc[i, j] = np.sum((a[i - 1] - b[j - 1]) ** 2) + min(acc[i - 1, j], acc[i, j - 1], acc[i - 1, j - 1])
+    return acc[n, n]
+
+
+def walks(rng, count, length=32, dim=6):
+    return np.cumsum(rng.normal(0, 0.2, (count, length, dim)), axis=1)
+
+
+@pytest.mark.parametrize("band", [0, 2, 4, 40])
+def test_dtw_costs_match_reference(band):
+    rng = np.random.default_rng(band)
+    query = walks(rng, 1, 12, 3)[0]
+    candidates = walks(rng, 5, 12, 3)
+    expected = [reference_dtw(query, c, band) for c in candidates]
+    np.testing.assert_allclose(dtw_costs(query, candidates, band), expected, rtol=1e-9, atol=1e-12)
+
+
+def test_lower_bounds_are_ordered_below_dtw():
+    rng = np.random.default_rng(1)
+    for band in (1, 4, 8):
+        query = walks(rng, 1)[0]
+        candidates = np.concatenate([walks(rng, 100), query + rng.normal(0, 0.05, (50, 32, 6))])
+        upper, lower = envelope(query, band)
+        paa_upper, paa_lower = paa_envelope(upper, lower, PAA_SEGMENTS)
+        lb_paa = lb_keogh(paa_upper, paa_lower, paa(candidates, PAA_SEGMENTS), 32 // PAA_SEGMENTS)
+        lb = lb_keogh(upper, lower, candidates)
+        dtw = dtw_costs(query, candidates, band)
+        assert np.all(lb_paa <= lb + 1e-9)
+        assert np.all(lb <= dtw + 1e-9)
+
+
+@pytest.mark.parametrize("top_k", [1, 5])
+def test_pruned_search_matches_brute_force(top_k):
+    rng = np.random.default_rng(2)
+    sequences = walks(rng, 300).astype(np.float32)
+    matrix = SequenceMatrix(6)
+    for i, sequence in enumerate(sequences):
+        matrix.add(f"user{i}", sequence, 32)
+    for i in range(10):
+        probe = sequences[i * 7].astype(np.float64) + rng.normal(0, 0.05, (32, 6))
+        matches = matrix.search(probe, top_k)
+        costs = dtw_costs(probe, sequences.astype(np.float64))
+        expected = np.argsort(costs)[:top_k]
+        assert [name for name, _ in matches] == [f"user{j}" for j in expected]
+        np.testing.assert_allclose([s for _, s in matches], distance_to_similarity(np.sqrt(costs[expected] / 32)))
+        assert matrix.last_pruned > 0
+
+
+def test_resample_keeps_endpoints():
+    features = np.arange(10, dtype=np.float64)[:, None] * [1, 2]
+    resampled = resample_sequence(features, 4)
+    np.testing.assert_allclose(resampled[[0, -1]], features[[0, -1]])
+    np.testing.assert_allclose(resampled[:, 1], 2 * resampled[:, 0])